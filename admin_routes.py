@@ -1,5 +1,5 @@
 # admin_routes.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file, jsonify, current_app
 from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime
 import os
@@ -11,6 +11,12 @@ import string
 from config import ADMIN_PASSWORD, CURRENT_SETTINGS, save_settings, DEFAULT_SETTINGS, __version__, SETTING_LABELS_CHINESE 
 from models import db, SSQDraw, DLTDraw, News
 from data_manager import update_latest_draws, add_manual_draw, validate_ssq_format, validate_dlt_format
+from rule_engine import HISTORY_RULES, backtest_history_rules, refresh_rule_results_if_settings_changed
+from strategy_backtest import STRATEGIES, run_strategy_backtest
+from combination_index import FEATURE_LABELS, combination_space_report
+from settings_preview import preview_settings
+from news_manager import bump_news_version
+from page_cache import page_cache
 
 # 版本号，每次生成文件时更新
 __version__ = "1.0.0"
@@ -50,7 +56,31 @@ def admin_logout():
 @bp.route('/')
 @admin_required
 def admin_dashboard():
-    return render_template('admin/dashboard.html')
+    return render_template('admin/dashboard.html', page_cache_stats=page_cache.stats())
+
+def _convert_setting_value(key, value):
+    """按默认设置的类型转换表单提交的字符串，格式不正确时抛出 ValueError (消息为中文提示)"""
+    default_value = DEFAULT_SETTINGS.get(key)
+    # 使用中文标题显示错误信息
+    label = SETTING_LABELS_CHINESE.get(key, key)
+    if isinstance(default_value, int):
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"设置 '{label}' 的值必须是整数。")
+    if isinstance(default_value, float):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"设置 '{label}' 的值必须是浮点数。")
+    if isinstance(default_value, bool):
+        return value.lower() == 'true'
+    if isinstance(default_value, list): # 假设列表是逗号分隔的数字
+        try:
+            return [int(x.strip()) for x in value.split(',') if x.strip()]
+        except ValueError:
+            raise ValueError(f"设置 '{label}' 的值 '{value}' 格式不正确，应为逗号分隔的数字。")
+    return value
 
 @bp.route('/settings', methods=['GET', 'POST'])
 @admin_required
@@ -66,33 +96,14 @@ def admin_settings():
                     continue # 跳过当前设置项，处理下一个
                 
                 # 尝试转换类型
-                if isinstance(DEFAULT_SETTINGS.get(key), int):
-                    try:
-                        CURRENT_SETTINGS[key] = int(value)
-                    except (ValueError, TypeError):
-                        # 使用中文标题显示错误信息
-                        flash(f"设置 '{SETTING_LABELS_CHINESE.get(key, key)}' 的值必须是整数。", 'danger')
-                        return redirect(url_for('admin_routes.admin_settings'))
-                elif isinstance(DEFAULT_SETTINGS.get(key), float):
-                    try:
-                        CURRENT_SETTINGS[key] = float(value)
-                    except (ValueError, TypeError):
-                        # 使用中文标题显示错误信息
-                        flash(f"设置 '{SETTING_LABELS_CHINESE.get(key, key)}' 的值必须是浮点数。", 'danger')
-                        return redirect(url_for('admin_routes.admin_settings'))
-                elif isinstance(DEFAULT_SETTINGS.get(key), bool):
-                    CURRENT_SETTINGS[key] = (value.lower() == 'true')
-                elif isinstance(DEFAULT_SETTINGS.get(key), list): # 假设列表是逗号分隔的数字
-                    try:
-                        CURRENT_SETTINGS[key] = [int(x.strip()) for x in value.split(',') if x.strip()]
-                    except ValueError:
-                        # 使用中文标题显示错误信息
-                        flash(f"设置 '{SETTING_LABELS_CHINESE.get(key, key)}' 的值 '{value}' 格式不正确，应为逗号分隔的数字。", 'danger')
-                        return redirect(url_for('admin_routes.admin_settings'))
-                else:
-                    CURRENT_SETTINGS[key] = value
+                try:
+                    CURRENT_SETTINGS[key] = _convert_setting_value(key, value)
+                except ValueError as e:
+                    flash(str(e), 'danger')
+                    return redirect(url_for('admin_routes.admin_settings'))
         
         save_settings(CURRENT_SETTINGS) # 保存更新后的设置到文件
+        refresh_rule_results_if_settings_changed() # 规则相关设置变化时重算各期规则判定
         flash('网站设置已更新！', 'success')
         return redirect(url_for('admin_routes.admin_settings'))
     
@@ -103,6 +114,27 @@ def admin_settings():
                            setting_labels=SETTING_LABELS_CHINESE # <-- 确保这里传递了 setting_labels
                            )
 
+@bp.route('/settings/preview', methods=['POST'])
+@admin_required
+def admin_settings_preview():
+    """设置页面提交的表单 (不保存) 与当前设置对比：抽样预览号码分布和规则通过率的变化"""
+    lottery_type = request.form.get('lottery_type', 'ssq')
+    proposed_settings = dict(CURRENT_SETTINGS)
+    for key, value in request.form.items():
+        if key in CURRENT_SETTINGS and key != 'admin_password':
+            try:
+                proposed_settings[key] = _convert_setting_value(key, value)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+    try:
+        preview = preview_settings(lottery_type, proposed_settings)
+    except (ValueError, TypeError, KeyError) as e:
+        current_app.logger.error(f"Settings preview failed for {lottery_type}: {e}")
+        return jsonify({'error': f'拟修改的设置无法构建预测模型: {e}'}), 400
+    if 'error' in preview:
+        return jsonify(preview), 400
+    return jsonify(preview)
+
 @bp.route('/settings/download')
 @admin_required
 def download_settings():
@@ -116,9 +148,11 @@ def download_settings():
 @bp.route('/settings/restore_default')
 @admin_required
 def restore_default_settings():
-    global CURRENT_SETTINGS
-    CURRENT_SETTINGS = DEFAULT_SETTINGS.copy() # 恢复默认值
+    # 原地更新共享的设置字典，其他模块持有的引用才能看到默认值
+    CURRENT_SETTINGS.clear()
+    CURRENT_SETTINGS.update(DEFAULT_SETTINGS) # 恢复默认值
     save_settings(CURRENT_SETTINGS)
+    refresh_rule_results_if_settings_changed()
     flash('网站设置已恢复为默认值！', 'success')
     return redirect(url_for('admin_routes.admin_settings'))
 
@@ -153,6 +187,66 @@ def admin_data_update():
         return redirect(url_for('admin_routes.admin_data_update'))
     return render_template('admin/data_update.html')
 
+@bp.route('/rule_backtest')
+@admin_required
+def admin_rule_backtest():
+    """历史开奖规则回测：查看真实开奖 "违反" 各条预测规则的比例"""
+    lottery_type = request.args.get('lottery_type', 'ssq')
+    if lottery_type not in HISTORY_RULES:
+        lottery_type = 'ssq'
+    window = request.args.get('window', 100, type=int) or 100
+    backtest = backtest_history_rules(lottery_type, window)
+    if 'error' in backtest:
+        flash(backtest['error'], 'warning')
+        backtest = None
+    return render_template('admin/rule_backtest.html',
+                           lottery_type=lottery_type,
+                           window=window,
+                           backtest=backtest,
+                           rule_labels=HISTORY_RULES[lottery_type])
+
+@bp.route('/strategy_backtest', methods=['GET', 'POST'])
+@admin_required
+def admin_strategy_backtest():
+    """选号策略回测：逐期只用之前的开奖生成号码并对奖，比较各策略、各设置方案的中奖率和回报率"""
+    form = {
+        'lottery_type': request.form.get('lottery_type', 'ssq'),
+        'draws': request.form.get('draws', 300, type=int),
+        'tickets_per_draw': request.form.get('tickets_per_draw', 20, type=int),
+        'seed': request.form.get('seed', '').strip(),
+        'strategies': request.form.getlist('strategies') or list(STRATEGIES),
+        'profiles': request.form.get('profiles', '').strip()
+    }
+    backtest = None
+    if request.method == 'POST':
+        try:
+            profiles = json.loads(form['profiles']) if form['profiles'] else None
+            if profiles is not None and not isinstance(profiles, list):
+                raise ValueError
+        except ValueError:
+            flash('设置方案须为 JSON 数组，例如 [{"name": "方案A", "overrides": {"ssq_red_omit_1_weight": 0.1}}]。', 'danger')
+            profiles = False
+        if profiles is not False:
+            seed = int(form['seed']) if form['seed'].isdigit() else None
+            backtest = run_strategy_backtest(form['lottery_type'], form['draws'] or 0, form['tickets_per_draw'] or 0,
+                                             form['strategies'], profiles, seed)
+            if 'error' in backtest:
+                flash(backtest['error'], 'warning')
+                backtest = None
+    return render_template('admin/strategy_backtest.html', form=form, strategies=STRATEGIES, backtest=backtest)
+
+@bp.route('/combination_space')
+@admin_required
+def admin_combination_space():
+    """组合空间统计：全部红球组合中当前硬性规则允许的精确组合数"""
+    lottery_type = request.args.get('lottery_type', 'ssq')
+    if lottery_type not in ('ssq', 'dlt'):
+        lottery_type = 'ssq'
+    return render_template('admin/combination_space.html',
+                           lottery_type=lottery_type,
+                           report=combination_space_report(lottery_type),
+                           feature_labels=FEATURE_LABELS)
+
 @bp.route('/news_manage', methods=['GET', 'POST'])
 @admin_required
 def admin_news_manage():
@@ -184,10 +278,12 @@ def admin_news_manage():
                 news_item.is_public = is_public
                 flash('新闻更新成功！', 'success')
             db.session.commit()
+            bump_news_version()
         elif action == 'delete':
             news_item = News.query.get_or_404(news_id)
             db.session.delete(news_item)
             db.session.commit()
+            bump_news_version()
             flash('新闻删除成功！', 'success')
         return redirect(url_for('admin_routes.admin_news_manage'))
     return render_template('admin/news_manage.html', news_list=news_list)
@@ -2,7 +2,7 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session
 from flask_sqlalchemy import SQLAlchemy
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz # 用于处理时区
 import os
 import json
@@ -10,6 +10,7 @@ import time
 import random
 import string
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
 from utils import format_lottery_numbers, calculate_odd_even_sum # 导入 utils 中的函数
 from prediction_engine import check_lottery_rules # 导入规则检查函数
 
@@ -21,7 +22,7 @@ load_dotenv()
 from config import (
     SQLALCHEMY_DATABASE_URI, SQLALCHEMY_TRACK_MODIFICATIONS,
     SITE_NAME, SITE_URL, PER_BET_PRICE,
-    ADMIN_PASSWORD, ADMIN_ROUTE_PREFIX,
+    ADMIN_PASSWORD, ADMIN_ROUTE_PREFIX, TRUSTED_PROXY_COUNT,
     CURRENT_SETTINGS, save_settings, DEFAULT_SETTINGS,
     __version__
 )
@@ -33,6 +34,10 @@ app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = SQLALCHEMY_TRACK_MODIFICATIONS
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'super_secret_key_for_dev') # 生产环境务必设置强密钥
 
+# 反向代理之后，request.remote_addr 取 X-Forwarded-For 中由可信代理添加的客户端地址
+if TRUSTED_PROXY_COUNT > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
 # 初始化 SQLAlchemy
 db.init_app(app)
 
@@ -41,6 +46,9 @@ scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Shanghai'))
 
 # 导入数据管理模块
 from data_manager import save_draw_data, get_latest_draws, update_latest_draws
+from draw_calendar import is_draw_day
+from rule_engine import refresh_draw_rule_results
+from omission_state import ensure_omission_state
 
 # 导入路由
 import routes
@@ -64,9 +72,22 @@ def inject_global_data():
         'calculate_odd_even_sum': calculate_odd_even_sum # 将函数传递给模板
     }
 
+def scheduled_update_latest_draws():
+    """定时更新：凌晨运行时只在前一天有开奖 (按开奖日历，节假日不开奖) 时才抓取数据"""
+    yesterday = datetime.now(pytz.timezone('Asia/Shanghai')).date() - timedelta(days=1)
+    if not (is_draw_day('ssq', yesterday) or is_draw_day('dlt', yesterday)):
+        print(f"{yesterday} 没有开奖，跳过本次数据更新。")
+        return
+    with app.app_context():
+        update_latest_draws()
+
 # 数据库初始化和定时任务启动
 with app.app_context():
     db.create_all()
+    # 补齐各期开奖的规则判定 (首次运行、规则版本或相关设置变化时) 和号码遗漏状态
+    for lottery_type in ('ssq', 'dlt'):
+        refresh_draw_rule_results(lottery_type)
+        ensure_omission_state(lottery_type)
     # 检查并初始化 ADMIN_ROUTE_PREFIX
     # 注意：这里只是打印提示，实际持久化需要手动修改config.py或环境变量
     # 或者在AdminSettings表中存储
@@ -79,7 +100,7 @@ with app.app_context():
     #     pass
 
     # 启动定时任务 (例如，每天凌晨3点更新数据)
-    scheduler.add_job(func=update_latest_draws, trigger="cron", hour=3, minute=0)
+    scheduler.add_job(func=scheduled_update_latest_draws, trigger="cron", hour=3, minute=0)
     scheduler.start()
     print("APScheduler started.")
 
@@ -0,0 +1,191 @@
+# combination_index.py
+import logging
+import os
+import threading
+import time
+from itertools import combinations as iter_combinations
+import numpy as np
+from config import BASE_DIR, DEFAULT_SETTINGS, PRIZE_RULES, get_settings_version
+from data_manager import get_draw_data_version
+from draw_store import get_draw_arrays
+from prediction_model import PICK_COUNTS
+from rule_registry import compile_rules, incidence_masks, ticket_context
+from utils import combinations
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 枚举结果保存目录，文件名含格式版本，特征定义变化时递增
+INDEX_DIR = os.path.join(BASE_DIR, 'instance', 'combination_index')
+INDEX_FORMAT_VERSION = 1
+
+# 索引可能在后台线程或应用上下文之外首次构建，不使用 current_app.logger
+logger = logging.getLogger(__name__)
+
+# 每个红球组合的静态特征 (覆盖分区数按默认分区设置计算，统计时按当前设置重新计算)
+FEATURE_DTYPE = np.dtype([('areas', np.uint8), ('max_run', np.uint8), ('span', np.uint8),
+                          ('ac', np.uint8), ('sum', np.uint16)])
+
+FEATURE_LABELS = {
+    'areas': '覆盖分区数',
+    'max_run': '最长连号',
+    'span': '跨度',
+    'ac': 'AC值',
+    'sum': '和值',
+}
+
+_index_cache = {} # {lottery_type: CombinationIndex}
+_valid_cache = {} # {lottery_type: (开奖数据版本, 设置版本, 合法组合下标数组)}
+_build_lock = threading.Lock()
+
+
+class CombinationIndex:
+    """
+    某一彩种全部红球组合 (双色球 C(33,6)，大乐透前区 C(35,5)) 的枚举索引，按字典序排列。
+    masks: uint64 位掩码 (第 b 位表示号码 b)；features: 每个组合的静态特征 (FEATURE_DTYPE)。
+    两个数组都以只读内存映射方式打开，多个进程共享同一份文件页。
+    """
+    def __init__(self, lottery_type, masks, features):
+        self.lottery_type = lottery_type
+        self.masks = masks
+        self.features = features
+
+    def __len__(self):
+        return len(self.masks)
+
+    def balls(self, positions):
+        """把组合下标解码为升序红球列表"""
+        red_range = PRIZE_RULES[self.lottery_type]['red_range']
+        bits = (self.masks[np.asarray(positions)][:, None] >> np.arange(1, red_range + 1, dtype=np.uint64)) & np.uint64(1)
+        # 每行恰有 pick_count 个1，按行优先取出的列下标即各行升序号码
+        return (np.nonzero(bits)[1].reshape(len(bits), PICK_COUNTS[self.lottery_type][0]) + 1).tolist()
+
+
+def _index_paths(lottery_type):
+    prefix = os.path.join(INDEX_DIR, f'{lottery_type}_red_v{INDEX_FORMAT_VERSION}')
+    return f'{prefix}_masks.npy', f'{prefix}_features.npy'
+
+
+def _enumerate_combinations(lottery_type):
+    """枚举全部红球组合并向量化计算静态特征，返回 (masks, features)"""
+    red_range = PRIZE_RULES[lottery_type]['red_range']
+    pick_count = PICK_COUNTS[lottery_type][0]
+    balls = np.fromiter((ball for combo in iter_combinations(range(1, red_range + 1), pick_count) for ball in combo),
+                        dtype=np.uint8).reshape(-1, pick_count)
+
+    masks = np.bitwise_or.reduce(np.left_shift(np.uint64(1), balls.astype(np.uint64)), axis=1)
+    features = np.zeros(len(balls), dtype=FEATURE_DTYPE)
+
+    features['areas'] = compile_rules(lottery_type, DEFAULT_SETTINGS).red_area_counts(masks)
+
+    gaps = np.diff(balls.astype(np.int16), axis=1)
+    run = np.ones(len(balls), dtype=np.uint8)
+    max_run = run.copy()
+    for column in range(gaps.shape[1]):
+        run = np.where(gaps[:, column] == 1, run + 1, 1).astype(np.uint8)
+        max_run = np.maximum(max_run, run)
+    features['max_run'] = max_run
+
+    features['span'] = balls[:, -1] - balls[:, 0]
+    features['sum'] = balls.sum(axis=1, dtype=np.uint16)
+
+    # AC值 = 两两之差中不同取值的个数 - (号码个数 - 1)，与 calculate_ac_value_per_draw 一致
+    left, right = np.triu_indices(pick_count, k=1)
+    differences = np.sort(balls[:, right].astype(np.int16) - balls[:, left], axis=1)
+    distinct = 1 + (np.diff(differences, axis=1) != 0).sum(axis=1)
+    features['ac'] = distinct - (pick_count - 1)
+    return masks, features
+
+
+def build_combination_index(lottery_type):
+    """枚举并写入磁盘 (先写临时文件再改名，避免其他进程读到写了一半的文件)"""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    masks, features = _enumerate_combinations(lottery_type)
+    for path, array in zip(_index_paths(lottery_type), (masks, features)):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(temp_path, path)
+
+
+def get_combination_index(lottery_type):
+    """获取组合索引：磁盘上没有时枚举一次并保存，之后以内存映射方式打开并缓存"""
+    index = _index_cache.get(lottery_type)
+    if index is not None:
+        return index
+    with _build_lock:
+        index = _index_cache.get(lottery_type)
+        if index is None:
+            masks_path, features_path = _index_paths(lottery_type)
+            if not (os.path.exists(masks_path) and os.path.exists(features_path)):
+                start_time = time.time()
+                build_combination_index(lottery_type)
+                logger.info("已枚举 %s 红球组合索引，耗时 %.2f 秒", lottery_type.upper(), time.time() - start_time)
+            index = CombinationIndex(lottery_type, np.load(masks_path, mmap_mode='r'),
+                                     np.load(features_path, mmap_mode='r'))
+            _index_cache[lottery_type] = index
+    return index
+
+
+def hard_rule_masks(lottery_type, settings=None):
+    """
+    按规则集中的红球硬性规则 (与 RedConstraints 相同的几条) 对全部组合向量化判定，
+    全部组合视为最新一期之后的下一期。返回 (编译好的规则集, {规则键: 布尔数组})
+    """
+    compiled = compile_rules(lottery_type, settings)
+    index = get_combination_index(lottery_type)
+    red = get_draw_arrays(lottery_type).red
+    history_red = incidence_masks(red[max(0, len(red) - compiled.history_depth):])[::-1].tolist()
+    context = ticket_context(lottery_type, index.masks, np.uint64(0), history_red, [])
+    return compiled, compiled.passed(context, compiled.hard_rules())
+
+
+def get_valid_positions(lottery_type):
+    """满足全部红球硬性规则的组合下标，开奖数据或设置变化前复用"""
+    data_version = get_draw_data_version(lottery_type)
+    settings_version = get_settings_version()
+    cached = _valid_cache.get(lottery_type)
+    if cached and cached[0] == data_version and cached[1] == settings_version:
+        return cached[2]
+    _, rule_masks = hard_rule_masks(lottery_type)
+    positions = np.flatnonzero(np.logical_and.reduce(list(rule_masks.values())))
+    _valid_cache[lottery_type] = (data_version, settings_version, positions)
+    return positions
+
+
+def sample_valid_red(lottery_type, size, rng):
+    """在满足硬性规则的红球组合中均匀抽取 size 个 (可重复，由调用方去重)，无需拒绝采样；没有合法组合时返回 []"""
+    positions = get_valid_positions(lottery_type)
+    if len(positions) == 0:
+        return []
+    return get_combination_index(lottery_type).balls(positions[rng.integers(0, len(positions), size)])
+
+
+def _distribution(values, allowed):
+    """每个取值的组合数和其中满足规则的组合数"""
+    total_counts = np.bincount(values)
+    allowed_counts = np.bincount(values[allowed], minlength=len(total_counts))
+    return [{'value': value, 'total': int(total), 'allowed': int(allowed_count)}
+            for value, (total, allowed_count) in enumerate(zip(total_counts, allowed_counts)) if total > 0]
+
+
+def combination_space_report(lottery_type):
+    """管理后台：全部红球组合中满足当前各条硬性规则的精确组合数，以及各静态特征的分布"""
+    start_time = time.perf_counter()
+    index = get_combination_index(lottery_type)
+    compiled, rule_masks = hard_rule_masks(lottery_type)
+    allowed = np.logical_and.reduce(list(rule_masks.values()))
+    total = len(index)
+    rules = [(rule.summary(), rule_masks[rule.key]) for rule in compiled.hard_rules()] + [('全部硬性规则', allowed)]
+    blue_combinations = combinations(PRIZE_RULES[lottery_type]['blue_range'], PICK_COUNTS[lottery_type][1])
+    return {
+        'lottery_type': lottery_type,
+        'total': total,
+        'blue_combinations': blue_combinations,
+        'rules': [{'label': label, 'allowed': int(mask.sum()),
+                   'percentage': round(int(mask.sum()) / total * 100, 2)} for label, mask in rules],
+        'allowed_tickets': int(allowed.sum()) * blue_combinations,
+        'features': {name: _distribution(compiled.red_area_counts(index.masks) if name == 'areas'
+                                         else index.features[name].astype(np.int64), allowed) for name in FEATURE_LABELS},
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
@@ -9,6 +9,7 @@ __version__ = "1.0.1" # 更新版本号
 SITE_NAME = "iShoot"
 SITE_URL = "ishoot.fm787.uk"
 PER_BET_PRICE = 2 # 每注号码价格
+DLT_ADDITIONAL_BET_PRICE = 1 # 大乐透追加投注每注加价
 
 # 数据源URL
 SSQ_URL = "https://data.17500.cn/ssq_desc.txt"
@@ -25,6 +26,10 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'default_admin_password') # 从环境变量获取，或使用默认值
 ADMIN_ROUTE_PREFIX = os.environ.get('ADMIN_ROUTE_PREFIX', 'admin_xyz12') # 首次运行生成，可手动修改
 
+# 部署在反向代理 (如 Nginx) 之后时设置为代理层数，按 X-Forwarded-For 识别客户端 IP (趣味游戏每 IP 任务数限制依赖它)；
+# 直接对外服务时保持 0，否则客户端可伪造该请求头
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
 # 网站设置参数 (可从后台修改)
 DEFAULT_SETTINGS = {
     "history_page_size": 25,
@@ -46,6 +51,9 @@ DEFAULT_SETTINGS = {
     "ssq_red_area_min_count": 2,
     "ssq_red_prev_2_draws_max_repeat": 2,
     "ssq_red_max_consecutive_balls": 3, # 不出现连续4个及以上数字
+    "ssq_blue_consecutive_fail_draws": [3, 5], # 规则4.1.1: 蓝球连续开出达到任一期数即不通过
+    "ssq_red_consecutive_repeat_draws": 3, # 规则4.1.3: 红球号码连续开出达到该期数即不通过
+    "ssq_red_area_upper_bounds": [8, 16, 24], # 规则4.1.4: 红球分区上界 (1-8, 9-16, 17-24, 25-33)
     "ssq_red_omit_12_prob": 0.015,
     "ssq_red_omit_13_prob": 0.0,
     "ssq_red_omit_14_prob": 0.0,
@@ -61,11 +69,29 @@ DEFAULT_SETTINGS = {
     "dlt_red_area_min_count": 2,
     "dlt_red_prev_2_draws_max_repeat": 2,
     "dlt_red_max_consecutive_balls": 3,
+    "dlt_blue_consecutive_fail_draws": [5], # 规则4.2.1: 后区号码连续开出达到该期数即不通过
+    "dlt_red_consecutive_repeat_draws": 3, # 规则4.2.3: 前区号码连续开出达到该期数即不通过
+    "dlt_red_area_upper_bounds": [8, 16, 24], # 规则4.2.4: 前区分区上界 (1-8, 9-16, 17-24, 25-35)
     "dlt_red_omit_12_prob": 0.015,
     "dlt_red_omit_13_prob": 0.0,
     "dlt_red_omit_14_prob": 0.0,
     "prize_check_range": 10, # 对奖页面往前核对的期数范围，默认改为10期
+    "prediction_rule_check_max_tickets": 10000, # 批量规则检查一次最多号码组数
+    "prediction_batch_max_tickets": 100000, # 一次批量生成最多号码组数
+    "prediction_generate_max_tickets": 100, # 生成接口 (JSON 响应) 一次最多号码组数，更多时使用批量生成下载
+    "ever_drawn_check_max_tickets": 10000, # "是否开出过" 查询一次最多号码组数
     "fun_game_max_simulations": 20000000, # 趣味游戏最大模拟次数
+    "fun_game_mode": "vectorized", # 趣味游戏模拟方式: vectorized 批量向量化 / sampling 精确抽样 / sharded 多进程分片 / brute_force 逐期模拟
+    "fun_game_shard_workers": 0, # 多进程分片模拟的进程数，0 表示使用全部 CPU 核心
+    "fun_game_max_tickets": 20, # 趣味游戏一次最多模拟的号码组数
+    "fun_game_job_workers": 2, # 趣味游戏后台任务线程数 (修改后需重启)
+    "fun_game_jobs_per_ip": 1, # 同一 IP 同时进行的趣味游戏任务上限
+    "fun_game_job_ttl_seconds": 600, # 已结束任务结果的保留时间 (秒)
+    "fun_game_sync_timeout_seconds": 30, # 同步趣味游戏接口最长等待秒数，超时取消任务
+    "strategy_backtest_workers": 0, # 选号策略回测的进程数，0 表示使用全部 CPU 核心
+    "strategy_backtest_max_tickets": 1000, # 选号策略回测每期最多生成的号码注数
+    "page_cache_max_mb": 32, # 整页缓存的内存上限 (MB)，0 表示关闭整页缓存
+    "page_cache_ttl_seconds": 300, # 整页缓存的最长保留时间 (秒，页面上显示当前时间)，0 表示不限
     "ssq_draw_days": [2, 4, 7], # 周二、周四、周日
     "dlt_draw_days": [1, 3, 6], # 周一、周三、周六
     # "annual_holidays": [ # 默认春节和国庆后一周休息
@@ -110,9 +136,18 @@ def load_settings():
                 settings[key] = value
         return settings
 
+# 设置版本号，每次保存设置时加1
+_settings_version = 0
+
+def get_settings_version():
+    """获取网站设置的当前版本号"""
+    return _settings_version
+
 def save_settings(settings):
+    global _settings_version
     with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
         json.dump(settings, f, indent=4, ensure_ascii=False)
+    _settings_version += 1 # 依赖设置的缓存 (如预测模型) 据此失效
 
 # 加载初始设置
 CURRENT_SETTINGS = load_settings()
@@ -184,6 +219,9 @@ SETTING_LABELS_CHINESE = {
     'ssq_red_area_min_count': "双色球红球：分区最小数量",
     'ssq_red_prev_2_draws_max_repeat': "双色球红球：近2期最大重复数",
     'ssq_red_max_consecutive_balls': "双色球红球：最大连号数量",
+    'ssq_blue_consecutive_fail_draws': "双色球规则4.1.1：蓝球连续开出不通过期数 (逗号分隔)",
+    'ssq_red_consecutive_repeat_draws': "双色球规则4.1.3：红球连续开出不通过期数",
+    'ssq_red_area_upper_bounds': "双色球规则4.1.4：红球分区上界 (逗号分隔)",
     'ssq_red_omit_12_prob': "双色球红球：遗漏12期概率",
     'ssq_red_omit_13_prob': "双色球红球：遗漏13期概率",
     'ssq_red_omit_14_prob': "双色球红球：遗漏14期概率",
@@ -201,6 +239,9 @@ SETTING_LABELS_CHINESE = {
     'dlt_red_area_min_count': "大乐透红球：分区最小数量",
     'dlt_red_prev_2_draws_max_repeat': "大乐透红球：近2期最大重复数",
     'dlt_red_max_consecutive_balls': "大乐透红球：最大连号数量",
+    'dlt_blue_consecutive_fail_draws': "大乐透规则4.2.1：后区连续开出不通过期数 (逗号分隔)",
+    'dlt_red_consecutive_repeat_draws': "大乐透规则4.2.3：前区连续开出不通过期数",
+    'dlt_red_area_upper_bounds': "大乐透规则4.2.4：前区分区上界 (逗号分隔)",
     'dlt_red_omit_12_prob': "大乐透红球：遗漏12期概率",
     'dlt_red_omit_13_prob': "大乐透红球：遗漏13期概率",
     'dlt_red_omit_14_prob': "大乐透红球：遗漏14期概率",
@@ -208,6 +249,21 @@ SETTING_LABELS_CHINESE = {
     # 对奖中心设置
     'prize_check_range': "对奖中心：检查范围",
     'fun_game_max_simulations': "趣味游戏：最大模拟次数",
+    'fun_game_mode': "趣味游戏：模拟方式",
+    'fun_game_shard_workers': "趣味游戏：分片模拟进程数 (0为全部核心)",
+    'prediction_rule_check_max_tickets': "预测页面：批量规则检查最多号码组数",
+    'prediction_batch_max_tickets': "预测页面：批量生成最多号码组数",
+    'prediction_generate_max_tickets': "预测页面：单次生成最多号码组数",
+    'ever_drawn_check_max_tickets': "历史开出查询：一次最多号码组数",
+    'fun_game_max_tickets': "趣味游戏：最多号码组数",
+    'fun_game_job_workers': "趣味游戏：后台任务线程数",
+    'fun_game_jobs_per_ip': "趣味游戏：每IP并发任务数",
+    'fun_game_job_ttl_seconds': "趣味游戏：任务结果保留秒数",
+    'fun_game_sync_timeout_seconds': "趣味游戏：同步接口最长等待秒数",
+    'strategy_backtest_workers': "策略回测：进程数 (0为全部核心)",
+    'strategy_backtest_max_tickets': "策略回测：每期最多号码注数",
+    'page_cache_max_mb': "页面缓存：内存上限 (MB，0为关闭)",
+    'page_cache_ttl_seconds': "页面缓存：最长保留秒数 (0为不限)",
 
     # 开奖日期设置
     'ssq_draw_days': "双色球开奖日 (周几)",
@@ -240,8 +296,10 @@ def load_settings():
         return settings
 
 def save_settings(settings):
+    global _settings_version
     with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
         json.dump(settings, f, indent=4, ensure_ascii=False)
+    _settings_version += 1 # 依赖设置的缓存 (如预测模型) 据此失效
 
 # 加载初始设置
 CURRENT_SETTINGS = load_settings()
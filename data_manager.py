@@ -2,12 +2,20 @@
 import requests
 from datetime import datetime
 from flask import current_app
+from sqlalchemy import func
 from models import db, SSQDraw, DLTDraw
 from config import SSQ_URL, DLT_URL, USER_AGENT
 
 # 版本号，每次生成文件时更新
 __version__ = "1.0.0"
 
+# 各彩种开奖数据的版本号，每次新增开奖数据时递增，供内存缓存判断是否失效
+_draw_data_versions = {'ssq': 0, 'dlt': 0}
+
+def get_draw_data_version(lottery_type):
+    """获取彩种开奖数据的当前版本号"""
+    return _draw_data_versions.get(lottery_type, 0)
+
 def fetch_raw_data(url):
     """从指定URL获取原始文本数据"""
     headers = {'User-agent': USER_AGENT}
@@ -139,7 +147,7 @@ def parse_dlt_data(raw_data):
 
 def save_draw_data(draw_objects, lottery_type):
     """将解析后的开奖数据保存到数据库"""
-    new_entries_count = 0
+    new_draws = []
     for draw in draw_objects:
         existing_draw = None
         if lottery_type == 'ssq':
@@ -149,9 +157,18 @@ def save_draw_data(draw_objects, lottery_type):
 
         if not existing_draw:
             db.session.add(draw)
-            new_entries_count += 1
+            new_draws.append(draw)
     db.session.commit()
-    return new_entries_count
+    if new_draws:
+        _draw_data_versions[lottery_type] += 1
+        # 新开奖 (或补录的较早期号) 会影响其后各期的规则判定，整体重算并只写入变化的行
+        from rule_engine import refresh_draw_rule_results # 避免循环导入
+        from omission_state import update_omission_state
+        from drawn_index import add_drawn_draws
+        refresh_draw_rule_results(lottery_type)
+        update_omission_state(lottery_type, new_draws)
+        add_drawn_draws(lottery_type, new_draws)
+    return len(new_draws)
 
 def update_latest_draws():
     """手动或定时更新最新开奖信息"""
@@ -176,6 +193,22 @@ def get_latest_draws(model, count=1):
     """获取最新N期开奖数据"""
     return model.query.order_by(model.issue.desc()).limit(count).all()
 
+def get_average_floating_prize_amounts(model, count=None):
+    """
+    根据历史开奖数据估算浮动奖金 (一等奖、二等奖) 的平均单注金额。
+    count: 只统计最近 N 期，None 表示全部历史数据
+    返回: {'一等奖': float, '二等奖': float}，无数据时为 0
+    """
+    recent = model.query.with_entities(model.first_prize_amount, model.second_prize_amount).order_by(model.issue.desc())
+    if count:
+        recent = recent.limit(count)
+    recent = recent.subquery()
+
+    # 无人中奖的期数奖金记为0，不参与平均
+    first_avg = db.session.query(func.avg(recent.c.first_prize_amount)).filter(recent.c.first_prize_amount > 0).scalar()
+    second_avg = db.session.query(func.avg(recent.c.second_prize_amount)).filter(recent.c.second_prize_amount > 0).scalar()
+    return {'一等奖': float(first_avg or 0), '二等奖': float(second_avg or 0)}
+
 def get_draw_by_issue(model, issue):
     """根据期号获取开奖数据"""
     return model.query.filter_by(issue=issue).first()
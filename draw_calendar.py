@@ -0,0 +1,132 @@
+# draw_calendar.py
+import bisect
+from datetime import date, timedelta
+from functools import lru_cache
+from config import CURRENT_SETTINGS
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 公历每400年循环一次，且 146097 天正好是整数周，因此开奖日和节假日的分布也每400年重复一次
+CYCLE_YEARS = 400
+
+
+class DrawCalendar:
+    """
+    某一彩种的开奖日历：按年缓存全年开奖日 (去除年度节假日)，把"第 N 期之后的开奖日"换算为日期。
+    节假日判断与原逐日推算一致：节假日按当年的起始日期计算，跨年部分不延续到下一年。
+    """
+    def __init__(self, draw_days, holidays):
+        self.draw_days = frozenset(draw_days) # ISO 星期几，1=周一 ... 7=周日
+        self.holidays = holidays # ((月, 日, 持续周数), ...)
+        self._year_cache = {}
+        self._draws_per_cycle = None
+
+    def draw_days_of_year(self, year):
+        """某年全部开奖日的序数 (date.toordinal) 列表，升序"""
+        ordinals = self._year_cache.get(year)
+        if ordinals is not None:
+            return ordinals
+
+        holiday_ordinals = set()
+        for month, day, duration_weeks in self.holidays:
+            try:
+                holiday_start = date(year, month, day)
+            except ValueError: # 例如平年的 02-29
+                continue
+            holiday_end = min(holiday_start + timedelta(weeks=duration_weeks) - timedelta(days=1), date(year, 12, 31))
+            holiday_ordinals.update(range(holiday_start.toordinal(), holiday_end.toordinal() + 1))
+
+        first_ordinal = date(year, 1, 1).toordinal()
+        last_ordinal = date(year, 12, 31).toordinal()
+        # 序数 1 (0001-01-01) 是周一，因此 ISO 星期几 = (序数 - 1) % 7 + 1
+        ordinals = [o for o in range(first_ordinal, last_ordinal + 1)
+                    if (o - 1) % 7 + 1 in self.draw_days and o not in holiday_ordinals]
+        self._year_cache[year] = ordinals
+        return ordinals
+
+    def draws_per_cycle(self):
+        """每400年的开奖次数"""
+        if self._draws_per_cycle is None:
+            self._draws_per_cycle = sum(len(self.draw_days_of_year(year)) for year in range(2001, 2001 + CYCLE_YEARS))
+        return self._draws_per_cycle
+
+    def is_draw_day(self, day):
+        ordinals = self.draw_days_of_year(day.year)
+        index = bisect.bisect_left(ordinals, day.toordinal())
+        return index < len(ordinals) and ordinals[index] == day.toordinal()
+
+    def next_draw_date(self, from_date, include_today=True):
+        """from_date 当天或之后的第一个开奖日 (include_today=False 时从次日算起)，没有开奖日时返回 None"""
+        position = self.nth_draw_after(from_date if not include_today else from_date - timedelta(days=1), 1)
+        if position is None:
+            return None
+        year, month, day = position
+        return date(year, month, day)
+
+    def nth_draw_after(self, start_date, n):
+        """
+        start_date 之后 (不含当天) 的第 n 个开奖日。
+        先跳过整个400年周期，再逐年扣除开奖次数，最后在当年开奖日列表中直接定位，不逐日推算。
+        返回 (年, 月, 日)，年份可能超过 datetime 支持的 9999 年；没有任何开奖日时返回 None。
+        """
+        if n <= 0 or self.draws_per_cycle() == 0:
+            return None
+
+        # 当年剩余的开奖日
+        ordinals = self.draw_days_of_year(start_date.year)
+        remaining_index = bisect.bisect_right(ordinals, start_date.toordinal())
+        if n <= len(ordinals) - remaining_index:
+            day = date.fromordinal(ordinals[remaining_index + n - 1])
+            return day.year, day.month, day.day
+        n -= len(ordinals) - remaining_index
+
+        # 整周期跳过，year_offset 记录跳过的年数，实际计算始终在 datetime 支持的年份内进行
+        year = start_date.year + 1
+        cycles = (n - 1) // self.draws_per_cycle()
+        year_offset = cycles * CYCLE_YEARS
+        n -= cycles * self.draws_per_cycle()
+
+        while n > len(self.draw_days_of_year(year)):
+            n -= len(self.draw_days_of_year(year))
+            year += 1
+        day = date.fromordinal(self.draw_days_of_year(year)[n - 1])
+        return day.year + year_offset, day.month, day.day
+
+
+def _parse_holidays(annual_holidays):
+    holidays = []
+    for holiday in annual_holidays:
+        month, day = (int(part) for part in holiday['start'].split('-'))
+        holidays.append((month, day, int(holiday['duration_weeks'])))
+    return tuple(holidays)
+
+
+@lru_cache(maxsize=16)
+def _build_calendar(draw_days, holidays):
+    return DrawCalendar(draw_days, holidays)
+
+
+def get_draw_calendar(lottery_type):
+    """获取彩种的开奖日历，按当前开奖日和节假日设置缓存，设置修改后自动使用新的日历"""
+    draw_days = tuple(sorted(int(d) for d in CURRENT_SETTINGS.get(f'{lottery_type}_draw_days', [])))
+    holidays = _parse_holidays(CURRENT_SETTINGS.get('annual_holidays', []))
+    return _build_calendar(draw_days, holidays)
+
+
+def is_draw_day(lottery_type, day):
+    return get_draw_calendar(lottery_type).is_draw_day(day)
+
+
+def get_next_draw_date(lottery_type, from_date=None, include_today=True):
+    """下一个开奖日，默认从今天算起 (含今天)"""
+    return get_draw_calendar(lottery_type).next_draw_date(from_date or date.today(), include_today)
+
+
+def format_nth_draw_date(lottery_type, n, start_date=None):
+    """从 start_date (默认今天，不含当天) 起第 n 个开奖日，格式化为中文日期；无法推算时返回 None"""
+    position = get_draw_calendar(lottery_type).nth_draw_after(start_date or date.today(), n)
+    if position is None:
+        return None
+    year, month, day = position
+    return f"{year:04d}年{month:02d}月{day:02d}日"
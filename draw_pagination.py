@@ -0,0 +1,137 @@
+# draw_pagination.py
+import threading
+from collections import OrderedDict
+from math import ceil
+from data_manager import get_draw_data_version
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 最多缓存多少组 (彩种, 日期筛选, 每页条数) 的总期数和页首期号，超出时淘汰最久未使用的
+CHECKPOINT_CACHE_SIZE = 64
+
+# {(彩种, 开始日期, 结束日期, 每页条数): (开奖数据版本, 总期数, [各页第一期的期号 (降序)])}
+_checkpoint_cache = OrderedDict()
+_checkpoint_lock = threading.Lock()
+
+
+class KeysetPage:
+    """
+    按期号游标 (keyset) 分页的一页开奖数据，属性与 Flask-SQLAlchemy 的 Pagination 相同 (模板中的页码导航不变)，
+    另有 prev_cursor / next_cursor: 上一页/下一页的游标期号 (没有时为 None)。
+    """
+    def __init__(self, items, page, per_page, total, prev_cursor, next_cursor):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+
+    @property
+    def pages(self):
+        return int(ceil(self.total / float(self.per_page))) if self.per_page else 0
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=5, right_edge=2):
+        """与 Pagination.iter_pages 相同：依次产出要显示的页码，省略的部分为 None"""
+        last = 0
+        for num in range(1, self.pages + 1):
+            if (num <= left_edge or self.page - left_current - 1 < num < self.page + right_current
+                    or num > self.pages - right_edge):
+                if last + 1 != num:
+                    yield None
+                yield num
+                last = num
+
+
+def _filtered_query(model_class, start_date, end_date):
+    query = model_class.query
+    if start_date:
+        query = query.filter(model_class.draw_date >= start_date)
+    if end_date:
+        query = query.filter(model_class.draw_date <= end_date)
+    return query
+
+
+def _page_checkpoints(lottery_type, model_class, start_date, end_date, per_page):
+    """
+    筛选条件下的总期数和各页第一期的期号 (页码 p 的第一期为 checkpoints[p-1])。
+    只按期号索引查询期号一列，开奖数据不变时复用，代替每次请求的 COUNT(*) 和 OFFSET。
+    """
+    key = (lottery_type, start_date, end_date, per_page)
+    data_version = get_draw_data_version(lottery_type)
+    with _checkpoint_lock:
+        cached = _checkpoint_cache.get(key)
+        if cached and cached[0] == data_version:
+            _checkpoint_cache.move_to_end(key)
+            return cached[1], cached[2]
+
+    issues = [issue for issue, in _filtered_query(model_class, start_date, end_date)
+              .with_entities(model_class.issue).order_by(model_class.issue.desc())]
+    checkpoints = issues[::per_page]
+    with _checkpoint_lock:
+        _checkpoint_cache[key] = (data_version, len(issues), checkpoints)
+        _checkpoint_cache.move_to_end(key)
+        while len(_checkpoint_cache) > CHECKPOINT_CACHE_SIZE:
+            _checkpoint_cache.popitem(last=False)
+    return len(issues), checkpoints
+
+
+def _page_of_issue(checkpoints, issue):
+    """期号所在的页码 (页首期号不小于该期号的页数)"""
+    low, high = 0, len(checkpoints)
+    while low < high: # checkpoints 为降序，二分查找第一个小于 issue 的页首
+        middle = (low + high) // 2
+        if checkpoints[middle] >= issue:
+            low = middle + 1
+        else:
+            high = middle
+    return max(low, 1)
+
+
+def paginate_draws(lottery_type, model_class, start_date=None, end_date=None, page=1, per_page=20,
+                   after=None, before=None):
+    """
+    按期号降序分页查询开奖数据 (期号索引上的 keyset 分页，任意页的查询代价相同)。
+    after: 下一页游标，返回期号小于它的 per_page 期；before: 上一页游标，返回期号大于它的 per_page 期；
+    都没有时按页码，从缓存的页首期号开始取。与 paginate(error_out=False) 一样，页码超出范围时返回空页。
+    """
+    if page < 1:
+        page = 1
+    if per_page < 1:
+        per_page = 20
+    total, checkpoints = _page_checkpoints(lottery_type, model_class, start_date, end_date, per_page)
+    query = _filtered_query(model_class, start_date, end_date)
+
+    if after:
+        items = query.filter(model_class.issue < after).order_by(model_class.issue.desc()).limit(per_page).all()
+    elif before:
+        items = query.filter(model_class.issue > before).order_by(model_class.issue.asc()).limit(per_page).all()[::-1]
+    elif page <= len(checkpoints):
+        items = query.filter(model_class.issue <= checkpoints[page - 1]).order_by(model_class.issue.desc()).limit(per_page).all()
+    else:
+        items = []
+
+    if (after or before) and items:
+        page = _page_of_issue(checkpoints, items[0].issue) # 游标翻页时按本页第一期确定页码
+    result = KeysetPage(items, page, per_page, total, None, None)
+    if items:
+        result.prev_cursor = items[0].issue if result.has_prev else None
+        result.next_cursor = items[-1].issue if result.has_next else None
+    return result
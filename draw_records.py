@@ -0,0 +1,53 @@
+# draw_records.py
+from collections import namedtuple
+from sqlalchemy import select
+from models import db, SSQDraw, DLTDraw
+from rule_registry import balls_mask
+from utils import format_lottery_numbers
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+
+class DrawRecord(namedtuple('DrawRecord', ('issue', 'draw_date', 'red', 'blue'))):
+    """
+    一期开奖的只读记录，只含期号、开奖日期和号码 (red / blue 为升序整数元组)。
+    基于元组、没有实例字典 (__slots__ 为空)，不能修改属性；
+    提供与 ORM 开奖对象相同的 get_red_balls_list / get_blue_balls_list，可直接传给 utils 中的统计函数。
+    """
+    __slots__ = ()
+
+    def get_red_balls_list(self):
+        return list(self.red)
+
+    def get_blue_balls_list(self):
+        return list(self.blue)
+
+    @property
+    def red_mask(self):
+        return balls_mask(self.red)
+
+    @property
+    def blue_mask(self):
+        return balls_mask(self.blue)
+
+
+def load_draw_records(lottery_type, start_date=None, end_date=None, max_issue=None, limit=None, newest_first=True):
+    """
+    按期号排序读取开奖记录 (DrawRecord 列表)，用 Core 查询只取期号、日期和号码四列，不创建 ORM 对象。
+    start_date / end_date: 开奖日期范围 (含两端)；max_issue: 只取该期号及之前的开奖；
+    limit: 最多取多少期 (从 newest_first 指定的一端开始)，None 表示不限。
+    """
+    table = (SSQDraw if lottery_type == 'ssq' else DLTDraw).__table__
+    query = select(table.c.issue, table.c.draw_date, table.c.red_balls, table.c.blue_balls)
+    if start_date:
+        query = query.where(table.c.draw_date >= start_date)
+    if end_date:
+        query = query.where(table.c.draw_date <= end_date)
+    if max_issue is not None:
+        query = query.where(table.c.issue <= max_issue)
+    query = query.order_by(table.c.issue.desc() if newest_first else table.c.issue.asc())
+    if limit:
+        query = query.limit(limit)
+    return [DrawRecord(issue, draw_date, tuple(format_lottery_numbers(red_balls)), tuple(format_lottery_numbers(blue_balls)))
+            for issue, draw_date, red_balls, blue_balls in db.session.execute(query)]
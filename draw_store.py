@@ -0,0 +1,215 @@
+# draw_store.py
+import numpy as np
+from models import SSQDraw, DLTDraw
+from config import PRIZE_RULES, PER_BET_PRICE, DLT_ADDITIONAL_BET_PRICE
+from utils import combinations, get_prize_levels, format_lottery_numbers, calculate_combination_cost, validate_ticket_balls
+from data_manager import get_draw_data_version
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 各奖级对应的开奖数据奖金字段
+PRIZE_AMOUNT_COLUMNS = {
+    '一等奖': 'first_prize_amount',
+    '二等奖': 'second_prize_amount',
+    '三等奖': 'third_prize_amount',
+    '四等奖': 'fourth_prize_amount',
+    '五等奖': 'fifth_prize_amount',
+    '六等奖': 'sixth_prize_amount',
+    '七等奖': 'seventh_prize_amount',
+    '八等奖': 'eighth_prize_amount',
+    '九等奖': 'ninth_prize_amount',
+}
+
+# 大乐透追加投注奖金字段 (目前只有一、二等奖设有追加)
+ADDITIONAL_PRIZE_AMOUNT_COLUMNS = {
+    '一等奖': 'additional_first_prize_amount',
+    '二等奖': 'additional_second_prize_amount',
+}
+
+_draw_arrays_cache = {} # {lottery_type: (data_version, DrawArrays)}
+
+
+class DrawArrays:
+    """
+    某一彩种全部历史开奖的数组形式，按期号升序排列 (最早在前)。
+    red / blue: 形如 (期数, 号码范围+1) 的 0/1 矩阵，第 i 行第 b 列为 1 表示第 i 期开出号码 b
+    level_amounts: 形如 (期数, 奖级数) 的每注实际奖金
+    additional_amounts: 同上，大乐透追加奖金 (双色球全为0)
+    """
+    def __init__(self, lottery_type, issues, draw_dates, red, blue, level_amounts, additional_amounts):
+        self.lottery_type = lottery_type
+        self.issues = issues
+        self.draw_dates = draw_dates
+        self.red = red
+        self.blue = blue
+        self.level_amounts = level_amounts
+        self.additional_amounts = additional_amounts
+
+    def __len__(self):
+        return len(self.issues)
+
+
+def _load_draw_arrays(lottery_type):
+    model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
+    rules = PRIZE_RULES[lottery_type]
+    levels = get_prize_levels(lottery_type)
+    amount_columns = [getattr(model_class, PRIZE_AMOUNT_COLUMNS[level]) for level in levels]
+    additional_levels = [level for level in levels if level in ADDITIONAL_PRIZE_AMOUNT_COLUMNS] if lottery_type == 'dlt' else []
+    additional_columns = [getattr(model_class, ADDITIONAL_PRIZE_AMOUNT_COLUMNS[level]) for level in additional_levels]
+
+    # 只取需要的字段，不加载完整的 ORM 对象
+    rows = model_class.query.with_entities(
+        model_class.issue, model_class.draw_date, model_class.red_balls, model_class.blue_balls,
+        *amount_columns, *additional_columns
+    ).order_by(model_class.issue.asc()).all()
+
+    count = len(rows)
+    red = np.zeros((count, rules['red_range'] + 1), dtype=np.int8)
+    blue = np.zeros((count, rules['blue_range'] + 1), dtype=np.int8)
+    level_amounts = np.zeros((count, len(levels)), dtype=np.float64)
+    additional_amounts = np.zeros((count, len(levels)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        red[i, format_lottery_numbers(row[2])] = 1
+        blue[i, format_lottery_numbers(row[3])] = 1
+        level_amounts[i] = [amount or 0 for amount in row[4:4 + len(levels)]]
+        for j, level in enumerate(additional_levels):
+            additional_amounts[i, levels.index(level)] = row[4 + len(levels) + j] or 0
+
+    # 某期奖金缺失 (如当期无人中一等奖) 时，固定奖级取规则金额，浮动奖级取历史平均值
+    for j, level in enumerate(levels):
+        missing = level_amounts[:, j] <= 0
+        if not missing.any():
+            continue
+        fixed_amount = next(p['amount'] for p in rules['prizes'] if p['level'] == level)
+        if fixed_amount != '浮动':
+            level_amounts[missing, j] = fixed_amount
+        elif (~missing).any():
+            level_amounts[missing, j] = level_amounts[~missing, j].mean()
+
+    return DrawArrays(lottery_type, [row[0] for row in rows], [row[1] for row in rows],
+                      red, blue, level_amounts, additional_amounts)
+
+
+def get_draw_arrays(lottery_type):
+    """获取彩种的开奖数组，新增开奖数据前一直复用内存中的结果"""
+    data_version = get_draw_data_version(lottery_type)
+    cached = _draw_arrays_cache.get(lottery_type)
+    if cached and cached[0] == data_version:
+        return cached[1]
+    draw_arrays = _load_draw_arrays(lottery_type)
+    _draw_arrays_cache[lottery_type] = (data_version, draw_arrays)
+    return draw_arrays
+
+
+def _zone_bets_table(bet_size, banker_count, drag_count):
+    """
+    单个号码区的注数表: table[dm, tm, m] 为开奖命中 dm 个胆码、tm 个拖码时，命中 m 个号码的注数。
+    """
+    drag_pick = bet_size - banker_count
+    table = np.zeros((banker_count + 1, drag_count + 1, bet_size + 1), dtype=np.int64)
+    for dm in range(banker_count + 1):
+        for tm in range(drag_count + 1):
+            for j in range(min(tm, drag_pick) + 1):
+                table[dm, tm, dm + j] = combinations(tm, j) * combinations(drag_count - tm, drag_pick - j)
+    return table
+
+
+def _ticket_level_counts(draw_arrays, red_balls, blue_balls, banker_red_balls, banker_blue_balls):
+    """向量化计算一张复式/胆拖彩票在每一期的各奖级中奖注数，返回 (期数, 奖级数) 矩阵"""
+    lottery_type = draw_arrays.lottery_type
+    rules = PRIZE_RULES[lottery_type]
+    levels = get_prize_levels(lottery_type)
+    standard_red_count = 6 if lottery_type == 'ssq' else 5
+    standard_blue_count = 1 if lottery_type == 'ssq' else 2
+
+    # 每期命中的胆码/拖码个数 = 开奖矩阵中对应列之和
+    red_dm = draw_arrays.red[:, banker_red_balls].sum(axis=1)
+    red_tm = draw_arrays.red[:, red_balls].sum(axis=1)
+    blue_dm = draw_arrays.blue[:, banker_blue_balls].sum(axis=1)
+    blue_tm = draw_arrays.blue[:, blue_balls].sum(axis=1)
+
+    red_table = _zone_bets_table(standard_red_count, len(banker_red_balls), len(red_balls))[red_dm, red_tm]
+    blue_table = _zone_bets_table(standard_blue_count, len(banker_blue_balls), len(blue_balls))[blue_dm, blue_tm]
+
+    level_counts = np.zeros((len(draw_arrays), len(levels)), dtype=np.int64)
+    for prize_rule in rules['prizes']:
+        level_counts[:, levels.index(prize_rule['level'])] += red_table[:, prize_rule['match_red']] * blue_table[:, prize_rule['match_blue']]
+    return level_counts
+
+
+def backtest_tickets(lottery_type, tickets, check_range=0, additional=False):
+    """
+    历史回测：假设每期都购买同一组投注，按每期实际开奖奖金计算逐期花费、回报和回报率。
+    tickets: [{'red_balls': [...], 'blue_balls': [...], 'banker_red_balls': [...], 'banker_blue_balls': [...]}, ...]
+    check_range: 只回测最近 N 期，0 表示全部历史数据
+    additional: 是否大乐透追加投注 (每注加价，一、二等奖另得追加奖金)
+    返回: 每组投注的汇总结果，以及整个策略的累计花费/回报/回报率曲线；
+          号码无效时返回 {'error': ...} (号码直接用作开奖矩阵的列下标，必须先检查)，无开奖数据时返回 {'error': '未找到历史开奖数据'}
+    """
+    for ticket in tickets:
+        error = validate_ticket_balls(ticket.get('red_balls', []), ticket.get('blue_balls', []), lottery_type,
+                                      ticket.get('banker_red_balls', []), ticket.get('banker_blue_balls', []))
+        if error:
+            return {'error': error}
+
+    draw_arrays = get_draw_arrays(lottery_type)
+    if len(draw_arrays) == 0:
+        return {'error': '未找到历史开奖数据'}
+
+    start = len(draw_arrays) - check_range if 0 < check_range < len(draw_arrays) else 0
+    additional = additional and lottery_type == 'dlt'
+    bet_price = PER_BET_PRICE + (DLT_ADDITIONAL_BET_PRICE if additional else 0)
+    amounts = draw_arrays.level_amounts[start:]
+    if additional:
+        amounts = amounts + draw_arrays.additional_amounts[start:]
+    levels = get_prize_levels(lottery_type)
+
+    ticket_results = []
+    total_cost_per_draw = 0
+    payout_per_draw = np.zeros(len(draw_arrays) - start, dtype=np.float64)
+    for ticket in tickets:
+        red_balls = ticket.get('red_balls', [])
+        blue_balls = ticket.get('blue_balls', [])
+        banker_red_balls = ticket.get('banker_red_balls', [])
+        banker_blue_balls = ticket.get('banker_blue_balls', [])
+
+        level_counts = _ticket_level_counts(draw_arrays, red_balls, blue_balls, banker_red_balls, banker_blue_balls)[start:]
+        ticket_payout = (level_counts * amounts).sum(axis=1)
+        bets_per_draw = calculate_combination_cost(len(red_balls), len(blue_balls), lottery_type,
+                                                   len(banker_red_balls), len(banker_blue_balls))['total_bets']
+        cost_per_draw = bets_per_draw * bet_price
+        total_cost = cost_per_draw * len(ticket_payout)
+        total_payout = float(ticket_payout.sum())
+
+        total_cost_per_draw += cost_per_draw
+        payout_per_draw += ticket_payout
+        ticket_results.append({
+            'input_red_balls': red_balls,
+            'input_blue_balls': blue_balls,
+            'banker_red_balls': banker_red_balls,
+            'banker_blue_balls': banker_blue_balls,
+            'total_bets_per_draw': bets_per_draw,
+            'cost_per_draw': cost_per_draw,
+            'total_cost': total_cost,
+            'total_payout': total_payout,
+            'winning_draws': int((ticket_payout > 0).sum()),
+            'level_counts': {level: int(count) for level, count in zip(levels, level_counts.sum(axis=0)) if count > 0},
+            'return_rate': round(total_payout / total_cost * 100, 2) if total_cost > 0 else 0.0
+        })
+
+    cumulative_cost = total_cost_per_draw * np.arange(1, len(payout_per_draw) + 1, dtype=np.float64)
+    cumulative_payout = np.cumsum(payout_per_draw)
+    roi_curve = np.divide(cumulative_payout - cumulative_cost, cumulative_cost,
+                          out=np.zeros_like(cumulative_cost), where=cumulative_cost > 0) * 100
+
+    return {
+        'lottery_type': lottery_type,
+        'additional': additional,
+        'draws_count': len(payout_per_draw),
+        'issues': draw_arrays.issues[start:],
+        'results': ticket_results,
+        'cumulative_cost': cumulative_cost.tolist(),
+        'cumulative_payout': cumulative_payout.tolist(),
+        'roi': np.round(roi_curve, 2).tolist() # 累计投资回报率 (%) = (累计回报 - 累计花费) / 累计花费
+    }
@@ -0,0 +1,69 @@
+# drawn_index.py
+from data_manager import get_draw_data_version
+from draw_records import load_draw_records
+from prediction_model import PICK_COUNTS
+from rule_engine import balls_mask
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+_indexes = {} # {lottery_type: (开奖数据版本, DrawnIndex)}
+
+
+class DrawnIndex:
+    """
+    某一彩种历史开奖号码的哈希索引，回答 "这注号码是否开出过" 为 O(1):
+    tickets: {(红球掩码, 蓝球掩码): [期号, ...]}，reds: {红球掩码: [期号, ...]}
+    """
+    def __init__(self, lottery_type):
+        self.lottery_type = lottery_type
+        self.tickets = {}
+        self.reds = {}
+
+    def add(self, issue, red_balls, blue_balls):
+        red_mask = balls_mask(red_balls)
+        self.tickets.setdefault((red_mask, balls_mask(blue_balls)), []).append(issue)
+        self.reds.setdefault(red_mask, []).append(issue)
+
+    def lookup(self, red_balls, blue_balls):
+        """
+        返回 {'drawn_issues': 整注号码开出过的期号, 'red_drawn_issues': 红球完全相同的期号}。
+        只对单式号码有意义，红球或蓝球个数不是一注的个数时两项都为 None。
+        """
+        red_count, blue_count = PICK_COUNTS[self.lottery_type]
+        if len(set(red_balls)) != red_count or len(set(blue_balls)) != blue_count:
+            return {'drawn_issues': None, 'red_drawn_issues': None}
+        red_mask = balls_mask(red_balls)
+        return {'drawn_issues': sorted(self.tickets.get((red_mask, balls_mask(blue_balls)), [])),
+                'red_drawn_issues': sorted(self.reds.get(red_mask, []))}
+
+
+def _build_drawn_index(lottery_type):
+    index = DrawnIndex(lottery_type)
+    for draw in load_draw_records(lottery_type, newest_first=False):
+        index.add(draw.issue, draw.red, draw.blue)
+    return index
+
+
+def get_drawn_index(lottery_type):
+    """获取彩种的开奖号码索引，首次使用时一次查询建立，之后由入库时增量更新"""
+    data_version = get_draw_data_version(lottery_type)
+    cached = _indexes.get(lottery_type)
+    if cached and cached[0] == data_version:
+        return cached[1]
+    index = _build_drawn_index(lottery_type)
+    _indexes[lottery_type] = (data_version, index)
+    return index
+
+
+def add_drawn_draws(lottery_type, new_draws):
+    """新开奖入库后把新号码加入已建立的索引 (尚未建立时等首次使用再建立)"""
+    cached = _indexes.get(lottery_type)
+    data_version = get_draw_data_version(lottery_type)
+    # 入库后数据版本已递增，期间其他线程若已按新版本重建索引，新号码已在其中，不能重复加入
+    if not cached or cached[0] == data_version:
+        return
+    index = cached[1]
+    for draw in new_draws:
+        index.add(draw.issue, draw.get_red_balls_list(), draw.get_blue_balls_list())
+    _indexes[lottery_type] = (data_version, index)
@@ -0,0 +1,275 @@
+# fun_game_engine.py
+import os
+from collections import deque
+from itertools import islice
+import numpy as np
+from config import PRIZE_RULES
+from process_pools import get_process_pool
+from utils import calculate_prize_details, get_prize_levels, ticket_outcome_distribution
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+DEFAULT_BLOCK_SIZE = 200000 # 每批模拟的开奖期数
+SHARD_SIZE = 2000000 # 分片模拟时每个分片的开奖期数 (固定值，保证同一种子在不同核数下结果一致)
+
+
+def draw_block(rng, size, ball_range, draw_size):
+    """
+    批量生成 size 期虚拟开奖号码，返回形如 (size, draw_size) 的矩阵，每行升序排列。
+    先有放回地抽取，再拒绝含重复号码的行并重新抽取，结果与逐期 random.sample 同分布。
+    """
+    draws = np.empty((size, draw_size), dtype=np.int8)
+    pending = np.arange(size)
+    while pending.size:
+        candidates = rng.integers(1, ball_range + 1, (pending.size, draw_size), dtype=np.int8)
+        candidates.sort(axis=1)
+        distinct = (candidates[:, 1:] != candidates[:, :-1]).all(axis=1)
+        draws[pending[distinct]] = candidates[distinct]
+        pending = pending[~distinct]
+    return draws
+
+
+def ticket_level_table(user_red_balls, user_blue_balls, lottery_type):
+    """
+    预先计算中奖注数表: table[红球命中数, 蓝球命中数] 为各奖级中奖注数 (顺序与 get_prize_levels 一致)。
+    表中每一项都由 calculate_prize_details 计算，保证与逐期对奖的结果一致。
+    """
+    rules = PRIZE_RULES[lottery_type]
+    levels = get_prize_levels(lottery_type)
+    num_red_balls_to_draw = 6 if lottery_type == 'ssq' else 5
+    num_blue_balls_to_draw = 1 if lottery_type == 'ssq' else 2
+    other_red_balls = [b for b in range(1, rules['red_range'] + 1) if b not in user_red_balls]
+    other_blue_balls = [b for b in range(1, rules['blue_range'] + 1) if b not in user_blue_balls]
+
+    table = np.zeros((num_red_balls_to_draw + 1, num_blue_balls_to_draw + 1, len(levels)), dtype=np.int64)
+    for red_matches in range(num_red_balls_to_draw + 1):
+        if red_matches > len(user_red_balls) or num_red_balls_to_draw - red_matches > len(other_red_balls):
+            continue
+        draw_red_balls = list(user_red_balls[:red_matches]) + other_red_balls[:num_red_balls_to_draw - red_matches]
+        for blue_matches in range(num_blue_balls_to_draw + 1):
+            if blue_matches > len(user_blue_balls) or num_blue_balls_to_draw - blue_matches > len(other_blue_balls):
+                continue
+            draw_blue_balls = list(user_blue_balls[:blue_matches]) + other_blue_balls[:num_blue_balls_to_draw - blue_matches]
+            prize_details = calculate_prize_details(user_red_balls, user_blue_balls,
+                                                    sorted(draw_red_balls), sorted(draw_blue_balls), lottery_type)
+            for level, count in prize_details.items():
+                table[red_matches, blue_matches, levels.index(level)] = count
+    return table
+
+
+def ball_mask(balls, ball_range):
+    """号码列表转为长度 ball_range+1 的 0/1 向量，便于按下标查表统计命中数"""
+    mask = np.zeros(ball_range + 1, dtype=np.int8)
+    mask[list(balls)] = 1
+    return mask
+
+
+def match_counts(masks, draws):
+    """
+    统计多组号码在每期开奖中的命中数，返回形如 (号码组数, 期数) 的 int8 矩阵。
+    只有一组号码时直接按下标查表；多组号码时先把开奖转为 0/1 矩阵，再用一次矩阵乘法算出所有号码的命中数。
+    """
+    if len(masks) == 1:
+        return masks[:, draws].sum(axis=2, dtype=np.int8)
+    size, ball_range_plus_one = len(draws), masks.shape[1]
+    incidence = np.zeros(size * ball_range_plus_one, dtype=np.float32)
+    incidence[(np.arange(size) * ball_range_plus_one)[:, None] + draws] = 1
+    incidence = incidence.reshape(size, ball_range_plus_one)
+    return (masks.astype(np.float32) @ incidence.T).astype(np.int8)
+
+
+def _level_totals_dict(levels, level_totals):
+    """奖级注数数组转为 {奖级: 中奖注数}，只保留中奖的奖级"""
+    return {level: int(count) for level, count in zip(levels, level_totals) if count > 0}
+
+
+def run_vectorized_simulation_multi(tickets, lottery_type, max_simulations,
+                                    rng=None, block_size=DEFAULT_BLOCK_SIZE, progress_callback=None):
+    """
+    多组号码共用同一串虚拟开奖的向量化模拟：每批生成 block_size 期开奖，一次性统计所有号码的命中数，
+    再分别查各自的中奖注数表。每组号码只统计到自己第一次中一等奖的那一期 (含)，
+    全部号码都中得一等奖或达到最大模拟次数时结束。
+    tickets: [(红球列表, 蓝球列表), ...]
+    progress_callback(已模拟期数, [{奖级: 中奖注数}, ...]): 每批结束后调用一次，返回 True 时提前结束
+    返回: [(是否中得一等奖, 模拟期数, {奖级: 中奖注数}), ...]，顺序与 tickets 一致
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    rules = PRIZE_RULES[lottery_type]
+    levels = get_prize_levels(lottery_type)
+    num_red_balls_to_draw = 6 if lottery_type == 'ssq' else 5
+    num_blue_balls_to_draw = 1 if lottery_type == 'ssq' else 2
+    first_prize_index = levels.index('一等奖')
+
+    # 中奖注数表展开为二维: 第 (红球命中数 * (蓝球开奖数+1) + 蓝球命中数) 行为该命中情况下各奖级的注数
+    outcome_count = (num_red_balls_to_draw + 1) * (num_blue_balls_to_draw + 1)
+    outcome_tables = [ticket_level_table(red_balls, blue_balls, lottery_type).reshape(outcome_count, len(levels))
+                      for red_balls, blue_balls in tickets]
+    jackpot_outcomes = [table[:, first_prize_index] > 0 for table in outcome_tables]
+    red_masks = np.array([ball_mask(red_balls, rules['red_range']) for red_balls, _ in tickets])
+    blue_masks = np.array([ball_mask(blue_balls, rules['blue_range']) for _, blue_balls in tickets])
+
+    level_totals = np.zeros((len(tickets), len(levels)), dtype=np.int64)
+    ticket_draw_counts = [None] * len(tickets) # 中得一等奖的期数，未中为 None
+    draw_count = 0
+    while draw_count < max_simulations and None in ticket_draw_counts:
+        size = min(block_size, max_simulations - draw_count)
+        red_draws = draw_block(rng, size, rules['red_range'], num_red_balls_to_draw)
+        blue_draws = draw_block(rng, size, rules['blue_range'], num_blue_balls_to_draw)
+        # 形如 (号码组数, 期数) 的命中情况编号矩阵
+        red_matches = match_counts(red_masks, red_draws)
+        blue_matches = match_counts(blue_masks, blue_draws)
+        outcomes = red_matches * np.int8(num_blue_balls_to_draw + 1) + blue_matches
+
+        for i, outcome_table in enumerate(outcome_tables):
+            if ticket_draw_counts[i] is not None:
+                continue
+            ticket_outcomes = outcomes[i]
+            jackpot_draws = np.flatnonzero(jackpot_outcomes[i][ticket_outcomes])
+            if jackpot_draws.size:
+                # 只统计到第一次中一等奖的那一期 (含)
+                ticket_outcomes = ticket_outcomes[:int(jackpot_draws[0]) + 1]
+                ticket_draw_counts[i] = draw_count + int(jackpot_draws[0]) + 1
+            # 先统计每种命中情况出现的期数，再乘以注数表，避免逐期展开各奖级
+            level_totals[i] += np.bincount(ticket_outcomes, minlength=outcome_count) @ outcome_table
+        draw_count += size
+
+        if None not in ticket_draw_counts:
+            break
+        if progress_callback and progress_callback(draw_count, [_level_totals_dict(levels, totals) for totals in level_totals]):
+            break
+
+    return [(ticket_draw_counts[i] is not None,
+             ticket_draw_counts[i] if ticket_draw_counts[i] is not None else draw_count,
+             _level_totals_dict(levels, level_totals[i]))
+            for i in range(len(tickets))]
+
+
+def run_vectorized_simulation(user_red_balls, user_blue_balls, lottery_type, max_simulations,
+                              rng=None, block_size=DEFAULT_BLOCK_SIZE, progress_callback=None):
+    """
+    单组号码的向量化模拟，见 run_vectorized_simulation_multi。
+    progress_callback(已模拟期数, {奖级: 中奖注数}): 每批结束后调用一次，返回 True 时提前结束
+    返回: (是否中得一等奖, 模拟期数, {奖级: 中奖注数})
+    """
+    multi_callback = None
+    if progress_callback:
+        multi_callback = lambda draw_count, ticket_totals: progress_callback(draw_count, ticket_totals[0])
+    return run_vectorized_simulation_multi([(user_red_balls, user_blue_balls)], lottery_type, max_simulations,
+                                           rng=rng, block_size=block_size, progress_callback=multi_callback)[0]
+
+
+def run_sampled_simulation(user_red_balls, user_blue_balls, lottery_type, max_simulations, rng=None):
+    """
+    精确抽样的趣味游戏：不逐期模拟，而是按每期开奖结果的精确分布直接抽样，耗时与模拟期数无关。
+    1. 一等奖等待期数服从几何分布，直接抽取中奖期数 N；
+    2. 中奖前的 N-1 期在"未中一等奖"的结果中做多项分布抽样，中奖那一期在"中一等奖"的结果中抽样一次；
+    3. 若 N 超过最大模拟次数，则视为未中奖，max_simulations 期全部按多项分布抽样。
+    结果与逐期模拟同分布。
+    返回: (是否中得一等奖, 模拟期数, {奖级: 中奖注数})
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    levels = get_prize_levels(lottery_type)
+    first_prize_index = levels.index('一等奖')
+
+    distribution = ticket_outcome_distribution(lottery_type, 0, len(set(user_red_balls)), 0, len(set(user_blue_balls)))
+    probabilities = np.array([prob for prob, _ in distribution], dtype=np.float64)
+    level_counts = np.array([counts for _, counts in distribution], dtype=np.int64).reshape(len(distribution), len(levels))
+    is_jackpot = level_counts[:, first_prize_index] > 0
+    jackpot_probability = float(probabilities[is_jackpot].sum())
+
+    first_prize_found = False
+    draw_count = max_simulations
+    if jackpot_probability > 0:
+        jackpot_draw = int(rng.geometric(jackpot_probability))
+        if jackpot_draw <= max_simulations:
+            first_prize_found = True
+            draw_count = jackpot_draw
+
+    outcome_totals = np.zeros(len(distribution), dtype=np.int64)
+    non_jackpot_draws = draw_count - 1 if first_prize_found else draw_count
+    non_jackpot_probabilities = np.where(is_jackpot, 0.0, probabilities)
+    if non_jackpot_draws > 0 and non_jackpot_probabilities.sum() > 0:
+        outcome_totals += rng.multinomial(non_jackpot_draws, non_jackpot_probabilities / non_jackpot_probabilities.sum())
+    if first_prize_found:
+        jackpot_probabilities = np.where(is_jackpot, probabilities, 0.0)
+        outcome_totals[rng.choice(len(distribution), p=jackpot_probabilities / jackpot_probabilities.sum())] += 1
+
+    level_totals = outcome_totals @ level_counts
+    return first_prize_found, draw_count, _level_totals_dict(levels, level_totals)
+
+
+def _run_shard(tickets, lottery_type, shard_size, seed_sequence):
+    """子进程中执行单个分片：用分片自己的随机数流跑向量化模拟"""
+    return run_vectorized_simulation_multi(tickets, lottery_type, shard_size,
+                                           rng=np.random.default_rng(seed_sequence))
+
+
+def run_sharded_simulation_multi(tickets, lottery_type, max_simulations,
+                                 seed=None, workers=None, progress_callback=None):
+    """
+    多进程分片模拟：把 max_simulations 期按 SHARD_SIZE 切成若干分片，每个分片使用由种子派生的独立随机数流
+    (SeedSequence.spawn)，交给进程池并行模拟，所有号码共用每个分片的开奖。
+    按分片顺序合并结果：对每组号码，第一个出现一等奖的分片即为最早中奖的一期，其后的分片不再计入；
+    全部号码都已中奖时，剩余分片全部丢弃。
+    分片大小固定，因此同一 seed 无论使用多少个进程，结果都完全相同。
+    workers: 进程数，默认使用全部 CPU 核心
+    progress_callback(已模拟期数, [{奖级: 中奖注数}, ...]): 每合并一个分片调用一次，返回 True 时提前结束
+    返回: [(是否中得一等奖, 模拟期数, {奖级: 中奖注数}), ...]，顺序与 tickets 一致
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_sizes = [min(SHARD_SIZE, max_simulations - start) for start in range(0, max_simulations, SHARD_SIZE)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+
+    # 按顺序逐步提交分片，同时最多 workers * 2 个在进程池中，全部号码中奖后不再提交
+    pool = get_process_pool(workers)
+    pending_shards = zip(shard_sizes, seed_sequences)
+    in_flight = deque()
+
+    def submit_next_shards():
+        for shard_size, seed_sequence in islice(pending_shards, workers * 2 - len(in_flight)):
+            in_flight.append((shard_size, pool.submit(_run_shard, tickets, lottery_type, shard_size, seed_sequence)))
+
+    levels = get_prize_levels(lottery_type)
+    level_totals = np.zeros((len(tickets), len(levels)), dtype=np.int64)
+    ticket_draw_counts = [None] * len(tickets)
+    draw_count = 0
+    try:
+        submit_next_shards()
+        while in_flight:
+            shard_size, future = in_flight.popleft()
+            for i, (shard_found, shard_draw_count, shard_prizes) in enumerate(future.result()):
+                if ticket_draw_counts[i] is not None:
+                    continue
+                level_totals[i] += [shard_prizes.get(level, 0) for level in levels]
+                if shard_found:
+                    ticket_draw_counts[i] = draw_count + shard_draw_count
+            # 仍有号码未中奖时，说明该分片已完整模拟
+            draw_count += shard_size
+            if None not in ticket_draw_counts:
+                break
+            if progress_callback and progress_callback(draw_count, [_level_totals_dict(levels, totals) for totals in level_totals]):
+                break
+            submit_next_shards()
+    finally:
+        for _, future in in_flight: # 全部中奖或已取消时，尚未开始的分片不再执行
+            future.cancel()
+
+    return [(ticket_draw_counts[i] is not None,
+             ticket_draw_counts[i] if ticket_draw_counts[i] is not None else draw_count,
+             _level_totals_dict(levels, level_totals[i]))
+            for i in range(len(tickets))]
+
+
+def run_sharded_simulation(user_red_balls, user_blue_balls, lottery_type, max_simulations,
+                           seed=None, workers=None, progress_callback=None):
+    """
+    单组号码的多进程分片模拟，见 run_sharded_simulation_multi。
+    progress_callback(已模拟期数, {奖级: 中奖注数}): 每合并一个分片调用一次，返回 True 时提前结束
+    返回: (是否中得一等奖, 模拟期数, {奖级: 中奖注数})
+    """
+    multi_callback = None
+    if progress_callback:
+        multi_callback = lambda draw_count, ticket_totals: progress_callback(draw_count, ticket_totals[0])
+    return run_sharded_simulation_multi([(user_red_balls, user_blue_balls)], lottery_type, max_simulations,
+                                        seed=seed, workers=workers, progress_callback=multi_callback)[0]
@@ -0,0 +1,159 @@
+# fun_game_jobs.py
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import CURRENT_SETTINGS
+from utils import simulate_fun_game_multi
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+JOB_CANCELLED = 'cancelled'
+JOB_FAILED = 'failed'
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+_jobs = {} # {job_id: FunGameJob}
+_jobs_lock = threading.Lock()
+_executor = None
+
+# 工作线程没有应用上下文，不能使用 current_app.logger
+logger = logging.getLogger(__name__)
+
+
+class FunGameJob:
+    """一次后台趣味游戏模拟任务，进度和结果由工作线程写入，接口线程只读取快照"""
+    def __init__(self, client_ip, lottery_type, tickets, max_simulations, mode, seed=None, drawn_lookups=None):
+        self.job_id = uuid.uuid4().hex
+        self.client_ip = client_ip
+        self.lottery_type = lottery_type
+        self.tickets = tickets # [(红球, 蓝球), ...]
+        self.max_simulations = max_simulations
+        self.mode = mode
+        self.seed = seed
+        self.drawn_lookups = drawn_lookups # 每组号码的 "是否开出过" 查询结果，并入最终结果 (见 DrawnIndex.lookup)
+        self.status = JOB_QUEUED
+        self.draw_count = 0
+        self.total_prizes = [{} for _ in tickets] # 每组号码的中奖次数
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event() # 任务结束 (完成、取消或失败) 时设置
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'lottery_type': self.lottery_type,
+            'max_simulations': self.max_simulations,
+            'draw_count': self.draw_count,
+            'progress': round(self.draw_count / self.max_simulations * 100, 2) if self.max_simulations > 0 else 0.0,
+            'total_prizes': self.total_prizes,
+            'jackpot_tickets': sum(1 for prizes in self.total_prizes if prizes.get('一等奖')), # 已中一等奖的号码组数
+            'result': self.result,
+            'error': self.error
+        }
+
+
+def _get_executor():
+    """工作线程池按需创建，线程数由设置 fun_game_job_workers 决定 (修改后需重启生效)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, int(CURRENT_SETTINGS.get('fun_game_job_workers', 2))),
+                                       thread_name_prefix='fun_game')
+    return _executor
+
+
+def _purge_expired_jobs():
+    """删除已结束且超过保留时间的任务结果 (调用方需持有 _jobs_lock)"""
+    ttl = CURRENT_SETTINGS.get('fun_game_job_ttl_seconds', 600)
+    now = time.time()
+    expired = [job_id for job_id, job in _jobs.items()
+               if job.finished_at is not None and now - job.finished_at > ttl]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _run_job(job):
+    # 与 cancel_job 共用锁：排队期间已取消的任务不再开始，开始运行后的取消由进度回调处理
+    with _jobs_lock:
+        if job.cancel_event.is_set():
+            job.status = JOB_CANCELLED
+            if job.finished_at is None:
+                job.finished_at = time.time()
+            job.done_event.set()
+            return
+        job.status = JOB_RUNNING
+
+    def report_progress(draw_count, total_prizes):
+        job.draw_count = draw_count
+        job.total_prizes = total_prizes
+        return job.cancel_event.is_set()
+
+    try:
+        result = simulate_fun_game_multi(job.tickets, job.lottery_type, job.max_simulations, job.mode,
+                                         progress_callback=report_progress, seed=job.seed)
+        if 'error' in result:
+            job.error = result['error']
+            job.status = JOB_FAILED
+        else:
+            for ticket_result, lookup in zip(result['results'], job.drawn_lookups or []):
+                ticket_result.update(lookup)
+            job.result = result
+            job.total_prizes = [dict(ticket_result['total_prizes']) for ticket_result in result['results']]
+            job.draw_count = max(ticket_result['draw_count'] for ticket_result in result['results'])
+            job.status = JOB_CANCELLED if job.cancel_event.is_set() else JOB_FINISHED
+    except Exception:
+        logger.exception("趣味游戏后台任务 %s 出错", job.job_id)
+        job.error = '趣味游戏模拟失败。'
+        job.status = JOB_FAILED
+    finally:
+        job.finished_at = time.time()
+        job.done_event.set()
+
+
+def submit_job(client_ip, lottery_type, tickets, max_simulations, mode, seed=None, drawn_lookups=None):
+    """
+    提交后台模拟任务。同一 IP 同时进行中的任务数不超过 fun_game_jobs_per_ip。
+    drawn_lookups: 每组号码的 "是否开出过" 查询结果 (在请求线程中查询，工作线程没有应用上下文)
+    返回: (FunGameJob, None) 或 (None, 错误信息)
+    """
+    per_ip_limit = CURRENT_SETTINGS.get('fun_game_jobs_per_ip', 1)
+    with _jobs_lock:
+        _purge_expired_jobs()
+        active_count = sum(1 for job in _jobs.values()
+                           if job.client_ip == client_ip and job.status in ACTIVE_JOB_STATUSES)
+        if active_count >= per_ip_limit:
+            return None, f'您已有 {active_count} 个模拟任务正在进行，请等待完成或取消后再试。'
+        job = FunGameJob(client_ip, lottery_type, tickets, max_simulations, mode, seed, drawn_lookups)
+        _jobs[job.job_id] = job
+
+    _get_executor().submit(_run_job, job)
+    return job, None
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        _purge_expired_jobs()
+        return _jobs.get(job_id)
+
+
+def cancel_job(job_id):
+    """请求取消任务，正在运行的模拟会在下一次汇报进度时结束。返回任务，不存在时返回 None"""
+    with _jobs_lock:
+        _purge_expired_jobs()
+        job = _jobs.get(job_id)
+        if job and job.status in ACTIVE_JOB_STATUSES:
+            job.cancel_event.set()
+            if job.status == JOB_QUEUED: # 尚未开始的任务直接结束，立即释放该 IP 的并发名额
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                job.done_event.set()
+    return job
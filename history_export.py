@@ -0,0 +1,109 @@
+# history_export.py
+import csv
+import io
+import json
+from datetime import datetime
+from models import SSQDraw, DLTDraw
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# 未指定 fields 时导出的字段
+DEFAULT_EXPORT_FIELDS = ('issue', 'draw_date', 'red_balls', 'blue_balls')
+
+# 服务端游标每次从数据库取出的行数，也是每次输出的行数
+EXPORT_CHUNK_SIZE = 1000
+
+
+def export_fields(model_class):
+    """可导出的字段 (数据表的全部列，内部主键除外)"""
+    return [column.name for column in model_class.__table__.columns if column.name != 'id']
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date(), None
+    except ValueError:
+        return None, f'{name} 格式不正确，应为 YYYY-MM-DD'
+
+
+def parse_export_params(data):
+    """
+    解析导出参数: lottery_type, format (csv / ndjson，jsonl 同 ndjson), fields (逗号分隔的字段名),
+    start_date, end_date (YYYY-MM-DD), start_issue, end_issue (含两端)。
+    返回: (参数字典, None) 或 (None, 错误信息)
+    """
+    lottery_type = data.get('lottery_type')
+    if not lottery_type:
+        return None, 'Missing lottery_type'
+    if lottery_type not in ('ssq', 'dlt'):
+        return None, 'Invalid lottery type'
+    model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
+
+    output_format = data.get('format', 'csv')
+    output_format = 'ndjson' if output_format == 'jsonl' else output_format
+    if output_format not in EXPORT_FORMATS:
+        return None, 'Invalid format'
+
+    available_fields = export_fields(model_class)
+    fields = [field.strip() for field in data.get('fields', '').split(',') if field.strip()] or list(DEFAULT_EXPORT_FIELDS)
+    unknown_fields = [field for field in fields if field not in available_fields]
+    if unknown_fields:
+        return None, f"未知字段: {', '.join(unknown_fields)}，可选字段: {', '.join(available_fields)}"
+
+    params = {'lottery_type': lottery_type, 'model_class': model_class, 'format': output_format, 'fields': fields,
+              'start_date': None, 'end_date': None,
+              'start_issue': data.get('start_issue') or None, 'end_issue': data.get('end_issue') or None}
+    for name in ('start_date', 'end_date'):
+        if data.get(name):
+            params[name], error = _parse_date(data[name], name)
+            if error:
+                return None, error
+    return params, None
+
+
+def iter_export_rows(params):
+    """
+    按期号升序逐行产出所选字段的元组。只查询所选的列，并用服务端游标 (yield_per) 每次取 EXPORT_CHUNK_SIZE 行，
+    内存占用与导出行数无关。
+    """
+    model_class = params['model_class']
+    query = model_class.query.with_entities(*[getattr(model_class, field) for field in params['fields']])
+    if params['start_date']:
+        query = query.filter(model_class.draw_date >= params['start_date'])
+    if params['end_date']:
+        query = query.filter(model_class.draw_date <= params['end_date'])
+    if params['start_issue']:
+        query = query.filter(model_class.issue >= params['start_issue'])
+    if params['end_issue']:
+        query = query.filter(model_class.issue <= params['end_issue'])
+    return query.order_by(model_class.issue.asc()).yield_per(EXPORT_CHUNK_SIZE)
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_export_chunks(params):
+    """逐块产出导出文本 (CSV 第一块含表头)，每块最多 EXPORT_CHUNK_SIZE 行"""
+    fields = params['fields']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n') if params['format'] == 'csv' else None
+    if writer:
+        writer.writerow(fields)
+
+    row_count = 0
+    for row in iter_export_rows(params):
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, map(_json_value, row))), ensure_ascii=False) + '\n')
+        row_count += 1
+        if row_count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -81,6 +81,36 @@ class DLTDraw(LotteryDraw):
     reserve5 = db.Column(db.String(100))
 
 
+class DrawRuleResult(db.Model):
+    """每期开奖的预测规则判定结果，入库时计算，规则相关设置变化时批量重算"""
+    __tablename__ = 'draw_rule_results'
+    __table_args__ = (db.UniqueConstraint('lottery_type', 'issue', name='uq_draw_rule_results_issue'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    lottery_type = db.Column(db.String(10), nullable=False) # 'ssq' / 'dlt'
+    issue = db.Column(db.String(10), nullable=False) # 期号
+    passed_flags = db.Column(db.Integer, nullable=False, default=0) # 第 k 位为1表示第 k 条规则通过 (顺序见 rule_engine.HISTORY_RULES)
+    rules_signature = db.Column(db.String(40), nullable=False) # 计算时的规则版本和相关设置摘要
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class BallOmissionState(db.Model):
+    """每个号码的遗漏状态，每期开奖入库时按号码逐个更新，补录较早期号时整体重建"""
+    __tablename__ = 'ball_omission_state'
+    __table_args__ = (db.UniqueConstraint('lottery_type', 'zone', 'ball', name='uq_ball_omission_state_ball'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    lottery_type = db.Column(db.String(10), nullable=False) # 'ssq' / 'dlt'
+    zone = db.Column(db.String(10), nullable=False) # 'red' / 'blue'
+    ball = db.Column(db.Integer, nullable=False)
+    frequency_count = db.Column(db.Integer, nullable=False, default=0) # 出现次数
+    current_omission = db.Column(db.Integer, nullable=False, default=0) # 当前遗漏期数
+    max_omission = db.Column(db.Integer, nullable=False, default=0) # 历史最大遗漏期数
+    last_seen_issue = db.Column(db.String(10)) # 最近一次开出的期号，从未开出为空
+    draws_count = db.Column(db.Integer, nullable=False, default=0) # 已计入的开奖期数
+    last_issue = db.Column(db.String(10)) # 已计入的最新期号
+
+
 class News(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
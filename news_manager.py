@@ -0,0 +1,16 @@
+# news_manager.py
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 新闻数据的版本号，每次后台新增、修改或删除新闻时递增，供页面缓存判断是否失效
+_news_version = 0
+
+def get_news_version():
+    """获取新闻数据的当前版本号"""
+    return _news_version
+
+def bump_news_version():
+    """新闻变化并提交后调用，使依赖新闻的缓存失效"""
+    global _news_version
+    _news_version += 1
@@ -0,0 +1,109 @@
+# omission_state.py
+from config import PRIZE_RULES
+from models import db, SSQDraw, DLTDraw, BallOmissionState
+from draw_records import load_draw_records
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+ZONES = ('red', 'blue')
+
+
+def _empty_state(lottery_type):
+    """{(区域, 号码): 状态字典}，所有号码尚未计入任何开奖"""
+    state = {}
+    for zone in ZONES:
+        for ball in range(1, PRIZE_RULES[lottery_type][f'{zone}_range'] + 1):
+            state[(zone, ball)] = {'frequency_count': 0, 'current_omission': 0, 'max_omission': 0,
+                                   'last_seen_issue': None}
+    return state
+
+
+def _apply_draw(state, issue, red_balls, blue_balls):
+    """
+    按时间顺序计入一期开奖，每个号码 O(1)。
+    最大遗漏即最长的连续未开出期数 (含第一次开出之前和最近一次开出之后)，
+    与 calculate_frequency_and_omissions_for_balls 的两遍计算结果一致。
+    """
+    drawn = {'red': set(red_balls), 'blue': set(blue_balls)}
+    for (zone, ball), ball_state in state.items():
+        if ball in drawn[zone]:
+            ball_state['frequency_count'] += 1
+            ball_state['current_omission'] = 0
+            ball_state['last_seen_issue'] = issue
+        else:
+            ball_state['current_omission'] += 1
+            if ball_state['current_omission'] > ball_state['max_omission']:
+                ball_state['max_omission'] = ball_state['current_omission']
+
+
+def _load_state(lottery_type):
+    """读取已保存的状态，返回 (状态, 已计入期数, 最新期号)，未初始化时返回 (None, 0, None)"""
+    rows = BallOmissionState.query.filter_by(lottery_type=lottery_type).all()
+    if not rows:
+        return None, 0, None
+    state = {(row.zone, row.ball): {'frequency_count': row.frequency_count, 'current_omission': row.current_omission,
+                                    'max_omission': row.max_omission, 'last_seen_issue': row.last_seen_issue}
+             for row in rows}
+    return state, rows[0].draws_count, rows[0].last_issue
+
+
+def _save_state(lottery_type, state, draws_count, last_issue):
+    BallOmissionState.query.filter_by(lottery_type=lottery_type).delete()
+    db.session.bulk_insert_mappings(BallOmissionState, [
+        dict(lottery_type=lottery_type, zone=zone, ball=ball, draws_count=draws_count, last_issue=last_issue, **ball_state)
+        for (zone, ball), ball_state in state.items()
+    ])
+    db.session.commit()
+
+
+def rebuild_omission_state(lottery_type):
+    """按期号升序重放全部开奖，重建遗漏状态 (首次运行或补录较早期号时)"""
+    draws = load_draw_records(lottery_type, newest_first=False)
+    state = _empty_state(lottery_type)
+    for draw in draws:
+        _apply_draw(state, draw.issue, draw.red, draw.blue)
+    _save_state(lottery_type, state, len(draws), draws[-1].issue if draws else None)
+
+
+def update_omission_state(lottery_type, new_draws):
+    """
+    新开奖入库后更新遗漏状态。new_draws: 本次新增的开奖对象。
+    全部晚于已计入的最新一期时逐期增量计入；有较早期号 (补录) 或状态缺失时整体重建。
+    """
+    if not new_draws:
+        return
+    state, draws_count, last_issue = _load_state(lottery_type)
+    new_draws = sorted(new_draws, key=lambda draw: draw.issue)
+    if state is None or (last_issue is not None and new_draws[0].issue <= last_issue):
+        rebuild_omission_state(lottery_type)
+        return
+    for draw in new_draws:
+        _apply_draw(state, draw.issue, draw.get_red_balls_list(), draw.get_blue_balls_list())
+    _save_state(lottery_type, state, draws_count + len(new_draws), new_draws[-1].issue)
+
+
+def ensure_omission_state(lottery_type):
+    """启动时检查状态与开奖数据是否一致 (期数和最新期号)，不一致则重建"""
+    model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
+    _, draws_count, last_issue = _load_state(lottery_type)
+    latest = model_class.query.with_entities(model_class.issue).order_by(model_class.issue.desc()).first()
+    if draws_count != model_class.query.count() or last_issue != (latest[0] if latest else None):
+        rebuild_omission_state(lottery_type)
+
+
+def get_omission_stats(lottery_type, zone):
+    """
+    从遗漏状态表读取某一区域全部号码的统计，格式与 calculate_frequency_and_omissions_for_balls 相同。
+    返回: (统计列表 (按号码升序), 已计入的开奖期数)
+    """
+    rows = BallOmissionState.query.filter_by(lottery_type=lottery_type, zone=zone)\
+                                  .order_by(BallOmissionState.ball.asc()).all()
+    draws_count = rows[0].draws_count if rows else 0
+    return [{
+        'ball': row.ball,
+        'frequency_count': row.frequency_count,
+        'frequency_percentage': round(row.frequency_count / draws_count * 100, 2) if draws_count > 0 else 0,
+        'current_omission': row.current_omission,
+        'max_omission': row.max_omission
+    } for row in rows], draws_count
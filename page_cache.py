@@ -0,0 +1,216 @@
+# page_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from functools import wraps
+from flask import Response, make_response, request, session
+from sqlalchemy import func
+from config import CURRENT_SETTINGS, get_settings_version, __version__ as APP_VERSION
+from data_manager import get_draw_data_version
+from models import db, SSQDraw, DLTDraw, News
+from news_manager import get_news_version
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 每个缓存条目除响应体外的估计开销 (键、响应头等)，计入内存占用
+ENTRY_OVERHEAD_BYTES = 512
+
+# 带验证器的公开响应的 Cache-Control：浏览器每次都带验证器重新验证 (未变化时只返回 304)，
+# CDN 可缓存 60 秒，过期后 60 秒内可先返回旧内容再后台验证
+PUBLIC_CACHE_CONTROL = 'public, max-age=0, s-maxage=60, stale-while-revalidate=60'
+# 与会话有关的响应 (管理员已登录、有提示消息) 不允许共享缓存
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+_validators = {'data_version': None, 'fingerprint': None, 'last_modified': None}
+_validators_lock = threading.Lock()
+
+
+def get_data_version():
+    """页面内容依赖的全部数据的版本 (两个彩种的开奖数据、网站设置、新闻)，任一变化即整体失效"""
+    return (get_draw_data_version('ssq'), get_draw_data_version('dlt'), get_settings_version(), get_news_version())
+
+
+def _data_fingerprint():
+    """
+    按数据内容计算的指纹 (各彩种的期数和最新期号、新闻条数和最后修改时间、全部设置、程序版本)。
+    与进程内的版本号不同，重启后内容不变时指纹也不变，客户端保存的 ETag 仍然有效。
+    """
+    parts = [APP_VERSION]
+    for model_class in (SSQDraw, DLTDraw):
+        parts.extend(db.session.query(func.count(model_class.id), func.max(model_class.issue)).one())
+    parts.extend(db.session.query(func.count(News.id), func.max(News.id), func.max(News.updated_at)).one())
+    parts.append(json.dumps(CURRENT_SETTINGS, sort_keys=True, ensure_ascii=False, default=str))
+    return hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest()[:20]
+
+
+def get_validators():
+    """
+    返回 (ETag, Last-Modified)，数据版本不变时直接返回上次的结果，不查询数据库。
+    Last-Modified 取本进程首次看到该数据指纹的时间 (开奖日期只到天，不能作为修改时间)，
+    且不早于当天零点 (页面显示下次开奖日期等随日期变化的内容)。
+    """
+    data_version = get_data_version()
+    with _validators_lock:
+        if _validators['data_version'] != data_version:
+            fingerprint = _data_fingerprint()
+            if fingerprint != _validators['fingerprint']:
+                _validators['fingerprint'] = fingerprint
+                _validators['last_modified'] = datetime.now(timezone.utc).replace(microsecond=0)
+            _validators['data_version'] = data_version
+        fingerprint, last_modified = _validators['fingerprint'], _validators['last_modified']
+    today = date.today()
+    midnight = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+    return f'{fingerprint}-{today.toordinal()}', max(last_modified, midnight)
+
+
+def _not_modified(etag, last_modified):
+    """If-None-Match 优先 (弱比较)，没有时再比较 If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return request.if_modified_since is not None and request.if_modified_since >= last_modified
+
+
+def conditional_get(view):
+    """
+    条件 GET 装饰器：按开奖数据、新闻和设置给响应加 ETag (弱验证器，页面上的当前时间等细节不影响) 和 Last-Modified，
+    客户端的验证器仍然有效时在调用视图前直接返回 304。
+    管理员已登录或有提示消息时不加验证器并禁止共享缓存；非 200 或渲染时修改了会话的响应同样不加。
+    放在 cached_page 外层，304 连缓存查找都不需要。
+    """
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET' or session.get('logged_in_admin') or '_flashes' in session:
+            response = make_response(view(*args, **kwargs))
+            response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+            return response
+
+        etag, last_modified = get_validators()
+        if _not_modified(etag, last_modified):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or session.modified:
+                response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+                return response
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = PUBLIC_CACHE_CONTROL
+        return response
+    return decorated_function
+
+
+class PageCache:
+    """
+    整页响应的 LRU 缓存，按响应体字节数限制内存，超出上限时淘汰最久未使用的页面。
+    entries: {键: (响应体, 状态码, 响应头列表, 写入时间)}，全部条目属于同一数据版本，版本变化时整体清空。
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _entry_size(self, entry):
+        return len(entry[0]) + ENTRY_OVERHEAD_BYTES
+
+    def _check_version(self, data_version):
+        if self.data_version != data_version:
+            self.entries.clear()
+            self.size = 0
+            self.data_version = data_version
+
+    def get(self, key, data_version, ttl_seconds):
+        """命中时返回 (响应体, 状态码, 响应头列表)，否则返回 None"""
+        with self.lock:
+            self._check_version(data_version)
+            entry = self.entries.get(key)
+            if entry is not None and ttl_seconds > 0 and time.time() - entry[3] > ttl_seconds:
+                del self.entries[key]
+                self.size -= self._entry_size(entry)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[:3]
+
+    def put(self, key, data_version, body, status, headers, max_bytes):
+        entry = (body, status, headers, time.time())
+        size = self._entry_size(entry)
+        if size > max_bytes:
+            return
+        with self.lock:
+            self._check_version(data_version)
+            if data_version != self.data_version:
+                return
+            old_entry = self.entries.pop(key, None)
+            if old_entry is not None:
+                self.size -= self._entry_size(old_entry)
+            self.entries[key] = entry
+            self.size += size
+            while self.size > max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= self._entry_size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """管理后台显示的缓存统计"""
+        with self.lock:
+            requests_count = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'size_bytes': self.size,
+                'max_bytes': CURRENT_SETTINGS.get('page_cache_max_mb', 32) * 1024 * 1024,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / requests_count * 100, 2) if requests_count else 0.0
+            }
+
+
+page_cache = PageCache()
+
+
+def cached_page(view):
+    """
+    整页缓存装饰器，只用于内容只由查询参数、开奖数据、设置和新闻决定的 GET 页面。
+    命中时直接返回保存的响应体，不查询数据库也不渲染模板。
+    键包含日期 (页面显示下次开奖日期等)；管理员已登录或有待显示的提示消息时不使用缓存，
+    渲染时修改了会话 (如产生提示消息) 的页面和非 200 的响应不缓存。
+    """
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        max_bytes = CURRENT_SETTINGS.get('page_cache_max_mb', 32) * 1024 * 1024
+        if max_bytes <= 0 or request.method != 'GET' or session.get('logged_in_admin') or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))),
+               date.today().toordinal())
+        data_version = get_data_version() # 渲染前读取，渲染期间数据变化时该条目随旧版本一起清除
+        cached = page_cache.get(key, data_version, CURRENT_SETTINGS.get('page_cache_ttl_seconds', 300))
+        if cached is not None:
+            body, status, headers = cached
+            response = Response(body, status=status, headers=headers)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed and not session.modified:
+            headers = [(name, value) for name, value in response.headers if name.lower() != 'content-length']
+            page_cache.put(key, data_version, response.get_data(), response.status_code, headers, max_bytes)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return decorated_function
@@ -1,414 +1,38 @@
 # prediction_engine.py
 import random
-from collections import Counter
-from datetime import date
 from flask import current_app
-from models import SSQDraw, DLTDraw, db
 from config import CURRENT_SETTINGS, PRIZE_RULES
-from utils import format_lottery_numbers, calculate_omissions, get_consecutive_groups, calculate_odd_even_sum, calculate_frequency_and_omissions_for_balls
+from prediction_model import PICK_COUNTS, get_prediction_model
+from omission_state import get_omission_stats
+from rule_engine import check_draw_rules, check_tickets_rules
 
 # 版本号，每次生成文件时更新
-__version__ = "1.0.9" # 更新版本号
+__version__ = "1.0.10" # 更新版本号
 
-# --- 辅助函数：获取指定期号之前的历史开奖数据 ---
-def _get_previous_draws(model_class, current_issue, num_draws):
-    """
-    获取指定期号之前的num_draws期开奖数据。
-    返回的列表按issue降序排列 (即最新一期在前)。
-    如果 current_issue 为 None，则获取最新的 num_draws 期数据。
-    """
-    if current_issue is None:
-        return model_class.query.order_by(model_class.issue.desc()).limit(num_draws).all()
-
-    current_draw = model_class.query.filter_by(issue=current_issue).first()
-    if not current_draw:
-        current_app.logger.warning(f"Could not find draw for issue {current_issue} in {model_class.__name__}.")
-        return []
-    
-    return model_class.query.filter(model_class.issue < current_issue)\
-                            .order_by(model_class.issue.desc())\
-                            .limit(num_draws).all()
-
-# --- 双色球规则检查函数 (针对历史开奖数据) ---
-# (这部分保持不变，因为这些是检查历史数据的规则)
-
-def _check_ssq_rule_4_1_1_blue_consecutive(draw: SSQDraw):
-    """
-    规则 4.1.1 蓝球连续开出检查
-    检查当前期开出的蓝球，是否在当前期及之前的连续N期中都出现。
-    """
-    blue_ball = draw.get_blue_balls_list()[0]
-    recent_draws_including_current = SSQDraw.query.filter(SSQDraw.issue <= draw.issue)\
-                                .order_by(SSQDraw.issue.desc())\
-                                .limit(5).all() 
-
-    current_app.logger.debug(f"Rule 4.1.1: Checking blue ball {blue_ball} for issue {draw.issue}.")
-    current_app.logger.debug(f"Recent draws (newest to oldest, including current): {[d.issue for d in recent_draws_including_current]}")
-
-    consecutive_count = 0
-    for d in recent_draws_including_current:
-        if d.get_blue_balls_list() and blue_ball == d.get_blue_balls_list()[0]:
-            consecutive_count += 1
-            current_app.logger.debug(f"  Issue {d.issue} has blue ball {d.get_blue_balls_list()[0]}. Consecutive count: {consecutive_count}")
-        else:
-            current_app.logger.debug(f"  Issue {d.issue} has blue ball {d.get_blue_balls_list()[0] if d.get_blue_balls_list() else 'N/A'}. Break consecutive check.")
-            break
-
-    if consecutive_count >= 5:
-        return {'passed': False, 'message': f'规则4.1.1: 蓝球 {blue_ball} 连续开出 {consecutive_count} 期 (>=5期)。'}
-    elif consecutive_count >= 3:
-        return {'passed': False, 'message': f'规则4.1.1: 蓝球 {blue_ball} 连续开出 {consecutive_count} 期 (>=3期)。'}
-    return {'passed': True, 'message': f'规则4.1.1: 蓝球 {blue_ball} 未连续开出3或5期。'}
-
-def _check_ssq_rule_4_1_3_red_consecutive_repeat(draw: SSQDraw):
-    """
-    规则 4.1.3 红球连续重复检查
-    检查当前期开出的红球中，是否有号码在当前期及之前的连续3期中都出现。
-    """
-    current_red_balls = set(draw.get_red_balls_list())
-    recent_draws_including_current = SSQDraw.query.filter(SSQDraw.issue <= draw.issue)\
-                                .order_by(SSQDraw.issue.desc())\
-                                .limit(3).all()
-
-    current_app.logger.debug(f"Rule 4.1.3: Checking red balls {current_red_balls} for issue {draw.issue}.")
-    current_app.logger.debug(f"Recent draws (newest to oldest, including current): {[d.issue for d in recent_draws_including_current]}")
-
-    if len(recent_draws_including_current) < 3:
-        return {'passed': True, 'message': '规则4.1.3: 无足够前期数据进行红球连续重复检查。'}
-
-    for ball in current_red_balls:
-        is_consecutive_3 = True
-        current_app.logger.debug(f"  Checking red ball {ball} for 3 consecutive appearances.")
-        for d in recent_draws_including_current:
-            if ball not in d.get_red_balls_list():
-                is_consecutive_3 = False
-                current_app.logger.debug(f"    Ball {ball} not in issue {d.issue}'s red balls {d.get_red_balls_list()}. Not consecutive.")
-                break
-            else:
-                current_app.logger.debug(f"    Ball {ball} found in issue {d.issue}'s red balls {d.get_red_balls_list()}.")
-        if is_consecutive_3:
-            return {'passed': False, 'message': f'规则4.1.3: 红球 {ball} 连续3期及以上开出。'}
-            
-    return {'passed': True, 'message': '规则4.1.3: 红球未出现连续3期及以上重复。'}
-
-
-def _check_ssq_rule_4_1_4_red_area_distribution(red_balls):
-    """
-    规则 4.1.4 红球数字区域分布
-    区域: [1-8], [9-16], [17-24], [25-33]
-    要求分布在 >= 2个数字区间。
-    """
-    areas = set()
-    for ball in red_balls:
-        if 1 <= ball <= 8:
-            areas.add(1)
-        elif 9 <= ball <= 16:
-            areas.add(2)
-        elif 17 <= ball <= 24:
-            areas.add(3)
-        elif 25 <= ball <= 33:
-            areas.add(4)
-    
-    distributed_areas = len(areas)
-    if distributed_areas >= 2:
-        return {'passed': True, 'message': f'规则4.1.4: 红球分布在 {distributed_areas} 个区域 (>=2个)。'}
-    else:
-        return {'passed': False, 'message': f'规则4.1.4: 红球仅分布在 {distributed_areas} 个区域 (<2个)。'}
-
-def _check_ssq_rule_4_1_5_red_repeat_previous_2(draw: SSQDraw):
-    """
-    规则 4.1.5 红球与前2期重复号码不超过2个。
-    """
-    current_red_balls = set(draw.get_red_balls_list())
-    previous_draws = _get_previous_draws(SSQDraw, draw.issue, 2)
-    
-    current_app.logger.debug(f"Rule 4.1.5: Checking red balls {current_red_balls} for issue {draw.issue} against previous 2 draws.")
-    current_app.logger.debug(f"Previous 2 draws (newest to oldest): {[d.issue for d in previous_draws]}")
-
-    if len(previous_draws) < 2:
-        return {'passed': True, 'message': '规则4.1.5: 无足够前期数据进行红球重复检查。'}
+# --- 规则检查 (由 rule_engine 的规则集统一判定，历史开奖和生成号码共用) ---
 
-    all_prev_red_balls = set()
-    for prev_draw in previous_draws:
-        all_prev_red_balls.update(prev_draw.get_red_balls_list())
-    
-    repeated_count = len(current_red_balls.intersection(all_prev_red_balls))
-    current_app.logger.debug(f"  Repeated count with previous 2 draws: {repeated_count}")
-
-    if repeated_count <= 2:
-        return {'passed': True, 'message': f'规则4.1.5: 红球与前2期重复号码 {repeated_count} 个 (<=2个)。'}
-    else:
-        return {'passed': False, 'message': f'规则4.1.5: 红球与前2期重复号码 {repeated_count} 个 (>2个)。'}
-
-def _check_ssq_rule_4_1_6_red_consecutive_4_plus(red_balls):
-    """
-    规则 4.1.6 红球不出现连续[4]个及以上数字的号码。
-    """
-    consecutive_groups = get_consecutive_groups(red_balls)
-    current_app.logger.debug(f"Rule 4.1.6: Checking red balls {red_balls} for consecutive groups. Groups: {consecutive_groups}")
-    for group in consecutive_groups:
-        if len(group) >= 4:
-            return {'passed': False, 'message': f'规则4.1.6: 红球出现连续 {len(group)} 个号码: {group} (>=4个)。'}
-    return {'passed': True, 'message': '规则4.1.6: 红球未出现连续4个及以上号码。'}
-
-# --- 大乐透规则检查函数 (针对历史开奖数据) ---
-# (这部分保持不变，因为这些是检查历史数据的规则)
-
-def _check_dlt_rule_4_2_1_blue_repeat_latest(draw: DLTDraw):
-    """
-    规则 4.2.1 大乐透蓝球重复最新一期检查 & 连续开出检查
-    """
-    current_blue_balls = set(draw.get_blue_balls_list())
-    
-    current_app.logger.debug(f"Rule 4.2.1: Checking DLT blue balls {current_blue_balls} for issue {draw.issue}.")
-
-    # Part 1: Check repeat with immediately previous draw
-    previous_draws_1 = _get_previous_draws(DLTDraw, draw.issue, 1)
-    if previous_draws_1:
-        prev_blue_balls = set(previous_draws_1[0].get_blue_balls_list())
-        intersection = current_blue_balls.intersection(prev_blue_balls)
-        if intersection:
-            current_app.logger.debug(f"  Intersection with previous blue balls {prev_blue_balls}: {list(intersection)}")
-            return {'passed': False, 'message': f'规则4.2.1: 后区号码 {list(intersection)} 与前一期有重复。'}
-    
-    # Part 2: Check for 5 consecutive appearances of *any* blue ball in the current draw
-    recent_draws_including_current = DLTDraw.query.filter(DLTDraw.issue <= draw.issue)\
-                                .order_by(DLTDraw.issue.desc())\
-                                .limit(5).all()
-
-    current_app.logger.debug(f"Recent DLT draws (newest to oldest, including current): {[d.issue for d in recent_draws_including_current]}")
-
-    for current_ball in current_blue_balls:
-        consecutive_count = 0
-        for d in recent_draws_including_current:
-            if d.get_blue_balls_list() and current_ball in d.get_blue_balls_list():
-                consecutive_count += 1
-                current_app.logger.debug(f"  Issue {d.issue} has blue ball {current_ball}. Consecutive count: {consecutive_count}")
-            else:
-                current_app.logger.debug(f"  Issue {d.issue} does not have blue ball {current_ball}. Break consecutive check for this ball.")
-                break
-        
-        if consecutive_count >= 5:
-            return {'passed': False, 'message': f'规则4.2.1: 后区号码 {current_ball} 连续开出 {consecutive_count} 期 (>=5期)。'}
-
-    return {'passed': True, 'message': '规则4.2.1: 后区号码与前一期无重复，且无号码连续开出5期。'}
-
-def _check_dlt_rule_4_2_3_red_consecutive_repeat(draw: DLTDraw):
-    """
-    规则 4.2.3 大乐透红球连续重复检查
-    检查当前期开出的前区中，是否有号码在当前期及之前的连续3期中都出现。
-    """
-    current_front_balls = set(draw.get_red_balls_list())
-    recent_draws_including_current = DLTDraw.query.filter(DLTDraw.issue <= draw.issue)\
-                                .order_by(DLTDraw.issue.desc())\
-                                .limit(3).all()
-
-    current_app.logger.debug(f"Rule 4.2.3: Checking DLT front balls {current_front_balls} for issue {draw.issue}.")
-    current_app.logger.debug(f"Recent DLT draws (newest to oldest, including current): {[d.issue for d in recent_draws_including_current]}")
-
-    if len(recent_draws_including_current) < 3:
-        return {'passed': True, 'message': '规则4.2.3: 无足够前期数据进行前区连续重复检查。'}
-
-    for ball in current_front_balls:
-        is_consecutive_3 = True
-        current_app.logger.debug(f"  Checking front ball {ball} for 3 consecutive appearances.")
-        for d in recent_draws_including_current:
-            if ball not in d.get_red_balls_list():
-                is_consecutive_3 = False
-                current_app.logger.debug(f"    Ball {ball} not in issue {d.issue}'s front balls {d.get_red_balls_list()}. Not consecutive.")
-                break
-            else:
-                current_app.logger.debug(f"    Ball {ball} found in issue {d.issue}'s front balls {d.get_red_balls_list()}.")
-        if is_consecutive_3:
-            return {'passed': False, 'message': f'规则4.2.3: 前区号码 {ball} 连续3期及以上开出。'}
-            
-    return {'passed': True, 'message': '规则4.2.3: 前区号码未出现连续3期及以上重复。'}
-
-
-def _check_dlt_rule_4_2_4_red_area_distribution(front_balls):
-    """
-    规则 4.2.4 大乐透前区数字区域分布
-    区域: [1-8], [9-16], [17-24], [25-35]
-    要求分布在 >= 2个数字区间。
-    """
-    areas = set()
-    for ball in front_balls:
-        if 1 <= ball <= 8:
-            areas.add(1)
-        elif 9 <= ball <= 16:
-            areas.add(2)
-        elif 17 <= ball <= 24:
-            areas.add(3)
-        elif 25 <= ball <= 35:
-            areas.add(4)
-    
-    distributed_areas = len(areas)
-    if distributed_areas >= 2:
-        return {'passed': True, 'message': f'规则4.2.4: 前区分布在 {distributed_areas} 个区域 (>=2个)。'}
-    else:
-        return {'passed': False, 'message': f'规则4.2.4: 前区仅分布在 {distributed_areas} 个区域 (<2个)。'}
-
-def _check_dlt_rule_4_2_5_red_repeat_previous_2(draw: DLTDraw):
-    """
-    规则 4.2.5 大乐透前区与前2期重复号码不超过2个。
-    """
-    current_front_balls = set(draw.get_red_balls_list())
-    previous_draws = _get_previous_draws(DLTDraw, draw.issue, 2)
-    
-    current_app.logger.debug(f"Rule 4.2.5: Checking DLT front balls {current_front_balls} for issue {draw.issue} against previous 2 draws.")
-    current_app.logger.debug(f"Previous 2 draws (newest to oldest): {[d.issue for d in previous_draws]}")
-
-    if len(previous_draws) < 2:
-        return {'passed': True, 'message': '规则4.2.5: 无足够前期数据进行前区重复检查。'}
-
-    all_prev_front_balls = set()
-    for prev_draw in previous_draws:
-        all_prev_front_balls.update(prev_draw.get_red_balls_list())
-    
-    repeated_count = len(current_front_balls.intersection(all_prev_front_balls))
-    current_app.logger.debug(f"  Repeated count with previous 2 draws: {repeated_count}")
-    
-    if repeated_count <= 2:
-        return {'passed': True, 'message': f'规则4.2.5: 前区与前2期重复号码 {repeated_count} 个 (<=2个)。'}
-    else:
-        return {'passed': False, 'message': f'规则4.2.5: 前区与前2期重复号码 {repeated_count} 个 (>2个)。'}
-
-def _check_dlt_rule_4_2_6_red_consecutive_4_plus(front_balls):
-    """
-    规则 4.2.6 大乐透前区不出现连续[4]个及以上数字的号码。
-    """
-    consecutive_groups = get_consecutive_groups(front_balls)
-    current_app.logger.debug(f"Rule 4.2.6: Checking DLT front balls {front_balls} for consecutive groups. Groups: {consecutive_groups}")
-    for group in consecutive_groups:
-        if len(group) >= 4:
-            return {'passed': False, 'message': f'规则4.2.6: 前区出现连续 {len(group)} 个号码: {group} (>=4个)。'}
-    return {'passed': True, 'message': '规则4.2.6: 前区未出现连续4个及以上号码。'}
-
-
-# --- 主规则检查函数 (供API调用) ---
-def check_ssq_rules_for_draw(draw: SSQDraw):
-    """
-    检查双色球开奖号码是否符合预设规则。
-    返回一个字典，包含规则检查结果。
-    """
-    results = {}
-    red_balls = draw.get_red_balls_list()
-    
-    # 应用双色球规则
-    results['rule_4_1_1_blue_consecutive'] = _check_ssq_rule_4_1_1_blue_consecutive(draw)
-    results['rule_4_1_3_red_consecutive_repeat'] = _check_ssq_rule_4_1_3_red_consecutive_repeat(draw)
-    results['rule_4_1_4_red_area_distribution'] = _check_ssq_rule_4_1_4_red_area_distribution(red_balls)
-    results['rule_4_1_5_red_repeat_previous_2'] = _check_ssq_rule_4_1_5_red_repeat_previous_2(draw)
-    results['rule_4_1_6_red_consecutive_4_plus'] = _check_ssq_rule_4_1_6_red_consecutive_4_plus(red_balls)
-    # TODO: Add other SSQ rules here as they are implemented
-
-    return results
-
-def check_dlt_rules_for_draw(draw: DLTDraw):
+def check_lottery_rules(lottery_type, issue):
     """
-    检查大乐透开奖号码是否符合预设规则。
+    根据彩票类型和期号检查该期开奖号码是否符合预设规则。
     返回一个字典，包含规则检查结果。
     """
-    results = {}
-    front_balls = draw.get_red_balls_list() # DLT uses 'red_balls' for front area
-    
-    # 应用大乐透规则
-    results['rule_4_2_1_blue_repeat_latest'] = _check_dlt_rule_4_2_1_blue_repeat_latest(draw)
-    results['rule_4_2_3_red_consecutive_repeat'] = _check_dlt_rule_4_2_3_red_consecutive_repeat(draw)
-    results['rule_4_2_4_red_area_distribution'] = _check_dlt_rule_4_2_4_red_area_distribution(front_balls)
-    results['rule_4_2_5_red_repeat_previous_2'] = _check_dlt_rule_4_2_5_red_repeat_previous_2(draw)
-    results['rule_4_2_6_red_consecutive_4_plus'] = _check_dlt_rule_4_2_6_red_consecutive_4_plus(front_balls)
-    # TODO: Add other DLT rules here as they are implemented
-
-    return results
+    return check_draw_rules(lottery_type, issue)
 
-def check_lottery_rules(lottery_type, issue):
-    """
-    根据彩票类型和期号，调用相应的规则检查函数。
-    """
-    if lottery_type == 'ssq':
-        model_class = SSQDraw
-        check_func = check_ssq_rules_for_draw
-    elif lottery_type == 'dlt':
-        model_class = DLTDraw
-        check_func = check_dlt_rules_for_draw
-    else:
-        return {'error': 'Invalid lottery type'}
-
-    draw = model_class.query.filter_by(issue=issue).first()
-    if not draw:
-        return {'error': f'{model_class.__name__} not found for issue {issue}'}
-
-    return check_func(draw)
-
-# --- 新增：检查生成号码的规则函数 ---
 def check_ssq_rules_for_balls(red_balls: list, blue_balls: list):
     """
     检查一组双色球号码是否符合预设规则。
-    此函数用于检查生成的号码，因此需要模拟一个 Draw 对象。
+    生成的号码视为最新开奖的下一期，"前N期" 即最新的N期开奖。
     """
-    current_app.logger.info(f"Checking SSQ rules for generated balls: Red={red_balls}, Blue={blue_balls}")
-    results = {}
-    
-    # 获取最新的实际开奖期号，用于模拟新生成的号码的“前N期”查询
-    latest_ssq_draw = SSQDraw.query.order_by(SSQDraw.issue.desc()).first()
-    
-    if latest_ssq_draw:
-        # 创建一个临时的 SSQDraw 对象，模拟为最新开奖的下一期
-        dummy_draw_issue = latest_ssq_draw.issue + 1
-        dummy_draw_date = date.today()
-    else:
-        # 如果没有历史数据，则使用一个默认的期号和日期
-        dummy_draw_issue = 2023001 # 任意一个起始期号
-        dummy_draw_date = date.today()
-
-    dummy_draw = SSQDraw(issue=dummy_draw_issue, draw_date=dummy_draw_date, 
-                         red_balls=','.join(map(str, red_balls)), 
-                         blue_balls=','.join(map(str, blue_balls)))
-    
-    # 应用双色球规则
-    results['rule_4_1_1_blue_consecutive'] = _check_ssq_rule_4_1_1_blue_consecutive(dummy_draw)
-    results['rule_4_1_3_red_consecutive_repeat'] = _check_ssq_rule_4_1_3_red_consecutive_repeat(dummy_draw)
-    results['rule_4_1_4_red_area_distribution'] = _check_ssq_rule_4_1_4_red_area_distribution(red_balls)
-    results['rule_4_1_5_red_repeat_previous_2'] = _check_ssq_rule_4_1_5_red_repeat_previous_2(dummy_draw)
-    results['rule_4_1_6_red_consecutive_4_plus'] = _check_ssq_rule_4_1_6_red_consecutive_4_plus(red_balls)
-    # TODO: Add other SSQ rules here as they are implemented, adapting them for raw balls
-    
-    return results
+    current_app.logger.debug("Checking SSQ rules for generated balls: Red=%s, Blue=%s", red_balls, blue_balls)
+    return check_tickets_rules('ssq', [(red_balls, blue_balls)])[0]
 
 def check_dlt_rules_for_balls(front_balls: list, blue_balls: list):
     """
     检查一组大乐透号码是否符合预设规则。
-    此函数用于检查生成的号码，因此需要模拟一个 Draw 对象。
+    生成的号码视为最新开奖的下一期，"前N期" 即最新的N期开奖。
     """
-    current_app.logger.info(f"Checking DLT rules for generated balls: Front={front_balls}, Blue={blue_balls}")
-    results = {}
-
-    # 获取最新的实际开奖期号，用于模拟新生成的号码的“前N期”查询
-    latest_dlt_draw = DLTDraw.query.order_by(DLTDraw.issue.desc()).first()
-
-    if latest_dlt_draw:
-        # 创建一个临时的 DLTDraw 对象，模拟为最新开奖的下一期
-        dummy_draw_issue = latest_dlt_draw.issue + 1
-        dummy_draw_date = date.today()
-    else:
-        # 如果没有历史数据，则使用一个默认的期号和日期
-        dummy_draw_issue = 2023001 # 任意一个起始期号
-        dummy_draw_date = date.today()
-
-    dummy_draw = DLTDraw(issue=dummy_draw_issue, draw_date=dummy_draw_date, 
-                         red_balls=','.join(map(str, front_balls)), 
-                         blue_balls=','.join(map(str, blue_balls)))
-
-    # 应用大乐透规则
-    results['rule_4_2_1_blue_repeat_latest'] = _check_dlt_rule_4_2_1_blue_repeat_latest(dummy_draw)
-    results['rule_4_2_3_red_consecutive_repeat'] = _check_dlt_rule_4_2_3_red_consecutive_repeat(dummy_draw)
-    results['rule_4_2_4_red_area_distribution'] = _check_dlt_rule_4_2_4_red_area_distribution(front_balls)
-    results['rule_4_2_5_red_repeat_previous_2'] = _check_dlt_rule_4_2_5_red_repeat_previous_2(dummy_draw)
-    results['rule_4_2_6_red_consecutive_4_plus'] = _check_dlt_rule_4_2_6_red_consecutive_4_plus(front_balls)
-    # TODO: Add other DLT rules here as they are implemented, adapting them for raw balls
-
-    return results
+    current_app.logger.debug("Checking DLT rules for generated balls: Front=%s, Blue=%s", front_balls, blue_balls)
+    return check_tickets_rules('dlt', [(front_balls, blue_balls)])[0]
 
 
 # --- 号码生成逻辑 ---
@@ -448,54 +72,47 @@ def generate_random_balls(lottery_type, num_red, num_blue):
 def generate_predicted_balls(lottery_type):
     """
     根据预测规则生成一组号码。
-    这部分将是核心逻辑，需要根据 config.py 中的规则进行复杂的加权和筛选。
-    目前先返回一个占位符。
+    按 "iShoot 预测规则" 4.1.x/4.2.x 计算每个号码的出现概率 (见 prediction_model.py)，
+    模型按 (彩种, 开奖数据版本, 设置版本) 缓存，生成号码时不查询数据库。
+    返回: (红球列表, 蓝球列表)，失败时返回 (None, None)
     """
-    current_app.logger.info(f"Attempting to generate predicted balls for {lottery_type} (placeholder).")
+    tickets = generate_predicted_tickets(lottery_type, 1)
+    if not tickets:
+        return None, None
+    return tickets[0]
 
-    # TODO: Implement actual prediction logic based on rules from CURRENT_SETTINGS
-    # This will involve:
-    # 1. Fetching historical data (e.g., latest N draws)
-    # 2. Calculating frequencies, omissions, etc.
-    # 3. Applying weights and probabilities from CURRENT_SETTINGS
-    # 4. Generating candidate pools for red and blue balls
-    # 5. Iteratively selecting balls, checking against rules (e.g., consecutive, area distribution, repeat limits)
-    # 6. Normalizing probabilities and sampling.
+def generate_predicted_tickets(lottery_type, count, rng=None, stats=None):
+    """
+    批量生成 count 组预测号码。红球逐个按概率抽取，选号过程中即用位掩码检查
+    4.x.4 分区、4.x.5 与前2期重复、4.x.6 连号规则，不再生成后逐组查库检查。
+    stats: 可选的 SamplerStats，记录抽样被拒绝和回溯的次数。
+    返回: [(红球列表, 蓝球列表), ...]，彩种无效时返回 None
+    """
+    if lottery_type not in PICK_COUNTS:
+        current_app.logger.error(f"Invalid lottery type '{lottery_type}' provided to generate_predicted_tickets.")
+        return None
 
-    # Placeholder for now
-    if lottery_type == 'ssq':
-        red_balls, blue_balls = generate_random_balls('ssq', 6, 1) # For now, just random
-    elif lottery_type == 'dlt':
-        red_balls, blue_balls = generate_random_balls('dlt', 5, 2) # For now, just random
-    else:
-        current_app.logger.error(f"Invalid lottery type '{lottery_type}' provided to generate_predicted_balls.")
-        return None, None
-    
-    current_app.logger.info(f"Generated predicted balls (placeholder): Red={red_balls}, Blue={blue_balls}")
-    return red_balls, blue_balls
+    model = get_prediction_model(lottery_type)
+    if model.latest_issue is None:
+        current_app.logger.warning(f"No historical data for {lottery_type}, predicted balls fall back to uniform random.")
+    tickets = model.sample_valid_many(count, rng or random, stats)
+    if len(tickets) < count:
+        current_app.logger.warning(f"Only {len(tickets)}/{count} predicted tickets for {lottery_type} satisfy the hard rules.")
+    return tickets
 
 def get_omitted_balls_for_prediction(lottery_type):
     """
     获取遗漏最多的红球和蓝球，并包含其遗漏期数，用于预测页面显示。
+    直接读取入库时增量维护的号码遗漏状态 (omission_state.py)，不再加载全部历史开奖。
     返回格式: {'red_balls_with_omission': [{'ball': 1, 'omission': 10}, ...], ...}
     """
     current_app.logger.info(f"Attempting to get omitted balls for {lottery_type}")
 
-    model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
-    red_ball_range = PRIZE_RULES[lottery_type]['red_range']
-    blue_ball_range = PRIZE_RULES[lottery_type]['blue_range']
-
-    all_draws = model_class.query.order_by(model_class.issue.desc()).all()
-    
-    current_app.logger.info(f"Found {len(all_draws)} historical draws for {lottery_type}.")
-
-    if not all_draws:
+    red_stats_list, draws_count = get_omission_stats(lottery_type, 'red')
+    if draws_count == 0:
         current_app.logger.warning(f"No historical data available for {lottery_type} to calculate omissions.")
         return {'error': 'No historical data available.'}
 
-    # 计算红球遗漏
-    red_stats_list, _ = calculate_frequency_and_omissions_for_balls(all_draws, red_ball_range, 'red')
-    current_app.logger.debug(f"Raw red_stats_list for {lottery_type}: {red_stats_list[:5]}...") # 打印前5个，检查结构
     # 按照当前遗漏期数降序排序
     sorted_red_omissions = sorted(red_stats_list, key=lambda x: x['current_omission'], reverse=True)
     
@@ -503,9 +120,7 @@ def get_omitted_balls_for_prediction(lottery_type):
     num_omitted_red = CURRENT_SETTINGS.get('prediction_omitted_red_balls', 7)
     top_omitted_red_with_omission = sorted_red_omissions[:num_omitted_red]
 
-    # 计算蓝球遗漏
-    blue_stats_list, _ = calculate_frequency_and_omissions_for_balls(all_draws, blue_ball_range, 'blue')
-    current_app.logger.debug(f"Raw blue_stats_list for {lottery_type}: {blue_stats_list[:5]}...") # 打印前5个，检查结构
+    blue_stats_list, _ = get_omission_stats(lottery_type, 'blue')
     # 按照当前遗漏期数降序排序
     sorted_blue_omissions = sorted(blue_stats_list, key=lambda x: x['current_omission'], reverse=True)
     
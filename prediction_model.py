@@ -0,0 +1,398 @@
+# prediction_model.py
+import random
+import numpy as np
+from config import CURRENT_SETTINGS, PRIZE_RULES, get_settings_version
+from data_manager import get_draw_data_version
+from draw_store import get_draw_arrays
+from rule_registry import red_hard_limits
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 每注的红球/蓝球个数
+PICK_COUNTS = {'ssq': (6, 1), 'dlt': (5, 2)}
+
+# 规则 4.1.10 / 4.2.10 的遗漏阈值，从大到小检查：遗漏超过14期取 omit_14_prob，超过13期取 omit_13_prob，超过12期取 omit_12_prob
+RED_OMISSION_LIMITS = (14, 13, 12)
+
+# 受限抽样时，在别名表上连续被约束拒绝多少次后改为在允许号码中直接按权重选择
+MAX_ALIAS_ATTEMPTS = 32
+
+# 每注最多回溯次数，超过则认为当前设置下规则无法满足 (例如分区下限大于分区数)
+MAX_BACKTRACKS_PER_TICKET = 64
+
+_model_cache = {} # {lottery_type: (开奖数据版本, 设置版本, PredictionModel)}
+
+
+class AliasSampler:
+    """
+    Vose 别名表抽样：构建 O(n)，每次抽样 O(1) (一次均匀随机数 + 一次比较)。
+    weights 下标即号码，权重为0的号码不会被抽中。
+    """
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        scaled = weights * n / weights.sum()
+        self.size = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        scaled = scaled.tolist()
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # 剩余项因浮点误差未配对，概率视为1；权重为0的号码仍指向权重最大的号码，保证不会被抽中
+        heaviest = int(weights.argmax())
+        for i in small + large:
+            if weights[i] > 0:
+                self.prob[i] = 1.0
+            else:
+                self.prob[i] = 0.0
+                self.alias[i] = heaviest
+
+    def sample(self, rng=random):
+        u = rng.random() * self.size
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def sample_distinct(self, count, rng=random):
+        """不放回抽取 count 个不同号码 (重复则重抽)，返回升序列表"""
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(self.sample(rng))
+        return sorted(chosen)
+
+
+def _streak_lengths(incidence):
+    """每个号码截至最新一期的连续开出期数。incidence 为按期号升序的 0/1 矩阵"""
+    return np.cumprod(incidence[::-1].astype(bool), axis=0).sum(axis=0)
+
+
+def _current_omissions(incidence):
+    """每个号码的当前遗漏期数 (最新一期开出为0，从未开出为总期数)，与 calculate_frequency_and_omissions_for_balls 一致"""
+    reversed_incidence = incidence[::-1].astype(bool)
+    return np.where(reversed_incidence.any(axis=0), reversed_incidence.argmax(axis=0), len(incidence))
+
+
+def _resolve_probabilities(ball_range, fixed, pick_count):
+    """
+    把规则指定的号码概率合成为完整的概率向量 (下标即号码，0号位恒为0)。
+    fixed: {号码: 概率}，由调用方按规则编号顺序写入，先写入者优先 (规则冲突时编号在先的优先)。
+    其余号码平分剩余概率；指定概率之和超过1时按比例缩放，其余号码为0。
+    可抽号码不足一注时规则无法满足，退回等概率。
+    """
+    probabilities = np.zeros(ball_range + 1, dtype=np.float64)
+    free_balls = [ball for ball in range(1, ball_range + 1) if ball not in fixed]
+    fixed_total = sum(fixed.values())
+    for ball, probability in fixed.items():
+        probabilities[ball] = probability
+    if fixed_total > 1.0:
+        probabilities /= fixed_total
+    elif free_balls:
+        probabilities[free_balls] = (1.0 - fixed_total) / len(free_balls)
+
+    if np.count_nonzero(probabilities) < pick_count:
+        probabilities[1:] = 1.0
+    return probabilities / probabilities.sum()
+
+
+def _omission_ranks(omissions):
+    """每个号码的遗漏排名 (0为遗漏最多)，即遗漏更多的号码个数，并列取较高名次；0号位无意义"""
+    values = np.asarray(omissions)[1:]
+    return np.concatenate(([0], (values[None, :] > values[:, None]).sum(axis=1)))
+
+
+def red_probabilities_from_features(lottery_type, omissions, streaks, settings):
+    """
+    由每个号码的当前遗漏和连续开出期数计算红球概率向量 (下标即号码)。
+    4.1.2/4.2.2 遗漏期数排名前N的号码取对应权重 (并列按较高名次计算，并列超出N个的都按第N名计算)；
+    4.1.3/4.2.3 连续3期及以上开出的号码取 consecutive_3_prob (双色球第二个及以后取 consecutive_3_second_prob)；
+    4.1.10/4.2.10 遗漏超过12/13/14期的号码取 omit_12/13/14_prob。
+    """
+    red_range = PRIZE_RULES[lottery_type]['red_range']
+    fixed = {}
+    rank_weights = []
+    while f'{lottery_type}_red_omit_{len(rank_weights) + 1}_weight' in settings:
+        rank_weights.append(settings[f'{lottery_type}_red_omit_{len(rank_weights) + 1}_weight'])
+    ranks = _omission_ranks(omissions).tolist()
+    for ball in range(1, red_range + 1):
+        if ranks[ball] < len(rank_weights):
+            fixed.setdefault(ball, rank_weights[ranks[ball]])
+
+    streak_balls = sorted((ball for ball in range(1, red_range + 1) if streaks[ball] >= 3),
+                          key=lambda ball: (-streaks[ball], ball))
+    for index, ball in enumerate(streak_balls):
+        if lottery_type == 'ssq' and index > 0:
+            fixed.setdefault(ball, settings['ssq_red_consecutive_3_second_prob'])
+        else:
+            fixed.setdefault(ball, settings[f'{lottery_type}_red_consecutive_3_prob'])
+
+    for ball in range(1, red_range + 1):
+        for limit in RED_OMISSION_LIMITS:
+            if omissions[ball] > limit:
+                fixed.setdefault(ball, settings[f'{lottery_type}_red_omit_{limit}_prob'])
+                break
+
+    return _resolve_probabilities(red_range, fixed, PICK_COUNTS[lottery_type][0])
+
+
+def build_red_probabilities(lottery_type, red_incidence, settings):
+    """由按期号升序的红球开奖矩阵计算红球概率向量，见 red_probabilities_from_features"""
+    if len(red_incidence) == 0:
+        return _resolve_probabilities(PRIZE_RULES[lottery_type]['red_range'], {}, PICK_COUNTS[lottery_type][0])
+    return red_probabilities_from_features(lottery_type, _current_omissions(red_incidence),
+                                           _streak_lengths(red_incidence), settings)
+
+
+def blue_probabilities_from_features(lottery_type, draws_count, omissions, streaks, recent_occurrences, settings):
+    """
+    由已开奖期数、每个号码的当前遗漏、连续开出期数和最近 N 期 (N 为 blue_recent_occurrence_draws) 出现次数计算蓝球概率向量:
+    双色球 4.1.1 连续5期开出取 consecutive_5_prob，连续3期取 consecutive_3_prob，其余最近 N 期开出过的号码排除；
+    大乐透 4.2.1 连续5期开出取 consecutive_5_prob，上一期开出过的号码取 repeat_prob；
+    4.1.11/4.2.11 最近 N 期出现达到阈值次数的号码取 recent_occurrence_weight。
+    """
+    blue_range = PRIZE_RULES[lottery_type]['blue_range']
+    fixed = {}
+    if lottery_type == 'ssq':
+        # 从未开出的号码遗漏等于已开奖期数，因此遗漏小于 min(N, 已开奖期数) 即最近 N 期开出过
+        recent_limit = min(settings['ssq_blue_omit_latest_draws'], draws_count)
+        for ball in range(1, blue_range + 1):
+            if streaks[ball] >= 5:
+                fixed[ball] = settings['ssq_blue_consecutive_5_prob']
+            elif streaks[ball] >= 3:
+                fixed[ball] = settings['ssq_blue_consecutive_3_prob']
+            elif omissions[ball] < recent_limit:
+                fixed[ball] = 0.0
+    else:
+        for ball in range(1, blue_range + 1):
+            if streaks[ball] >= 5:
+                fixed[ball] = settings['dlt_blue_consecutive_5_prob']
+            elif streaks[ball] >= 1:
+                fixed[ball] = settings['dlt_blue_repeat_prob']
+
+    if settings.get(f'{lottery_type}_blue_recent_occurrence_draws', 0) > 0:
+        threshold = settings[f'{lottery_type}_blue_recent_occurrence_threshold']
+        for ball in range(1, blue_range + 1):
+            if recent_occurrences[ball] >= threshold:
+                fixed.setdefault(ball, settings[f'{lottery_type}_blue_recent_occurrence_weight'])
+
+    return _resolve_probabilities(blue_range, fixed, PICK_COUNTS[lottery_type][1])
+
+
+def build_blue_probabilities(lottery_type, blue_incidence, settings):
+    """由按期号升序的蓝球开奖矩阵计算蓝球概率向量，见 blue_probabilities_from_features"""
+    if len(blue_incidence) == 0:
+        return _resolve_probabilities(PRIZE_RULES[lottery_type]['blue_range'], {}, PICK_COUNTS[lottery_type][1])
+    recent_draws = settings.get(f'{lottery_type}_blue_recent_occurrence_draws', 0)
+    recent_occurrences = blue_incidence[-recent_draws:].sum(axis=0) if recent_draws > 0 else None
+    return blue_probabilities_from_features(lottery_type, len(blue_incidence), _current_omissions(blue_incidence),
+                                            _streak_lengths(blue_incidence), recent_occurrences, settings)
+
+
+def build_red_constraints(lottery_type, red_incidence, settings):
+    """由最近2期开奖和设置构建红球硬性规则；不足2期时与规则检查一致，不限制重复号码"""
+    previous_2_mask = 0
+    if len(red_incidence) >= 2:
+        for ball in np.flatnonzero(red_incidence[-2:].any(axis=0)):
+            previous_2_mask |= 1 << int(ball)
+    return red_constraints_from_mask(lottery_type, previous_2_mask, settings)
+
+
+def red_constraints_from_mask(lottery_type, previous_2_mask, settings):
+    """由前2期红球号码掩码 (不足2期时为0) 和规则集中硬性规则的阈值构建红球硬性规则"""
+    limits = red_hard_limits(lottery_type, settings)
+    return RedConstraints(PRIZE_RULES[lottery_type]['red_range'], PICK_COUNTS[lottery_type][0], previous_2_mask,
+                          limits['area_min_count'], limits['max_repeat'], limits['max_consecutive'], limits['zones'])
+
+
+class SamplerStats:
+    """受限抽样的统计：别名表抽样次数、被拒绝次数、改为直接选择的次数、回溯次数"""
+    def __init__(self):
+        self.tickets = 0
+        self.failed_tickets = 0
+        self.draws = 0
+        self.rejections = 0
+        self.fallbacks = 0
+        self.backtracks = 0
+
+    def to_dict(self):
+        return {
+            'tickets': self.tickets,
+            'failed_tickets': self.failed_tickets,
+            'draws': self.draws,
+            'rejections': self.rejections,
+            'fallbacks': self.fallbacks,
+            'backtracks': self.backtracks,
+            'acceptance_rate': round((self.draws - self.rejections) / self.draws * 100, 2) if self.draws > 0 else 0.0
+        }
+
+
+class RedConstraints:
+    """
+    红球硬性规则 (rule_registry 中 hard 为 True 的规则)，用位掩码 (第 b 位表示号码 b) 在逐个选号时检查:
+    4.1.4/4.2.4 至少分布在 zones [(起始号码, 结束号码), ...] 中的 area_min_count 个分区；
+    4.1.5/4.2.5 与前2期开奖号码重复不超过 max_repeat 个；
+    4.1.6/4.2.6 连号不超过 max_consecutive 个。
+    """
+    def __init__(self, red_range, pick_count, previous_2_mask, area_min_count, max_repeat, max_consecutive, zones):
+        self.red_range = red_range
+        self.pick_count = pick_count
+        self.previous_2_mask = previous_2_mask
+        self.area_min_count = area_min_count
+        self.max_repeat = max_repeat
+        self.max_consecutive = max_consecutive
+        self.zone_count = len(zones)
+        self.area_bits = [0] * (red_range + 1)
+        for area, (start, end) in enumerate(zones):
+            for ball in range(start, end + 1):
+                self.area_bits[ball] = 1 << area
+
+    def satisfiable(self):
+        """设置本身是否自相矛盾 (如分区下限大于分区数或每注号码数)"""
+        return (self.area_min_count <= min(self.zone_count, self.pick_count)
+                and self.max_consecutive >= 1 and self.max_repeat >= 0)
+
+    def allows(self, mask, count, repeats, areas, ball):
+        """已选 count 个号码 (掩码 mask，其中 repeats 个与前2期重复，覆盖分区掩码 areas) 时能否再选 ball"""
+        bit = 1 << ball
+        if mask & bit:
+            return False
+        if self.previous_2_mask & bit and repeats >= self.max_repeat:
+            return False
+        # 剩余名额只够补足分区时，只能选尚未覆盖的分区
+        missing_areas = self.area_min_count - bin(areas).count('1')
+        if missing_areas >= self.pick_count - count and areas & self.area_bits[ball]:
+            return False
+        run = 1
+        neighbour = ball - 1
+        while mask >> neighbour & 1:
+            run += 1
+            neighbour -= 1
+        neighbour = ball + 1
+        while mask >> neighbour & 1:
+            run += 1
+            neighbour += 1
+        return run <= self.max_consecutive
+
+
+class PredictionModel:
+    """某一彩种在某期开奖数据和某版设置下的预测模型：红球/蓝球概率向量及其别名表"""
+    def __init__(self, lottery_type, latest_issue, red_probabilities, blue_probabilities, red_constraints=None):
+        self.lottery_type = lottery_type
+        self.latest_issue = latest_issue
+        self.red_probabilities = red_probabilities
+        self.blue_probabilities = blue_probabilities
+        self.red_sampler = AliasSampler(red_probabilities)
+        self.blue_sampler = AliasSampler(blue_probabilities)
+        self.red_count, self.blue_count = PICK_COUNTS[lottery_type]
+        self.red_constraints = red_constraints
+        self._red_weights = red_probabilities.tolist()
+
+    def sample(self, rng=random):
+        """按概率向量生成一注号码 (不检查硬性规则)，返回 (红球列表, 蓝球列表)"""
+        return (self.red_sampler.sample_distinct(self.red_count, rng),
+                self.blue_sampler.sample_distinct(self.blue_count, rng))
+
+    def sample_many(self, count, rng=random):
+        return [self.sample(rng) for _ in range(count)]
+
+    def _pick_red(self, mask, count, repeats, areas, banned, rng, stats):
+        """在别名表上抽一个满足约束的红球，多次被拒后在允许号码中按权重直接选择；无号码可选时返回 None"""
+        constraints = self.red_constraints
+        for _ in range(MAX_ALIAS_ATTEMPTS):
+            ball = self.red_sampler.sample(rng)
+            stats.draws += 1
+            if not banned >> ball & 1 and constraints.allows(mask, count, repeats, areas, ball):
+                return ball
+            stats.rejections += 1
+
+        stats.fallbacks += 1
+        candidates = [ball for ball in range(1, constraints.red_range + 1)
+                      if self._red_weights[ball] > 0 and not banned >> ball & 1
+                      and constraints.allows(mask, count, repeats, areas, ball)]
+        if not candidates:
+            return None
+        return rng.choices(candidates, weights=[self._red_weights[ball] for ball in candidates])[0]
+
+    def sample_red_constrained(self, rng=random, stats=None):
+        """
+        逐个选择红球，每一步只接受不违反硬性规则的号码；走入死路时撤销上一个号码并在该位置排除它 (回溯)。
+        返回升序红球列表，规则无法满足时返回 None。
+        """
+        stats = stats or SamplerStats()
+        constraints = self.red_constraints
+        if not constraints.satisfiable():
+            return None
+        chosen = []
+        banned = [0] # 每个位置已排除的号码掩码
+        mask = repeats = areas = backtracks = 0
+        while len(chosen) < self.red_count:
+            ball = self._pick_red(mask, len(chosen), repeats, areas, banned[-1], rng, stats)
+            if ball is not None:
+                chosen.append(ball)
+                banned.append(0)
+            elif chosen and backtracks < MAX_BACKTRACKS_PER_TICKET:
+                stats.backtracks += 1
+                backtracks += 1
+                banned.pop()
+                banned[-1] |= 1 << chosen.pop()
+            else:
+                return None
+            mask = sum(1 << b for b in chosen)
+            repeats = bin(mask & constraints.previous_2_mask).count('1')
+            areas = 0
+            for b in chosen:
+                areas |= constraints.area_bits[b]
+        return sorted(chosen)
+
+    def sample_valid(self, rng=random, stats=None):
+        """生成一注满足硬性规则的号码，返回 (红球列表, 蓝球列表)，规则无法满足时返回 None"""
+        stats = stats or SamplerStats()
+        red_balls = self.sample_red_constrained(rng, stats) if self.red_constraints else self.red_sampler.sample_distinct(self.red_count, rng)
+        if red_balls is None:
+            stats.failed_tickets += 1
+            return None
+        stats.tickets += 1
+        return red_balls, self.blue_sampler.sample_distinct(self.blue_count, rng)
+
+    def sample_valid_many(self, count, rng=random, stats=None):
+        """批量生成满足硬性规则的号码，规则无法满足的号码组不计入结果"""
+        stats = stats or SamplerStats()
+        tickets = []
+        for _ in range(count):
+            ticket = self.sample_valid(rng, stats)
+            if ticket is not None:
+                tickets.append(ticket)
+        return tickets
+
+
+def build_prediction_model(lottery_type, settings=None):
+    """根据全部历史开奖数据和设置构建预测模型 (不使用缓存)"""
+    settings = CURRENT_SETTINGS if settings is None else settings
+    draw_arrays = get_draw_arrays(lottery_type)
+    latest_issue = draw_arrays.issues[-1] if len(draw_arrays) else None
+    return PredictionModel(lottery_type, latest_issue,
+                           build_red_probabilities(lottery_type, draw_arrays.red, settings),
+                           build_blue_probabilities(lottery_type, draw_arrays.blue, settings),
+                           build_red_constraints(lottery_type, draw_arrays.red, settings))
+
+
+def get_prediction_model(lottery_type):
+    """获取彩种的预测模型，开奖数据或设置变化前一直复用，生成号码时不再查询数据库"""
+    data_version = get_draw_data_version(lottery_type)
+    settings_version = get_settings_version()
+    cached = _model_cache.get(lottery_type)
+    if cached and cached[0] == data_version and cached[1] == settings_version:
+        return cached[2]
+    model = build_prediction_model(lottery_type)
+    _model_cache[lottery_type] = (data_version, settings_version, model)
+    return model
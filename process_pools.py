@@ -0,0 +1,35 @@
+# process_pools.py
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+_pools = {} # {进程数: ProcessPoolExecutor}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(workers):
+    """
+    按进程数复用进程池 (趣味游戏分片模拟、策略回测共用)，避免每次计算都重新启动子进程。
+    多个请求线程同时调用时只会创建一个进程池。
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            _pools[workers] = pool
+        return pool
+
+
+def shutdown_process_pools():
+    """关闭全部进程池，取消尚未开始的任务 (程序退出时自动调用)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_process_pools)
@@ -1,32 +1,57 @@
 # routes.py
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify, current_app
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify, current_app, Response, stream_with_context
 from datetime import datetime, date
+import json
+import time
 from models import SSQDraw, DLTDraw, News, db
-from data_manager import get_latest_draws
-from config import CURRENT_SETTINGS, STAT_EXPLANATIONS, PRIZE_RULES, PER_BET_PRICE
+from data_manager import get_latest_draws, get_average_floating_prize_amounts
+from config import CURRENT_SETTINGS, STAT_EXPLANATIONS, PRIZE_RULES, PER_BET_PRICE, DLT_ADDITIONAL_BET_PRICE
 from utils import (
     format_lottery_numbers, calculate_odd_even_sum, 
     get_aggregated_stats, calculate_frequency_and_omissions_for_balls,
-    calculate_combination_cost, calculate_prize_details, simulate_fun_game
+    calculate_combination_cost, calculate_prize_details,
+    calculate_ticket_odds, FUN_GAME_CLIENT_MODES
+)
+from draw_calendar import get_next_draw_date
+from draw_store import backtest_tickets, PRIZE_AMOUNT_COLUMNS, ADDITIONAL_PRIZE_AMOUNT_COLUMNS
+from fun_game_jobs import (
+    submit_job as submit_fun_game_job, get_job as get_fun_game_job, cancel_job as cancel_fun_game_job,
+    ACTIVE_JOB_STATUSES as ACTIVE_FUN_GAME_JOB_STATUSES
 )
 from prediction_engine import (
-    check_lottery_rules, generate_random_balls, get_omitted_balls_for_prediction, 
-    generate_predicted_balls, check_ssq_rules_for_balls, check_dlt_rules_for_balls # 导入新的规则检查函数
+    check_lottery_rules, get_omitted_balls_for_prediction,
+    check_ssq_rules_for_balls, check_dlt_rules_for_balls # 导入新的规则检查函数
 )
+from prediction_model import SamplerStats, PICK_COUNTS
+from drawn_index import get_drawn_index
+from ticket_batch import GENERATION_MODES, OUTPUT_FORMATS, iter_ticket_batches, format_ticket, ticket_to_dict, resolve_seed
+from rule_engine import check_tickets_rules, get_draw_rule_badges
+from page_cache import cached_page, conditional_get
+from draw_pagination import paginate_draws
+from history_export import parse_export_params, iter_export_chunks
+from draw_records import load_draw_records
 
 bp = Blueprint('routes', __name__)
 
 @bp.route('/')
+@conditional_get
+@cached_page
 def index():
     latest_ssq = get_latest_draws(SSQDraw, 1)
     latest_dlt = get_latest_draws(DLTDraw, 1)
     homepage_news = News.query.filter_by(is_homepage_display=True, is_public=True).order_by(News.created_at.desc()).limit(3).all()
+    today = date.today()
     return render_template('index.html',
                            latest_ssq=latest_ssq[0] if latest_ssq else None,
                            latest_dlt=latest_dlt[0] if latest_dlt else None,
+                           next_ssq_draw_date=get_next_draw_date('ssq', today),
+                           next_dlt_draw_date=get_next_draw_date('dlt', today),
+                           today=today,
                            homepage_news=homepage_news)
 
 @bp.route('/history')
+@conditional_get
+@cached_page
 def history():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', CURRENT_SETTINGS['history_page_size'], type=int)
@@ -56,24 +81,42 @@ def history():
     else: # default to dlt
         model_class = DLTDraw
 
-    # --- 历史开奖数据分页查询 ---
-    query = model_class.query
-    if start_date_obj:
-        query = query.filter(model_class.draw_date >= start_date_obj)
-    if end_date_obj:
-        query = query.filter(model_class.draw_date <= end_date_obj)
-    
-    draws_pagination = query.order_by(model_class.issue.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    # --- 历史开奖数据分页查询 (按期号 keyset 分页，上一页/下一页带游标，页码链接用缓存的页首期号) ---
+    draws_pagination = paginate_draws(lottery_type, model_class, start_date_obj, end_date_obj, page, per_page,
+                                      after=request.args.get('after'), before=request.args.get('before'))
+    # 本页各期的规则判定已在入库时算好，一次查询取出
+    rule_badges = get_draw_rule_badges(lottery_type, [draw.issue for draw in draws_pagination.items])
 
     return render_template('history.html',
                            draws_pagination=draws_pagination,
+                           rule_badges=rule_badges,
                            lottery_type=lottery_type,
                            per_page=per_page,
                            start_date=start_date_str,
                            end_date=end_date_str
                            )
 
+@bp.route('/api/history/export', methods=['GET'])
+@conditional_get
+def api_history_export():
+    """
+    流式导出历史开奖数据，逐块输出，不在内存中拼接完整响应。
+    参数: lottery_type, format (csv 默认 / ndjson 或 jsonl 每行一个 JSON 对象),
+    fields: 逗号分隔的字段名 (默认 issue,draw_date,red_balls,blue_balls)，
+    start_date / end_date (YYYY-MM-DD)、start_issue / end_issue 按日期或期号范围筛选 (含两端)。
+    """
+    params, error = parse_export_params(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    current_app.logger.info(f"API call: /api/history/export {params['lottery_type']} format={params['format']} fields={params['fields']}")
+    filename = f"{params['lottery_type']}_history.{'csv' if params['format'] == 'csv' else 'jsonl'}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    mimetype = 'text/csv' if params['format'] == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(iter_export_chunks(params)), mimetype=mimetype, headers=headers)
+
 @bp.route('/statistics')
+@conditional_get
 def statistics():
     lottery_type = request.args.get('lottery_type', 'ssq')
 
@@ -108,18 +151,10 @@ def statistics():
         red_ball_range = 35
         blue_ball_range = 12
 
-    # --- 统计数据查询与计算 ---
-    stats_query = model_class.query
-    if start_date_obj:
-        stats_query = stats_query.filter(model_class.draw_date >= start_date_obj)
-    if end_date_obj:
-        stats_query = stats_query.filter(model_class.draw_date <= end_date_obj)
-    
-    # 应用统计范围 (如果 stats_range 不为 0)
-    if stats_range > 0:
-        all_draws_for_stats = stats_query.order_by(model_class.issue.desc()).limit(stats_range).all()
-    else: # stats_range == 0, 表示所有历史数据
-        all_draws_for_stats = stats_query.order_by(model_class.issue.desc()).all()
+    # --- 统计数据查询与计算 (只读取期号、日期和号码) ---
+    # 应用统计范围 (stats_range 为 0 表示所有历史数据)
+    all_draws_for_stats = load_draw_records(lottery_type, start_date_obj, end_date_obj,
+                                            limit=stats_range if stats_range > 0 else None)
 
     # 调用聚合统计函数
     aggregated_stats = get_aggregated_stats(all_draws_for_stats, lottery_type, CURRENT_SETTINGS)
@@ -137,6 +172,8 @@ def statistics():
                            )
 
 @bp.route('/prediction')
+@conditional_get
+@cached_page
 def prediction():
     # 获取最新开奖号码用于显示
     num_latest_draws = CURRENT_SETTINGS.get('prediction_latest_draws', 3)
@@ -156,6 +193,7 @@ def prediction():
                            )
 
 @bp.route('/api/prediction/omitted_balls', methods=['GET'])
+@conditional_get
 def api_prediction_omitted_balls():
     lottery_type = request.args.get('lottery_type')
     current_app.logger.info(f"API call: /api/prediction/omitted_balls for {lottery_type}")
@@ -182,84 +220,127 @@ def api_prediction_omitted_balls():
     return jsonify(formatted_omitted_data)
 
 
-@bp.route('/api/prediction/generate_random', methods=['POST'])
-def api_generate_random_numbers():
-    data = request.get_json()
+def _parse_generation_params(data, mode=None):
+    """
+    解析号码生成参数: lottery_type, mode, count, seed, exclude_drawn。
+    返回: (参数字典, None) 或 (None, 错误信息)
+    """
     lottery_type = data.get('lottery_type')
-    # 修正：dict.get() 不接受 type 关键字参数
-    count = int(data.get('count', 1)) 
-    current_app.logger.info(f"API call: /api/prediction/generate_random for {lottery_type}, count={count}")
-
     if not lottery_type:
-        current_app.logger.warning("API call: Missing lottery_type for generate_random.")
-        return jsonify({'error': 'Missing lottery_type'}), 400
-    
-    if lottery_type == 'ssq':
-        num_red = 6
-        num_blue = 1
-    elif lottery_type == 'dlt':
-        num_red = 5
-        num_blue = 2
-    else:
-        current_app.logger.warning(f"API call: Invalid lottery type '{lottery_type}' for generate_random.")
-        return jsonify({'error': 'Invalid lottery type'}), 400
+        return None, 'Missing lottery_type'
+    if lottery_type not in PICK_COUNTS:
+        return None, 'Invalid lottery type'
+    mode = mode or data.get('mode', 'predicted')
+    if mode not in GENERATION_MODES:
+        return None, 'Invalid mode'
+    max_tickets = CURRENT_SETTINGS.get('prediction_batch_max_tickets', 100000)
+    try:
+        count = int(data.get('count', 1))
+        seed = resolve_seed(data.get('seed') if data.get('seed') not in (None, '') else None)
+    except (ValueError, TypeError):
+        return None, 'count 和 seed 必须为整数'
+    if not 0 < count <= max_tickets:
+        return None, f'生成组数需在 1 到 {max_tickets} 之间'
+    exclude_drawn = data.get('exclude_drawn', False)
+    if isinstance(exclude_drawn, str):
+        exclude_drawn = exclude_drawn.lower() in ('1', 'true', 'yes', 'on')
+    return {'lottery_type': lottery_type, 'mode': mode, 'count': count, 'seed': seed,
+            'exclude_drawn': bool(exclude_drawn)}, None
+
+
+def _generate_numbers_response(mode):
+    """生成接口的 JSON 响应：一次批量生成 count 组互不相同的号码，并返回种子以便下载同一批号码"""
+    params, error = _parse_generation_params(request.get_json(silent=True) or {}, mode)
+    if error:
+        current_app.logger.warning(f"API call: generate_{mode} rejected: {error}")
+        return jsonify({'error': error}), 400
+    # JSON 响应需在内存中拼出全部号码，只用于少量号码；大批量号码使用流式的 generate_batch 接口
+    max_tickets = CURRENT_SETTINGS.get('prediction_generate_max_tickets', 100)
+    if params['count'] > max_tickets:
+        return jsonify({'error': f'一次最多生成 {max_tickets} 组号码，更多号码请使用 /api/prediction/generate_batch 批量生成下载'}), 400
+
+    sampler_stats = SamplerStats()
+    drawn_index = get_drawn_index(params['lottery_type'])
+    generated_numbers = [dict(ticket_to_dict(red_balls, blue_balls), **drawn_index.lookup(red_balls, blue_balls))
+                         for batch in iter_ticket_batches(params['lottery_type'], mode, params['count'], params['seed'],
+                                                          params['exclude_drawn'], sampler_stats)
+                         for red_balls, blue_balls in batch]
+    current_app.logger.info(f"API call: generated {len(generated_numbers)}/{params['count']} {mode} numbers "
+                            f"for {params['lottery_type']} (seed={params['seed']}).")
+    response = {'numbers': generated_numbers, 'seed': params['seed']}
+    if mode == 'predicted':
+        response['sampler_stats'] = sampler_stats.to_dict()
+    return jsonify(response)
 
-    generated_numbers = []
-    for _ in range(count):
-        red_balls, blue_balls = generate_random_balls(lottery_type, num_red, num_blue)
-        # 检查 generate_random_balls 是否返回了 None, None 表示生成失败
-        if red_balls is None or blue_balls is None: 
-            current_app.logger.error(f"API call: Failed to generate random numbers for {lottery_type} due to internal error or invalid ranges.")
-            return jsonify({'error': 'Failed to generate random numbers due to internal error or invalid ranges.'}), 500
-        generated_numbers.append({
-            'red_balls': ','.join(map(str, red_balls)),
-            'blue_balls': ','.join(map(str, blue_balls))
-        })
-    
-    current_app.logger.info(f"API call: Successfully generated {len(generated_numbers)} random numbers for {lottery_type}.")
-    return jsonify({'numbers': generated_numbers})
+
+@bp.route('/api/prediction/generate_random', methods=['POST'])
+def api_generate_random_numbers():
+    return _generate_numbers_response('random')
 
 @bp.route('/api/prediction/generate_predicted', methods=['POST'])
 def api_generate_predicted_numbers():
-    data = request.get_json()
+    return _generate_numbers_response('predicted')
+
+@bp.route('/api/draws/ever_drawn', methods=['POST'])
+def api_ever_drawn():
+    """
+    查询号码是否在历史上开出过 (哈希索引，每注 O(1))。
+    请求: {lottery_type, combinations: [{red_balls: '1,2,3,4,5,6', blue_balls: '7'}, ...]}
+    返回: {'results': [{red_balls, blue_balls, drawn_issues: [期号], red_drawn_issues: [期号]}, ...]}，复式号码两项为 null
+    """
+    data = request.get_json(silent=True) or {}
     lottery_type = data.get('lottery_type')
-    # 修正：dict.get() 不接受 type 关键字参数
-    count = int(data.get('count', 1))
-    current_app.logger.info(f"API call: /api/prediction/generate_predicted for {lottery_type}, count={count}")
-
-    if not lottery_type:
-        current_app.logger.warning("API call: Missing lottery_type for generate_predicted.")
-        return jsonify({'error': 'Missing lottery_type'}), 400
-    
-    # TODO: Implement actual prediction logic here
-    # For now, return random numbers as a placeholder
-    if lottery_type == 'ssq':
-        num_red = 6
-        num_blue = 1
-    elif lottery_type == 'dlt':
-        num_red = 5
-        num_blue = 2
-    else:
-        current_app.logger.warning(f"API call: Invalid lottery type '{lottery_type}' for generate_predicted.")
-        return jsonify({'error': 'Invalid lottery type'}), 400
+    combinations = data.get('combinations')
+    if lottery_type not in PICK_COUNTS or not isinstance(combinations, list) or not combinations:
+        return jsonify({'error': '缺少彩票类型或号码组合'}), 400
+    max_tickets = CURRENT_SETTINGS.get('ever_drawn_check_max_tickets', 10000)
+    if len(combinations) > max_tickets:
+        return jsonify({'error': f'一次最多查询 {max_tickets} 组号码'}), 400
 
-    generated_numbers = []
-    for _ in range(count):
-        red_balls, blue_balls = generate_predicted_balls(lottery_type) # Call the placeholder
-        # 检查 generate_predicted_balls 是否返回了 None, None 表示生成失败
-        if red_balls is None or blue_balls is None:
-            current_app.logger.error(f"API call: Failed to generate predicted numbers for {lottery_type} due to internal error.")
-            return jsonify({'error': 'Failed to generate predicted numbers due to internal error.'}), 500
-        generated_numbers.append({
-            'red_balls': ','.join(map(str, red_balls)),
-            'blue_balls': ','.join(map(str, blue_balls))
-        })
-    
-    current_app.logger.info(f"API call: Successfully generated {len(generated_numbers)} predicted numbers for {lottery_type}.")
-    return jsonify({'numbers': generated_numbers})
+    drawn_index = get_drawn_index(lottery_type)
+    results = []
+    for combo in combinations:
+        red_balls = format_lottery_numbers(combo.get('red_balls', ''))
+        blue_balls = format_lottery_numbers(combo.get('blue_balls', ''))
+        results.append(dict({'red_balls': combo.get('red_balls', ''), 'blue_balls': combo.get('blue_balls', '')},
+                            **drawn_index.lookup(red_balls, blue_balls)))
+    return jsonify({'results': results})
+
+@bp.route('/api/prediction/generate_batch', methods=['GET', 'POST'])
+def api_generate_batch():
+    """
+    流式批量生成号码，逐批输出，不在内存中拼接完整响应。
+    参数 (查询字符串或 JSON): lottery_type, mode (predicted/random), count, seed, exclude_drawn,
+    format: ndjson 每行一个 JSON 对象；text 每行 "01 02 03 04 05 06 + 07"，作为 .txt 附件下载 (规则 4.1.7/4.2.7 保存结果)
+    种子通过响应头 X-Seed 返回。
+    """
+    data = request.get_json(silent=True) or request.args.to_dict()
+    params, error = _parse_generation_params(data)
+    output_format = data.get('format', 'ndjson')
+    if not error and output_format not in OUTPUT_FORMATS:
+        error = 'Invalid format'
+    if error:
+        return jsonify({'error': error}), 400
+
+    current_app.logger.info(f"API call: /api/prediction/generate_batch {params} format={output_format}")
+    batches = iter_ticket_batches(params['lottery_type'], params['mode'], params['count'], params['seed'],
+                                  params['exclude_drawn'])
+
+    def generate():
+        for batch in batches:
+            yield ''.join(format_ticket(red_balls, blue_balls, output_format) + '\n' for red_balls, blue_balls in batch)
+
+    headers = {'X-Seed': str(params['seed']), 'Cache-Control': 'no-cache'}
+    if output_format == 'text':
+        filename = f"{params['lottery_type']}_{params['mode']}_{params['seed']}.txt"
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return Response(stream_with_context(generate()), mimetype='text/plain', headers=headers)
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
 
 
 @bp.route('/prize_check')
+@conditional_get
+@cached_page
 def prize_check():
     # 获取最新一期开奖信息，用于页面显示
     latest_ssq = get_latest_draws(SSQDraw, 1)
@@ -306,9 +387,25 @@ def api_check_prizes():
     except (ValueError, TypeError):
         check_range = CURRENT_SETTINGS.get('prize_check_range', 10) # Fallback to default if conversion fails
 
+    # 大乐透追加投注：每注加价，一、二等奖另得追加奖金
+    additional = bool(data.get('additional')) and lottery_type == 'dlt'
+
     if not lottery_type or not combinations:
         return jsonify({'error': '缺少彩票类型或号码组合'}), 400
 
+    # 回测模式：按全部历史 (或最近 N 期) 的实际奖金向量化计算逐期回报曲线
+    if data.get('mode') == 'backtest':
+        tickets = [{
+            'red_balls': format_lottery_numbers(combo.get('red_balls', '')),
+            'blue_balls': format_lottery_numbers(combo.get('blue_balls', '')),
+            'banker_red_balls': format_lottery_numbers(combo.get('banker_red_balls', '')),
+            'banker_blue_balls': format_lottery_numbers(combo.get('banker_blue_balls', ''))
+        } for combo in combinations]
+        backtest_result = backtest_tickets(lottery_type, tickets, check_range, additional)
+        if 'error' in backtest_result:
+            return jsonify(backtest_result), 404 if backtest_result['error'] == '未找到历史开奖数据' else 400
+        return jsonify(backtest_result)
+
     model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
     
     # 获取最近 N 期开奖数据，如果 check_range 为 0，则获取所有
@@ -323,6 +420,7 @@ def api_check_prizes():
     if not recent_draws:
         return jsonify({'error': '未找到历史开奖数据'}), 404
 
+    drawn_index = get_drawn_index(lottery_type)
     all_results = []
     for combo in combinations:
         user_red_balls_str = combo.get('red_balls')
@@ -333,6 +431,8 @@ def api_check_prizes():
 
         # 计算该组合的投注花费
         cost_details = calculate_combination_cost(len(user_red_balls), len(user_blue_balls), lottery_type)
+        if additional:
+            cost_details['total_cost'] += cost_details['total_bets'] * DLT_ADDITIONAL_BET_PRICE
 
         matches = []
         total_winning_bets_for_combo = 0
@@ -361,20 +461,12 @@ def api_check_prizes():
 
                             if prize_rule['amount'] == '浮动':
                                 # 根据实际开奖数据获取浮动奖金
-                                if prize_level == '一等奖':
-                                    current_prize_amount_numeric = draw.first_prize_amount
-                                elif prize_level == '二等奖':
-                                    current_prize_amount_numeric = draw.second_prize_amount
-                                # 大乐透的浮动奖金也需要类似处理
-                                elif lottery_type == 'dlt':
-                                    if prize_level == '一等奖':
-                                        current_prize_amount_numeric = draw.first_prize_amount
-                                    elif prize_level == '二等奖':
-                                        current_prize_amount_numeric = draw.second_prize_amount
-                                prize_amount_display = f"{current_prize_amount_numeric:,.0f}" # 格式化为字符串
+                                current_prize_amount_numeric = getattr(draw, PRIZE_AMOUNT_COLUMNS[prize_level]) or 0
                             else:
                                 current_prize_amount_numeric = prize_rule['amount']
-                                prize_amount_display = f"{current_prize_amount_numeric:,.0f}" # 固定奖金也格式化
+                            if additional and prize_level in ADDITIONAL_PRIZE_AMOUNT_COLUMNS:
+                                current_prize_amount_numeric += getattr(draw, ADDITIONAL_PRIZE_AMOUNT_COLUMNS[prize_level]) or 0
+                            prize_amount_display = f"{current_prize_amount_numeric:,.0f}" # 格式化为字符串
 
                             # 累加总中奖注数和总中奖金额
                             total_winning_bets_for_combo += prize_count
@@ -406,11 +498,42 @@ def api_check_prizes():
             'actual_checked_draws_count': actual_checked_draws_count, # 实际检查的期数
             'total_cost_for_range': total_cost_for_range, # 在此范围内的总花费
             'return_rate': round(return_rate, 1), # 新增：回报率，保留1位小数
-            'matches': matches
+            'matches': matches,
+            **drawn_index.lookup(user_red_balls, user_blue_balls) # 该注号码历史上是否开出过
         })
     
     return jsonify({'results': all_results})
 
+@bp.route('/api/prize_odds', methods=['POST'])
+def api_prize_odds():
+    """复式/胆拖投注的精确中奖概率与期望回报 (无需模拟)"""
+    data = request.get_json()
+    lottery_type = data.get('lottery_type')
+    combinations = data.get('combinations') # [{red_balls: '1,2,3', blue_balls: '1', banker_red_balls: '', banker_blue_balls: ''}, ...]
+
+    if lottery_type not in PRIZE_RULES or not combinations:
+        return jsonify({'error': '缺少彩票类型或号码组合'}), 400
+
+    # 浮动奖金按历史开奖的平均单注奖金估算
+    model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
+    floating_prize_amounts = get_average_floating_prize_amounts(model_class)
+
+    all_results = []
+    for combo in combinations:
+        odds_result = calculate_ticket_odds(
+            format_lottery_numbers(combo.get('red_balls', '')),
+            format_lottery_numbers(combo.get('blue_balls', '')),
+            lottery_type,
+            banker_red_balls=format_lottery_numbers(combo.get('banker_red_balls', '')),
+            banker_blue_balls=format_lottery_numbers(combo.get('banker_blue_balls', '')),
+            floating_prize_amounts=floating_prize_amounts
+        )
+        if 'error' in odds_result:
+            return jsonify(odds_result), 400
+        all_results.append(odds_result)
+
+    return jsonify({'results': all_results, 'floating_prize_amounts': floating_prize_amounts})
+
 @bp.route('/api/prediction/check_generated_rules', methods=['POST']) # 新增API路由，用于检查生成号码的规则
 def api_check_generated_rules():
     data = request.get_json()
@@ -437,37 +560,155 @@ def api_check_generated_rules():
     return jsonify(results)
 
 
-@bp.route('/api/fun_game', methods=['POST'])
-def api_fun_game():
-    data = request.get_json()
+@bp.route('/api/prediction/check_generated_rules_batch', methods=['POST'])
+def api_check_generated_rules_batch():
+    """批量检查生成号码的规则，全部号码共用一次读取的历史开奖"""
+    data = request.get_json() or {}
     lottery_type = data.get('lottery_type')
     combinations = data.get('combinations') # [{red_balls: '1,2,3', blue_balls: '1'}, ...]
 
     if not lottery_type or not combinations:
-        return jsonify({'error': '缺少彩票类型或号码组合'}), 400
+        return jsonify({'error': 'Missing lottery_type or combinations'}), 400
+    if lottery_type not in ('ssq', 'dlt'):
+        return jsonify({'error': 'Invalid lottery type'}), 400
+
+    max_tickets = CURRENT_SETTINGS.get('prediction_rule_check_max_tickets', 10000)
+    if len(combinations) > max_tickets:
+        return jsonify({'error': f'一次最多检查 {max_tickets} 组号码'}), 400
+
+    tickets = [(format_lottery_numbers(combo.get('red_balls')), format_lottery_numbers(combo.get('blue_balls')))
+               for combo in combinations]
+    if any(not red_balls or not blue_balls for red_balls, blue_balls in tickets):
+        return jsonify({'error': 'Missing balls data'}), 400
 
-    # 趣味游戏只处理第一个号码组合
-    first_combo = combinations[0]
-    user_red_balls_str = first_combo.get('red_balls')
-    user_blue_balls_str = first_combo.get('blue_balls')
+    results = check_tickets_rules(lottery_type, tickets)
+    current_app.logger.info(f"API call: Checked generated rules for {len(tickets)} {lottery_type} tickets in batch.")
+    return jsonify({'results': results})
 
-    user_red_balls = format_lottery_numbers(user_red_balls_str)
-    user_blue_balls = format_lottery_numbers(user_blue_balls_str)
 
-    max_simulations_val = data.get('max_simulations', CURRENT_SETTINGS.get('fun_game_max_simulations', 1000000))
+def _parse_fun_game_request(data):
+    """解析趣味游戏请求参数，返回 (彩票类型, [(红球, 蓝球), ...], 最大模拟次数, 模拟方式, 随机种子, 错误信息)"""
+    lottery_type = data.get('lottery_type')
+    combinations = data.get('combinations') # [{red_balls: '1,2,3', blue_balls: '1'}, ...]
+
+    if not lottery_type or not combinations:
+        return None, None, None, None, None, '缺少彩票类型或号码组合'
+
+    max_tickets = CURRENT_SETTINGS.get('fun_game_max_tickets', 20)
+    if len(combinations) > max_tickets:
+        return None, None, None, None, None, f'趣味游戏最多同时模拟 {max_tickets} 组号码'
+
+    # 所有号码组合共用同一串虚拟开奖
+    tickets = [(format_lottery_numbers(combo.get('red_balls')), format_lottery_numbers(combo.get('blue_balls')))
+               for combo in combinations]
+
+    # 客户端传入的模拟次数不能超过设置的上限
+    max_simulations_limit = CURRENT_SETTINGS.get('fun_game_max_simulations', 1000000)
     try:
-        max_simulations = int(max_simulations_val)
+        max_simulations = int(data.get('max_simulations', max_simulations_limit))
     except (ValueError, TypeError):
-        max_simulations = CURRENT_SETTINGS.get('fun_game_max_simulations', 1000000) # Fallback to default
+        max_simulations = max_simulations_limit # Fallback to default
+    max_simulations = min(max(max_simulations, 1), max_simulations_limit)
 
-    # 调用 simulate_fun_game，只传递一个组合
-    sim_result = simulate_fun_game(user_red_balls, user_blue_balls, lottery_type, max_simulations)
-    
-    # 返回结果，因为只模拟了一个组合，所以直接返回其结果
-    return jsonify({'results': [sim_result]})
+    # 未指定时使用设置的模拟方式 (管理员可设为 sharded / brute_force)；客户端只能指定开销有限的方式
+    fun_game_mode = data.get('mode') or CURRENT_SETTINGS.get('fun_game_mode', 'vectorized')
+    if data.get('mode') and fun_game_mode not in FUN_GAME_CLIENT_MODES:
+        return None, None, None, None, None, f"无效的模拟方式，可选: {', '.join(FUN_GAME_CLIENT_MODES)}"
+
+    # 传入相同的随机种子可以复现同一次模拟结果
+    seed = data.get('seed')
+    if seed is not None and seed != '':
+        try:
+            seed = int(seed)
+        except (ValueError, TypeError):
+            seed = -1
+        if seed < 0:
+            return None, None, None, None, None, '随机种子必须是非负整数'
+    else:
+        seed = None
+    return lottery_type, tickets, max_simulations, fun_game_mode, seed, None
+
+
+@bp.route('/api/fun_game', methods=['POST'])
+def api_fun_game():
+    data = request.get_json()
+    lottery_type, tickets, max_simulations, fun_game_mode, seed, error = _parse_fun_game_request(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # 同步接口同样经过后台任务队列，受每 IP 并发任务数和工作线程数限制；
+    # 最多等待 fun_game_sync_timeout_seconds 秒，超时后取消任务，释放工作线程和该 IP 的并发名额
+    drawn_index = get_drawn_index(lottery_type)
+    drawn_lookups = [drawn_index.lookup(red_balls, blue_balls) for red_balls, blue_balls in tickets]
+    job, error = submit_fun_game_job(request.remote_addr, lottery_type, tickets, max_simulations, fun_game_mode, seed,
+                                     drawn_lookups)
+    if error:
+        return jsonify({'error': error}), 429
+    if not job.done_event.wait(CURRENT_SETTINGS.get('fun_game_sync_timeout_seconds', 30)):
+        cancel_fun_game_job(job.job_id)
+        return jsonify({'error': '趣味游戏模拟超时，已取消。模拟次数较多时请使用 /api/fun_game/jobs 提交后台任务。'}), 504
+    if job.result is None:
+        return jsonify({'error': job.error or '趣味游戏模拟已取消。'}), 400
+    return jsonify(job.result)
+
+
+@bp.route('/api/fun_game/jobs', methods=['POST'])
+def api_fun_game_submit_job():
+    """提交后台模拟任务，立即返回任务ID，之后通过状态接口或 SSE 获取进度和结果"""
+    data = request.get_json()
+    lottery_type, tickets, max_simulations, fun_game_mode, seed, error = _parse_fun_game_request(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    drawn_index = get_drawn_index(lottery_type)
+    drawn_lookups = [drawn_index.lookup(red_balls, blue_balls) for red_balls, blue_balls in tickets]
+    job, error = submit_fun_game_job(request.remote_addr, lottery_type, tickets, max_simulations, fun_game_mode, seed,
+                                     drawn_lookups)
+    if error:
+        return jsonify({'error': error}), 429
+    return jsonify(job.to_dict()), 202
+
+
+@bp.route('/api/fun_game/jobs/<job_id>', methods=['GET'])
+def api_fun_game_job_status(job_id):
+    job = get_fun_game_job(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
+
+
+@bp.route('/api/fun_game/jobs/<job_id>/events', methods=['GET'])
+def api_fun_game_job_events(job_id):
+    """以 Server-Sent Events 推送任务进度，任务结束后推送最终结果并关闭连接"""
+    job = get_fun_game_job(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+
+    def generate():
+        last_draw_count = None
+        while True:
+            job_data = job.to_dict()
+            if job_data['status'] not in ACTIVE_FUN_GAME_JOB_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job_data, ensure_ascii=False)}\n\n"
+                return
+            if job_data['draw_count'] != last_draw_count:
+                last_draw_count = job_data['draw_count']
+                yield f"data: {json.dumps(job_data, ensure_ascii=False)}\n\n"
+            time.sleep(0.5)
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+@bp.route('/api/fun_game/jobs/<job_id>/cancel', methods=['POST'])
+def api_fun_game_cancel_job(job_id):
+    job = cancel_fun_game_job(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
 
 
 @bp.route('/news/<int:news_id>')
+@conditional_get
 def news_detail(news_id):
     news_item = News.query.get_or_404(news_id)
     if not news_item.is_public and not session.get('logged_in_admin'):
@@ -481,6 +722,7 @@ def news_detail(news_id):
 
 # 原有的 /api/check_rules 保持不变，用于检查历史期号
 @bp.route('/api/check_rules', methods=['GET']) # 保持GET请求，用于检查历史期号
+@conditional_get
 def api_check_rules_historical(): # 重命名以避免与新的POST路由冲突
     lottery_type = request.args.get('lottery_type')
     issue = request.args.get('issue')
@@ -0,0 +1,236 @@
+# rule_engine.py
+import hashlib
+import json
+import time
+import numpy as np
+from config import CURRENT_SETTINGS
+from models import db, SSQDraw, DLTDraw, DrawRuleResult
+from draw_store import get_draw_arrays
+from draw_records import load_draw_records
+from rule_registry import (RULES, balls_mask, compile_rules, history_context, incidence_masks, rule_setting_keys,
+                           ticket_context)
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+
+class HistorySnapshot:
+    """
+    一次批量检查共用的规则集和历史窗口：按规则集所需的期数 (全部规则的并集) 只查询一次数据库，
+    保存最新若干期 (最新在前) 的号码位掩码。生成的号码视为最新一期之后的下一期。
+    """
+    def __init__(self, lottery_type, compiled, draws):
+        self.lottery_type = lottery_type
+        self.compiled = compiled
+        self.red_masks = [draw.red_mask for draw in draws]
+        self.blue_masks = [draw.blue_mask for draw in draws]
+
+    def __len__(self):
+        return len(self.red_masks)
+
+
+def _latest_draws(lottery_type, count, issue=None):
+    """最新 count 期 (指定 issue 时为该期及之前的 count 期) 的开奖记录 (DrawRecord)，最新在前"""
+    return load_draw_records(lottery_type, max_issue=issue, limit=count) if count > 0 else []
+
+
+def load_history_snapshot(lottery_type, settings=None):
+    """编译当前设置下的规则集，并读取其所需的最新几期开奖 (只取号码字段)"""
+    compiled = compile_rules(lottery_type, settings)
+    return HistorySnapshot(lottery_type, compiled, _latest_draws(lottery_type, compiled.history_depth))
+
+
+def check_tickets_rules(lottery_type, tickets, snapshot=None):
+    """
+    批量检查生成号码的规则，所有号码共用一份历史快照，各规则对全部号码向量化判定后再逐组生成提示。
+    tickets: [(红球列表, 蓝球列表), ...]
+    返回: 与 tickets 顺序对应的规则检查结果列表，彩种无效时返回 {'error': ...}
+    """
+    if lottery_type not in RULES:
+        return {'error': 'Invalid lottery type'}
+    snapshot = snapshot or load_history_snapshot(lottery_type)
+    red_masks = np.array([balls_mask(red_balls) for red_balls, _ in tickets], dtype=np.uint64)
+    blue_masks = np.array([balls_mask(blue_balls) for _, blue_balls in tickets], dtype=np.uint64)
+    context = ticket_context(lottery_type, red_masks, blue_masks, snapshot.red_masks, snapshot.blue_masks)
+    return snapshot.compiled.explain(context, snapshot.compiled.passed(context), tickets)
+
+
+def check_draw_rules(lottery_type, issue, settings=None):
+    """
+    检查某一期开奖号码的规则，该期及所需的前期开奖一次查询取出。
+    返回: {规则键: {'passed': ..., 'message': ...}}，彩种无效或期号不存在时返回 {'error': ...}
+    """
+    if lottery_type not in RULES:
+        return {'error': 'Invalid lottery type'}
+    compiled = compile_rules(lottery_type, settings)
+    draws = _latest_draws(lottery_type, compiled.history_depth + 1, issue)
+    if not draws or draws[0].issue != issue:
+        model_class = SSQDraw if lottery_type == 'ssq' else DLTDraw
+        return {'error': f'{model_class.__name__} not found for issue {issue}'}
+    draws.reverse()
+    context = history_context(lottery_type, np.array([draw.red_mask for draw in draws], dtype=np.uint64),
+                              np.array([draw.blue_mask for draw in draws], dtype=np.uint64),
+                              compiled.history_depth)
+    # 逐期的提示只需要最后一期 (即该期本身)
+    tickets = [(draw.get_red_balls_list(), draw.get_blue_balls_list()) for draw in draws]
+    return compiled.explain(context, compiled.passed(context), tickets)[-1]
+
+
+# --- 历史开奖规则回测 ---
+
+# 历史开奖规则检查结果的键 (与 check_draw_rules 一致) 及中文名称
+HISTORY_RULES = {lottery_type: tuple((rule.key, rule.label) for rule in rules) for lottery_type, rules in RULES.items()}
+
+
+def evaluate_history_rules(draw_arrays, settings=None):
+    """
+    用规则集的向量化判定一次计算每一期开奖的规则检查结果，与逐期调用 check_draw_rules 的 passed 完全一致。
+    draw_arrays: draw_store.DrawArrays (按期号升序)
+    返回: {规则键: 形如 (期数,) 的布尔数组，True 表示通过}
+    """
+    lottery_type = draw_arrays.lottery_type
+    compiled = compile_rules(lottery_type, settings)
+    context = history_context(lottery_type, incidence_masks(draw_arrays.red), incidence_masks(draw_arrays.blue),
+                              compiled.history_depth)
+    return compiled.passed(context)
+
+
+def _pass_rates(results, keys, selection):
+    """selection 选中的各期 (非空) 上每条规则的通过率 (%)"""
+    return {key: round(float(results[key][selection].mean()) * 100, 2) for key in keys}
+
+
+def backtest_history_rules(lottery_type, window=100):
+    """
+    全部历史开奖的规则回测：各规则的总体通过率、按年通过率和按窗口 (每 window 期，从最新一期往前划分) 通过率。
+    返回: 回测结果字典，无数据时返回 {'error': ...}
+    """
+    if lottery_type not in HISTORY_RULES:
+        return {'error': 'Invalid lottery type'}
+    draw_arrays = get_draw_arrays(lottery_type)
+    if len(draw_arrays) == 0:
+        return {'error': '未找到历史开奖数据'}
+
+    start_time = time.perf_counter()
+    results = evaluate_history_rules(draw_arrays)
+    keys = [key for key, _ in HISTORY_RULES[lottery_type]]
+    draws_count = len(draw_arrays)
+
+    rules = []
+    for key, label in HISTORY_RULES[lottery_type]:
+        passed = int(results[key].sum())
+        rules.append({
+            'key': key,
+            'label': label,
+            'passed': passed,
+            'failed': draws_count - passed,
+            'pass_rate': round(passed / draws_count * 100, 2)
+        })
+
+    years = np.array([draw_date.year if draw_date else 0 for draw_date in draw_arrays.draw_dates])
+    year_stats = []
+    for year in sorted(set(years.tolist())):
+        selection = years == year
+        year_stats.append({'year': year, 'draws_count': int(selection.sum()), 'pass_rates': _pass_rates(results, keys, selection)})
+
+    window = max(1, int(window))
+    window_stats = []
+    for end in range(draws_count, 0, -window):
+        selection = np.arange(max(0, end - window), end)
+        window_stats.append({
+            'start_issue': draw_arrays.issues[selection[0]],
+            'end_issue': draw_arrays.issues[selection[-1]],
+            'draws_count': len(selection),
+            'pass_rates': _pass_rates(results, keys, selection)
+        })
+    window_stats.reverse()
+
+    return {
+        'lottery_type': lottery_type,
+        'draws_count': draws_count,
+        'window': window,
+        'rules': rules,
+        'years': year_stats,
+        'windows': window_stats,
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 2)
+    }
+
+
+# --- 每期开奖规则判定结果的存储 ---
+
+# 历史开奖规则的判定逻辑修改后加1，已存储的判定结果会全部重算
+RULES_VERSION = 2
+
+
+def rule_settings_signature(lottery_type):
+    """规则版本和规则集声明读取的设置的摘要，与存储的摘要不同说明判定结果需要重算"""
+    values = [RULES_VERSION] + [CURRENT_SETTINGS.get(f'{lottery_type}_{key}') for key in rule_setting_keys(lottery_type)]
+    return hashlib.sha1(json.dumps(values).encode('utf-8')).hexdigest()
+
+
+def history_rule_flags(results, lottery_type):
+    """把 evaluate_history_rules 的结果压缩为每期一个整数，第 k 位对应第 k 条规则是否通过"""
+    keys = [key for key, _ in HISTORY_RULES[lottery_type]]
+    flags = np.zeros(len(results[keys[0]]), dtype=np.int64)
+    for bit, key in enumerate(keys):
+        flags |= results[key].astype(np.int64) << bit
+    return flags
+
+
+def refresh_draw_rule_results(lottery_type):
+    """
+    用一次滑动遍历重算全部开奖的规则判定，只写入新增或发生变化的行。
+    新增开奖 (包括补录较早期号) 和规则相关设置修改后调用。返回写入的行数。
+    """
+    draw_arrays = get_draw_arrays(lottery_type)
+    if len(draw_arrays) == 0:
+        return 0
+    flags = history_rule_flags(evaluate_history_rules(draw_arrays), lottery_type).tolist()
+    signature = rule_settings_signature(lottery_type)
+
+    existing = {row.issue: row for row in DrawRuleResult.query.with_entities(
+        DrawRuleResult.id, DrawRuleResult.issue, DrawRuleResult.passed_flags, DrawRuleResult.rules_signature
+    ).filter_by(lottery_type=lottery_type)}
+    inserts = []
+    updates = []
+    for issue, passed_flags in zip(draw_arrays.issues, flags):
+        row = existing.get(issue)
+        if row is None:
+            inserts.append({'lottery_type': lottery_type, 'issue': issue,
+                            'passed_flags': passed_flags, 'rules_signature': signature})
+        elif row.passed_flags != passed_flags or row.rules_signature != signature:
+            updates.append({'id': row.id, 'passed_flags': passed_flags, 'rules_signature': signature})
+
+    if inserts:
+        db.session.bulk_insert_mappings(DrawRuleResult, inserts)
+    if updates:
+        db.session.bulk_update_mappings(DrawRuleResult, updates)
+    db.session.commit()
+    return len(inserts) + len(updates)
+
+
+def refresh_rule_results_if_settings_changed():
+    """规则相关设置修改后批量重算；设置未变时只做一次查询"""
+    refreshed = 0
+    for lottery_type in HISTORY_RULES:
+        stale = DrawRuleResult.query.filter(DrawRuleResult.lottery_type == lottery_type,
+                                            DrawRuleResult.rules_signature != rule_settings_signature(lottery_type)).first()
+        if stale:
+            refreshed += refresh_draw_rule_results(lottery_type)
+    return refreshed
+
+
+def get_draw_rule_badges(lottery_type, issues):
+    """
+    读取一页开奖的规则判定，用于历史页面直接显示通过/未通过标记。
+    返回: {期号: [{'rule': '4.1.1', 'label': '4.1.1 蓝球连续开出', 'passed': True}, ...]}，未计算的期号不在结果中
+    """
+    if lottery_type not in HISTORY_RULES or not issues:
+        return {}
+    rows = DrawRuleResult.query.with_entities(DrawRuleResult.issue, DrawRuleResult.passed_flags)\
+                               .filter(DrawRuleResult.lottery_type == lottery_type, DrawRuleResult.issue.in_(issues)).all()
+    badges = {}
+    for issue, passed_flags in rows:
+        badges[issue] = [{'rule': label.split(' ')[0], 'label': label, 'passed': bool(passed_flags >> bit & 1)}
+                         for bit, (_, label) in enumerate(HISTORY_RULES[lottery_type])]
+    return badges
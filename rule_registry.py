@@ -0,0 +1,468 @@
+# rule_registry.py
+import numpy as np
+from config import CURRENT_SETTINGS, PRIZE_RULES
+from utils import get_consecutive_groups
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 0..255 每个字节中1的个数，numpy 没有 bitwise_count 时按字节查表计算位数
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(masks):
+    """uint64 数组每个元素中1的个数"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks)
+    return _BYTE_POPCOUNT[np.ascontiguousarray(masks).reshape(-1).view(np.uint8)].reshape(-1, 8).sum(axis=1).reshape(masks.shape)
+
+
+def balls_mask(balls):
+    """号码列表 -> 位掩码，第 b 位表示号码 b"""
+    mask = 0
+    for ball in balls:
+        mask |= 1 << ball
+    return mask
+
+
+def incidence_masks(incidence):
+    """形如 (期数, 号码范围+1) 的 0/1 矩阵 -> 每期号码的 uint64 位掩码"""
+    bits = np.left_shift(np.uint64(1), np.arange(incidence.shape[1], dtype=np.uint64))
+    return np.bitwise_or.reduce(np.where(incidence.astype(bool), bits, np.uint64(0)), axis=1)
+
+
+def red_zones(lottery_type, upper_bounds):
+    """按分区上界划分红球号码范围，返回非空分区 [(起始号码, 结束号码), ...]"""
+    red_range = PRIZE_RULES[lottery_type]['red_range']
+    zones = []
+    start = 1
+    for bound in sorted(set(int(bound) for bound in upper_bounds)) + [red_range]:
+        end = min(bound, red_range)
+        if end >= start:
+            zones.append((start, end))
+            start = end + 1
+    return zones
+
+
+class RuleContext:
+    """
+    一次规则评估的输入，全部为 uint64 位掩码 (第 b 位表示号码 b)，对 N 个候选号码同时计算:
+    red / blue: 候选号码的掩码，形如 (N,) (所有候选相同时可为标量)
+    previous_red / previous_blue: 第 k 项为候选之前第 k+1 期开奖的掩码 (数组或标量)，没有该期时为0
+    previous_count: 候选之前已有的开奖期数 (数组或标量)
+    includes_candidate: 候选本身是否是已开出的一期。检查历史开奖时为 True，"含当期的最近 n 期" 从候选本身算起；
+        检查生成号码时为 False，与模拟下一期的查询一致，"含当期的最近 n 期" 就是最新 n 期开奖
+    """
+    def __init__(self, lottery_type, red, blue, previous_red, previous_blue, previous_count, includes_candidate):
+        self.lottery_type = lottery_type
+        self.red = red
+        self.blue = blue
+        self.previous_red = previous_red
+        self.previous_blue = previous_blue
+        self.previous_count = previous_count
+        self.includes_candidate = includes_candidate
+
+    def previous(self, zone, k):
+        """候选之前第 k+1 期的掩码 (k 从0开始)"""
+        masks = self.previous_red if zone == 'red' else self.previous_blue
+        return masks[k] if k < len(masks) else 0
+
+    def window(self, zone, k):
+        """"含当期的最近几期" 中的第 k 期 (k 从0开始，最新在前)"""
+        if not self.includes_candidate:
+            return self.previous(zone, k)
+        if k == 0:
+            return self.red if zone == 'red' else self.blue
+        return self.previous(zone, k - 1)
+
+    def window_count(self):
+        return self.previous_count + 1 if self.includes_candidate else self.previous_count
+
+    def rows(self):
+        """逐个候选单独的上下文，全部为 Python 整数 (逐组生成提示时使用)"""
+        count = len(self.red) if np.ndim(self.red) else 1
+        red_depth = len(self.previous_red)
+        columns = [_column(value, count) for value in
+                   (self.red, self.blue, self.previous_count, *self.previous_red, *self.previous_blue)]
+        for red, blue, previous_count, *previous in zip(*columns):
+            yield RuleContext(self.lottery_type, red, blue, previous[:red_depth], previous[red_depth:],
+                              previous_count, self.includes_candidate)
+
+
+def _column(value, count):
+    """数组或所有候选共用的标量 -> 长度为 count 的 Python 整数序列"""
+    return np.asarray(value).tolist() if np.ndim(value) else [int(value)] * count
+
+
+def _streak_bits(context, zone, bits, length):
+    """bits 中在 "含当期的最近 length 期" 每期都开出的号码"""
+    for k in range(length):
+        bits = bits & context.window(zone, k)
+    return bits
+
+
+def _streak_count(row, zone, ball, depth):
+    """号码 ball 从含当期的最新一期起连续开出的期数 (最多 depth 期)"""
+    bit = 1 << ball
+    count = 0
+    while count < depth and row.window(zone, count) & bit:
+        count += 1
+    return count
+
+
+def _streak_tiers(value):
+    """连续开出期数的档位设置 (整数或列表) -> 升序去重的正整数列表"""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return sorted(set(int(v) for v in values if int(v) > 0))
+
+
+class Rule:
+    """
+    一条规则的声明，双色球和大乐透共用，按彩种的名称 (names) 生成提示:
+    key 结果键；label 中文名称 (以规则编号开头)；setting_keys 读取的设置项 (不含彩种前缀)；
+    hard 为 True 表示生成号码时逐个选号强制满足 (见 prediction_model.RedConstraints)。
+    子类实现 history_depth (需要的前期开奖期数)、compile (返回向量化判定函数) 和 explain (生成单个候选的提示)。
+    explain 的 row 为 RuleContext.row 得到的单个候选上下文，passed 为 compile 得到的判定，提示与判定始终一致。
+    """
+    setting_keys = ()
+    zone = 'red'
+    hard = False
+
+    def __init__(self, key, label, names):
+        self.key = key
+        self.label = label
+        self.number = label.split(' ')[0]
+        self.names = names
+
+    def params(self, lottery_type, settings):
+        return {key: settings[f'{lottery_type}_{key}'] for key in self.setting_keys}
+
+    def history_depth(self, params):
+        return 0
+
+    def compile(self, lottery_type, params):
+        """返回 predicate(context) -> 形如 (N,) 的布尔数组，True 表示通过"""
+        raise NotImplementedError
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        """单个候选的结果 {'passed': ..., 'message': ...}"""
+        raise NotImplementedError
+
+    def summary(self, params):
+        """规则阈值的简短说明 (管理后台显示)"""
+        return self.label
+
+
+class BlueStreakRule(Rule):
+    """4.1.1 蓝球 (复式时为最小的蓝球) 在含当期的最近几期连续开出，达到任一档位即不通过"""
+    setting_keys = ('blue_consecutive_fail_draws',)
+    zone = 'blue'
+
+    def params(self, lottery_type, settings):
+        params = super().params(lottery_type, settings)
+        params['tiers'] = _streak_tiers(params['blue_consecutive_fail_draws'])
+        return params
+
+    def history_depth(self, params):
+        return max(params['tiers'], default=0)
+
+    def compile(self, lottery_type, params):
+        tiers = params['tiers']
+
+        def predicate(context):
+            if not tiers:
+                return np.ones(np.shape(context.blue), dtype=bool)
+            lowest = context.blue & (~context.blue + np.uint64(1))
+            return _streak_bits(context, 'blue', lowest, tiers[0]) == 0
+        return predicate
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        tiers = params['tiers']
+        blue_ball = blue_balls[0]
+        if passed:
+            return {'passed': True, 'message': f'规则{self.number}: {self.names["blue"]} {blue_ball} 未连续开出{"或".join(map(str, tiers))}期。'}
+        count = _streak_count(row, 'blue', blue_ball, tiers[-1])
+        tier = max(t for t in tiers if t <= count)
+        return {'passed': False, 'message': f'规则{self.number}: {self.names["blue"]} {blue_ball} 连续开出 {count} 期 (>={tier}期)。'}
+
+    def summary(self, params):
+        return f'{self.names["blue"]}不连续开出{"或".join(map(str, params["tiers"]))}期'
+
+
+class BlueRepeatLatestRule(BlueStreakRule):
+    """4.2.1 后区号码与前一期重复，或有号码在含当期的最近几期连续开出，即不通过"""
+
+    def history_depth(self, params):
+        return max([1] + params['tiers'])
+
+    def compile(self, lottery_type, params):
+        tiers = params['tiers']
+
+        def predicate(context):
+            passed = (context.blue & context.previous('blue', 0)) == 0
+            if tiers:
+                passed &= _streak_bits(context, 'blue', context.blue, tiers[0]) == 0
+            return passed
+        return predicate
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        tiers = params['tiers']
+        name = self.names['blue']
+        if passed:
+            return {'passed': True, 'message': f'规则{self.number}: {name}与前一期无重复，且无号码连续开出{"或".join(map(str, tiers))}期。'}
+        current_blue_balls = set(blue_balls)
+        previous_mask = row.previous('blue', 0)
+        intersection = current_blue_balls.intersection(ball for ball in current_blue_balls if previous_mask >> ball & 1)
+        if intersection:
+            return {'passed': False, 'message': f'规则{self.number}: {name} {list(intersection)} 与前一期有重复。'}
+        for ball in current_blue_balls:
+            count = _streak_count(row, 'blue', ball, tiers[-1])
+            if count >= tiers[0]:
+                tier = max(t for t in tiers if t <= count)
+                return {'passed': False, 'message': f'规则{self.number}: {name} {ball} 连续开出 {count} 期 (>={tier}期)。'}
+
+    def summary(self, params):
+        tiers = params['tiers']
+        return f'{self.names["blue"]}与前一期不重复且不连续开出{"或".join(map(str, tiers))}期'
+
+
+class RedStreakRule(Rule):
+    """4.1.3 / 4.2.3 红球中有号码在含当期的最近 N 期都开出即不通过，不足 N 期时通过"""
+    setting_keys = ('red_consecutive_repeat_draws',)
+
+    def history_depth(self, params):
+        return params['red_consecutive_repeat_draws']
+
+    def compile(self, lottery_type, params):
+        draws = params['red_consecutive_repeat_draws']
+        return lambda context: _streak_bits(context, 'red', context.red, draws) == 0
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        draws = params['red_consecutive_repeat_draws']
+        if row.window_count() < draws:
+            return {'passed': True, 'message': f'规则{self.number}: 无足够前期数据进行{self.names["red"]}连续重复检查。'}
+        if passed:
+            return {'passed': True, 'message': f'规则{self.number}: {self.names["red_ball"]}未出现连续{draws}期及以上重复。'}
+        repeated_mask = _streak_bits(row, 'red', row.red, draws)
+        # 与原逐期检查一样，按集合的遍历顺序报告第一个号码
+        ball = next(ball for ball in set(red_balls) if repeated_mask >> ball & 1)
+        return {'passed': False, 'message': f'规则{self.number}: {self.names["red_ball"]} {ball} 连续{draws}期及以上开出。'}
+
+    def summary(self, params):
+        return f'{self.names["red_ball"]}不连续{params["red_consecutive_repeat_draws"]}期开出'
+
+
+class RedAreaRule(Rule):
+    """4.1.4 / 4.2.4 红球至少分布在 N 个分区，分区由上界设置划分"""
+    setting_keys = ('red_area_min_count', 'red_area_upper_bounds')
+    hard = True
+
+    def params(self, lottery_type, settings):
+        params = super().params(lottery_type, settings)
+        # 各分区的号码掩码由分区上界算出一次，判定和提示共用
+        params['zone_masks'] = [balls_mask(range(start, end + 1))
+                                for start, end in red_zones(lottery_type, params['red_area_upper_bounds'])]
+        return params
+
+    def area_counts(self, params, red_masks):
+        """每个红球掩码 (uint64 数组) 覆盖的分区个数"""
+        counts = np.zeros(np.shape(red_masks), dtype=np.int64)
+        for zone_mask in params['zone_masks']:
+            counts += (red_masks & np.uint64(zone_mask)) != 0
+        return counts
+
+    def compile(self, lottery_type, params):
+        min_count = params['red_area_min_count']
+        return lambda context: self.area_counts(params, context.red) >= min_count
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        min_count = params['red_area_min_count']
+        distributed_areas = sum(1 for zone_mask in params['zone_masks'] if row.red & zone_mask)
+        if passed:
+            return {'passed': True, 'message': f'规则{self.number}: {self.names["red"]}分布在 {distributed_areas} 个区域 (>={min_count}个)。'}
+        return {'passed': False, 'message': f'规则{self.number}: {self.names["red"]}仅分布在 {distributed_areas} 个区域 (<{min_count}个)。'}
+
+    def summary(self, params):
+        return f'{self.names["red"]}至少覆盖 {params["red_area_min_count"]} 个分区'
+
+
+class RedRepeatPreviousRule(Rule):
+    """4.1.5 / 4.2.5 红球与前2期开奖号码重复不超过 N 个，之前不足2期时通过"""
+    setting_keys = ('red_prev_2_draws_max_repeat',)
+    hard = True
+
+    def history_depth(self, params):
+        return 2
+
+    def compile(self, lottery_type, params):
+        max_repeat = params['red_prev_2_draws_max_repeat']
+
+        def predicate(context):
+            repeats = popcount(context.red & (context.previous('red', 0) | context.previous('red', 1)))
+            return (repeats <= max_repeat) | (context.previous_count < 2)
+        return predicate
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        max_repeat = params['red_prev_2_draws_max_repeat']
+        if row.previous_count < 2:
+            return {'passed': True, 'message': f'规则{self.number}: 无足够前期数据进行{self.names["red"]}重复检查。'}
+        repeated_count = bin(row.red & (row.previous('red', 0) | row.previous('red', 1))).count('1')
+        if passed:
+            return {'passed': True, 'message': f'规则{self.number}: {self.names["red"]}与前2期重复号码 {repeated_count} 个 (<={max_repeat}个)。'}
+        return {'passed': False, 'message': f'规则{self.number}: {self.names["red"]}与前2期重复号码 {repeated_count} 个 (>{max_repeat}个)。'}
+
+    def summary(self, params):
+        return f'与前2期重复不超过 {params["red_prev_2_draws_max_repeat"]} 个'
+
+
+class RedRunRule(Rule):
+    """4.1.6 / 4.2.6 红球连号不超过 N 个"""
+    setting_keys = ('red_max_consecutive_balls',)
+    hard = True
+
+    def compile(self, lottery_type, params):
+        max_consecutive = params['red_max_consecutive_balls']
+
+        def predicate(context):
+            run = context.red
+            for shift in range(1, max_consecutive + 1):
+                run = run & (context.red >> np.uint64(shift))
+            return run == 0
+        return predicate
+
+    def explain(self, row, params, passed, red_balls, blue_balls):
+        fail_length = params['red_max_consecutive_balls'] + 1
+        if passed:
+            return {'passed': True, 'message': f'规则{self.number}: {self.names["red"]}未出现连续{fail_length}个及以上号码。'}
+        group = next(group for group in get_consecutive_groups(red_balls) if len(group) >= fail_length)
+        return {'passed': False, 'message': f'规则{self.number}: {self.names["red"]}出现连续 {len(group)} 个号码: {group} (>={fail_length}个)。'}
+
+    def summary(self, params):
+        return f'连号不超过 {params["red_max_consecutive_balls"]} 个'
+
+
+_SSQ_NAMES = {'red': '红球', 'red_ball': '红球', 'blue': '蓝球'}
+_DLT_NAMES = {'red': '前区', 'red_ball': '前区号码', 'blue': '后区号码'}
+
+# 各彩种的规则，顺序即结果顺序和存储的判定位序 (见 rule_engine.history_rule_flags)
+RULES = {
+    'ssq': (
+        BlueStreakRule('rule_4_1_1_blue_consecutive', '4.1.1 蓝球连续开出', _SSQ_NAMES),
+        RedStreakRule('rule_4_1_3_red_consecutive_repeat', '4.1.3 红球连续3期重复', _SSQ_NAMES),
+        RedAreaRule('rule_4_1_4_red_area_distribution', '4.1.4 红球分区分布', _SSQ_NAMES),
+        RedRepeatPreviousRule('rule_4_1_5_red_repeat_previous_2', '4.1.5 与前2期重复', _SSQ_NAMES),
+        RedRunRule('rule_4_1_6_red_consecutive_4_plus', '4.1.6 红球4连号', _SSQ_NAMES),
+    ),
+    'dlt': (
+        BlueRepeatLatestRule('rule_4_2_1_blue_repeat_latest', '4.2.1 后区重复/连续开出', _DLT_NAMES),
+        RedStreakRule('rule_4_2_3_red_consecutive_repeat', '4.2.3 前区连续3期重复', _DLT_NAMES),
+        RedAreaRule('rule_4_2_4_red_area_distribution', '4.2.4 前区分区分布', _DLT_NAMES),
+        RedRepeatPreviousRule('rule_4_2_5_red_repeat_previous_2', '4.2.5 与前2期重复', _DLT_NAMES),
+        RedRunRule('rule_4_2_6_red_consecutive_4_plus', '4.2.6 前区4连号', _DLT_NAMES),
+    ),
+}
+
+
+def rule_setting_keys(lottery_type):
+    """彩种全部规则读取的设置项 (不含彩种前缀)，按声明顺序去重"""
+    return tuple(dict.fromkeys(key for rule in RULES[lottery_type] for key in rule.setting_keys))
+
+
+class CompiledRule:
+    def __init__(self, rule, lottery_type, params):
+        self.rule = rule
+        self.key = rule.key
+        self.label = rule.label
+        self.params = params
+        self.history_depth = rule.history_depth(params)
+        self.predicate = rule.compile(lottery_type, params)
+
+    def summary(self):
+        return f'{self.rule.number} {self.rule.summary(self.params)}'
+
+
+class CompiledRules:
+    """
+    某一彩种在某版设置下编译好的规则集: 各规则的阈值已从设置读出，
+    history_depth 是全部规则所需前期开奖期数的并集 (最大值)，调用方据此一次取齐历史数据。
+    """
+    def __init__(self, lottery_type, settings):
+        self.lottery_type = lottery_type
+        self.rules = [CompiledRule(rule, lottery_type, rule.params(lottery_type, settings)) for rule in RULES[lottery_type]]
+        self.history_depth = max(rule.history_depth for rule in self.rules)
+
+    def hard_rules(self):
+        return [rule for rule in self.rules if rule.rule.hard]
+
+    def red_area_counts(self, red_masks):
+        """红球掩码覆盖的分区个数 (按本规则集的分区设置)"""
+        rule = next(rule for rule in self.rules if isinstance(rule.rule, RedAreaRule))
+        return rule.rule.area_counts(rule.params, red_masks)
+
+    def get(self, key):
+        return next(rule for rule in self.rules if rule.key == key)
+
+    def passed(self, context, rules=None):
+        """{规则键: 形如 (N,) 的布尔数组}"""
+        return {rule.key: np.broadcast_to(rule.predicate(context), np.shape(context.red))
+                for rule in (self.rules if rules is None else rules)}
+
+    def explain(self, context, passed, tickets):
+        """
+        逐个候选生成每条规则的 {'passed', 'message'}，passed 为 self.passed 的结果。
+        tickets: 与候选顺序对应的 [(红球列表, 蓝球列表), ...]，返回结果列表
+        """
+        passed_lists = [np.asarray(passed[rule.key]).tolist() for rule in self.rules]
+        results = []
+        for i, (row, (red_balls, blue_balls)) in enumerate(zip(context.rows(), tickets)):
+            red_balls = sorted(red_balls)
+            blue_balls = sorted(blue_balls)
+            results.append({rule.key: rule.rule.explain(row, rule.params, passed_list[i], red_balls, blue_balls)
+                            for rule, passed_list in zip(self.rules, passed_lists)})
+        return results
+
+
+def compile_rules(lottery_type, settings=None):
+    """按设置 (默认当前设置) 编译彩种的规则集"""
+    return CompiledRules(lottery_type, CURRENT_SETTINGS if settings is None else settings)
+
+
+def _shifted(masks, k):
+    """升序掩码数组中每期之前第 k 期的掩码，不足时为0"""
+    shifted = np.zeros_like(masks)
+    if k < len(masks):
+        shifted[k:] = masks[:len(masks) - k]
+    return shifted
+
+
+def history_context(lottery_type, red_masks, blue_masks, depth):
+    """按期号升序的开奖掩码 -> 每期以自身为候选、以之前各期为前期开奖的上下文 (检查历史开奖)"""
+    return RuleContext(lottery_type, red_masks, blue_masks,
+                       [_shifted(red_masks, k + 1) for k in range(depth)],
+                       [_shifted(blue_masks, k + 1) for k in range(depth)],
+                       np.arange(len(red_masks)), True)
+
+
+def ticket_context(lottery_type, red_masks, blue_masks, history_red, history_blue):
+    """
+    生成号码的上下文: 号码视为最新一期之后的下一期。
+    history_red / history_blue: 最新若干期开奖的掩码 (Python 整数，最新在前)
+    """
+    return RuleContext(lottery_type, red_masks, blue_masks,
+                       [np.uint64(mask) for mask in history_red], [np.uint64(mask) for mask in history_blue],
+                       len(history_red), False)
+
+
+def red_hard_limits(lottery_type, settings):
+    """生成号码时逐个选号强制满足的红球规则阈值 (RedConstraints 的参数)"""
+    compiled = compile_rules(lottery_type, settings)
+    params = {}
+    for rule in compiled.hard_rules():
+        params.update(rule.params)
+    return {
+        'zones': red_zones(lottery_type, params['red_area_upper_bounds']),
+        'area_min_count': params['red_area_min_count'],
+        'max_repeat': params['red_prev_2_draws_max_repeat'],
+        'max_consecutive': params['red_max_consecutive_balls'],
+    }
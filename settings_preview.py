@@ -0,0 +1,127 @@
+# settings_preview.py
+import random
+import time
+import numpy as np
+from config import CURRENT_SETTINGS, SETTING_LABELS_CHINESE
+from draw_store import get_draw_arrays
+from prediction_model import PICK_COUNTS, build_prediction_model
+from rule_registry import compile_rules, incidence_masks, ticket_context
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 预览时抽样的号码注数
+PREVIEW_TICKETS = 100000
+
+
+def _gumbel_top_k(probabilities, pick_count, noise):
+    """
+    Gumbel-top-k 向量化抽样：每行对 log(权重) + Gumbel 噪声取最大的 pick_count 个号码，
+    与按权重逐个不放回抽取 (AliasSampler.sample_distinct) 同分布。
+    noise 为标准指数随机数 E，log(w) - log(E) 与 w / E 的大小顺序相同，因此取 E / w 最小的几个即可，省去对数运算。
+    probabilities 下标即号码 (0号位恒为0)，返回形如 (注数, pick_count) 的号码数组。
+    """
+    with np.errstate(divide='ignore'):
+        keys = noise / probabilities[1:].astype(noise.dtype) # 权重为0的号码为 inf，不会被选中
+    if pick_count == 1:
+        return keys.argmin(axis=1)[:, None] + 1
+    return np.argpartition(keys, pick_count - 1, axis=1)[:, :pick_count] + 1
+
+
+def _masks(balls):
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), balls.astype(np.uint64)), axis=1)
+
+
+def _latest_masks(incidence, depth):
+    """最新 depth 期开奖的掩码 (Python 整数，最新在前)"""
+    return incidence_masks(incidence[max(0, len(incidence) - depth):])[::-1].tolist()
+
+
+def _simulate(lottery_type, settings, red_noise, blue_noise):
+    """按一版设置构建预测模型，用同一组随机噪声抽样并按该版设置的规则集判定"""
+    draw_arrays = get_draw_arrays(lottery_type)
+    red_count, blue_count = PICK_COUNTS[lottery_type]
+    model = build_prediction_model(lottery_type, settings)
+    red = _gumbel_top_k(model.red_probabilities, red_count, red_noise)
+    blue = _gumbel_top_k(model.blue_probabilities, blue_count, blue_noise)
+
+    compiled = compile_rules(lottery_type, settings)
+    context = ticket_context(lottery_type, _masks(red), _masks(blue),
+                             _latest_masks(draw_arrays.red, compiled.history_depth),
+                             _latest_masks(draw_arrays.blue, compiled.history_depth))
+    passed = compiled.passed(context)
+    # 正式生成时红球逐个选号强制满足硬性规则，这里用满足硬性规则的号码近似其分布
+    accepted = np.logical_and.reduce([passed[rule.key] for rule in compiled.hard_rules()])
+    accepted_count = int(accepted.sum())
+
+    def frequencies(balls, ball_range):
+        counts = np.bincount(balls[accepted].ravel(), minlength=ball_range + 1)[1:]
+        return counts / accepted_count * 100 if accepted_count else np.zeros(ball_range)
+
+    return {
+        'red_probabilities': model.red_probabilities[1:] * 100,
+        'blue_probabilities': model.blue_probabilities[1:] * 100,
+        'red_frequencies': frequencies(red, len(model.red_probabilities) - 1),
+        'blue_frequencies': frequencies(blue, len(model.blue_probabilities) - 1),
+        'pass_rates': {rule.key: float(passed[rule.key].mean()) * 100 for rule in compiled.rules},
+        'labels': {rule.key: rule.summary() for rule in compiled.rules},
+        'acceptance_rate': accepted_count / len(red) * 100,
+    }
+
+
+def _ball_rows(current, proposed, probabilities_key, frequencies_key):
+    rows = []
+    for ball, values in enumerate(zip(current[probabilities_key], proposed[probabilities_key],
+                                      current[frequencies_key], proposed[frequencies_key]), start=1):
+        current_probability, proposed_probability, current_frequency, proposed_frequency = values
+        rows.append({
+            'ball': ball,
+            'current_probability': round(float(current_probability), 2),
+            'proposed_probability': round(float(proposed_probability), 2),
+            'current_frequency': round(float(current_frequency), 2),
+            'proposed_frequency': round(float(proposed_frequency), 2),
+            'frequency_delta': round(float(proposed_frequency - current_frequency), 2)
+        })
+    return rows
+
+
+def preview_settings(lottery_type, proposed_settings, tickets=PREVIEW_TICKETS, seed=None):
+    """
+    修改设置前预览效果 (不保存设置)：分别用当前设置和拟修改的设置构建预测模型，
+    用同一组随机噪声各抽样 tickets 注 (公共随机数，差异只来自设置)，比较:
+    每个号码的单注入选概率 (%) 和满足硬性规则的号码中各号码出现的比例 (%)、各条规则的通过率 (%)、硬性规则接受率。
+    proposed_settings: 完整的设置字典 (当前设置加上修改)
+    返回: 预览结果字典，彩种无效时返回 {'error': ...}
+    """
+    if lottery_type not in PICK_COUNTS:
+        return {'error': 'Invalid lottery type'}
+    start_time = time.perf_counter()
+    seed = random.SystemRandom().randrange(2 ** 32) if seed is None else int(seed)
+    rng = np.random.default_rng(seed)
+    draw_arrays = get_draw_arrays(lottery_type)
+    # 单精度足以区分排序，数据量减半，排序更快
+    red_noise = rng.standard_exponential((tickets, draw_arrays.red.shape[1] - 1), dtype=np.float32)
+    blue_noise = rng.standard_exponential((tickets, draw_arrays.blue.shape[1] - 1), dtype=np.float32)
+
+    current = _simulate(lottery_type, CURRENT_SETTINGS, red_noise, blue_noise)
+    proposed = _simulate(lottery_type, proposed_settings, red_noise, blue_noise)
+
+    changed = [{'key': key, 'label': SETTING_LABELS_CHINESE.get(key, key),
+                'current': CURRENT_SETTINGS.get(key), 'proposed': value}
+               for key, value in proposed_settings.items()
+               if key.startswith(f'{lottery_type}_') and CURRENT_SETTINGS.get(key) != value]
+    rules = [{'key': key, 'label': proposed['labels'][key], 'current_label': current['labels'][key],
+              'current': round(current['pass_rates'][key], 2), 'proposed': round(proposed['pass_rates'][key], 2),
+              'delta': round(proposed['pass_rates'][key] - current['pass_rates'][key], 2)}
+             for key in proposed['pass_rates']]
+    return {
+        'lottery_type': lottery_type,
+        'tickets': tickets,
+        'seed': seed,
+        'changed': changed,
+        'rules': rules,
+        'acceptance_rate': {'current': round(current['acceptance_rate'], 2), 'proposed': round(proposed['acceptance_rate'], 2)},
+        'red_balls': _ball_rows(current, proposed, 'red_probabilities', 'red_frequencies'),
+        'blue_balls': _ball_rows(current, proposed, 'blue_probabilities', 'blue_frequencies'),
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
@@ -4,3 +4,17 @@ document.addEventListener('DOMContentLoaded', function() {
     // 可以在这里添加一些全局的JavaScript交互逻辑
     console.log("iShoot website loaded.");
 });
+
+// "是否开出过" 徽章：整注开出过 / 红球开出过 / 从未开出，复式号码不显示 (号码预测和对奖中心页面共用)
+function renderDrawnBadge(combo) {
+    if (combo.drawn_issues && combo.drawn_issues.length > 0) {
+        return `<span class="badge bg-danger ms-2">历史开出过: 第 ${combo.drawn_issues.join(', ')} 期</span>`;
+    }
+    if (combo.red_drawn_issues && combo.red_drawn_issues.length > 0) {
+        return `<span class="badge bg-warning text-dark ms-2">红球曾开出: 第 ${combo.red_drawn_issues.join(', ')} 期</span>`;
+    }
+    if (Array.isArray(combo.drawn_issues)) {
+        return '<span class="badge bg-success ms-2">从未开出</span>';
+    }
+    return '';
+}
@@ -0,0 +1,235 @@
+# strategy_backtest.py
+import os
+import random
+import time
+import numpy as np
+from config import CURRENT_SETTINGS, DEFAULT_SETTINGS, PRIZE_RULES, PER_BET_PRICE
+from draw_store import get_draw_arrays
+from prediction_model import (PICK_COUNTS, PredictionModel, SamplerStats, _current_omissions, _streak_lengths,
+                              blue_probabilities_from_features, red_constraints_from_mask,
+                              red_probabilities_from_features)
+from process_pools import get_process_pool
+from utils import get_prize_levels
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+# 可回测的选号策略
+STRATEGIES = {
+    'weighted_rules': '规则概率 + 硬性规则 (当前生成算法)',
+    'weighted': '仅规则概率',
+    'uniform': '完全随机 (基准)',
+}
+
+# 每个分片回放的开奖期数 (固定值，保证同一种子在不同进程数下结果一致)
+SHARD_DRAWS = 200
+
+
+def _match_level_table(lottery_type):
+    """table[红球命中数, 蓝球命中数] 为单式一注的奖级下标 (顺序与 get_prize_levels 一致)，未中奖为 -1"""
+    red_count, blue_count = PICK_COUNTS[lottery_type]
+    levels = get_prize_levels(lottery_type)
+    table = np.full((red_count + 1, blue_count + 1), -1, dtype=np.int64)
+    for prize_rule in PRIZE_RULES[lottery_type]['prizes']:
+        table[prize_rule['match_red'], prize_rule['match_blue']] = levels.index(prize_rule['level'])
+    return table
+
+
+def _new_totals(levels_count):
+    return {'draws': 0, 'tickets': 0, 'payout': 0.0, 'winning_tickets': 0, 'winning_draws': 0,
+            'level_counts': np.zeros(levels_count, dtype=np.int64), 'sampler_stats': SamplerStats()}
+
+
+def _score_tickets(totals, tickets, red_row, blue_row, amounts, level_table):
+    """按当期开奖为一批单式号码对奖，累加到 totals"""
+    totals['draws'] += 1
+    if not tickets:
+        return
+    red_matches = red_row[np.array([ticket[0] for ticket in tickets])].sum(axis=1)
+    blue_matches = blue_row[np.array([ticket[1] for ticket in tickets])].sum(axis=1)
+    ticket_levels = level_table[red_matches, blue_matches]
+    won = ticket_levels[ticket_levels >= 0]
+    level_counts = np.bincount(won, minlength=len(amounts))
+    totals['tickets'] += len(tickets)
+    totals['payout'] += float(level_counts @ amounts)
+    totals['winning_tickets'] += len(won)
+    totals['winning_draws'] += 1 if len(won) else 0
+    totals['level_counts'] += level_counts
+
+
+def _run_backtest_shard(lottery_type, red, blue, level_amounts, start, profiles, strategies, tickets_per_draw, seed):
+    """
+    子进程中回放一个分片：先由分片之前的全部开奖算出每个号码的遗漏和连续开出期数，
+    之后每期只用之前的开奖构建模型并生成号码，对奖后再把该期开奖增量计入状态 (每个号码 O(1))。
+    red / blue: 截至分片最后一期的开奖矩阵；level_amounts: 分片内各期的每注奖金
+    返回: {(策略, 方案序号): 累计结果}，"完全随机" 与设置无关，只记在方案序号 None 下
+    """
+    red_range, blue_range = PRIZE_RULES[lottery_type]['red_range'], PRIZE_RULES[lottery_type]['blue_range']
+    red_count, blue_count = PICK_COUNTS[lottery_type]
+    level_table = _match_level_table(lottery_type)
+    rng = random.Random(f'{seed}:{start}')
+
+    red_omissions = _current_omissions(red[:start])
+    red_streaks = _streak_lengths(red[:start])
+    blue_omissions = _current_omissions(blue[:start])
+    blue_streaks = _streak_lengths(blue[:start])
+    # 蓝球出现次数的前缀和，最近 N 期出现次数 = 两个前缀和之差
+    blue_cumsum = np.vstack([np.zeros((1, blue.shape[1]), dtype=np.int64), np.cumsum(blue, axis=0, dtype=np.int64)])
+    red_masks = [sum(1 << int(ball) for ball in np.flatnonzero(row)) for row in red[max(0, start - 2):]]
+    mask_offset = max(0, start - 2)
+
+    model_profiles = profiles if {'weighted_rules', 'weighted'} & set(strategies) else []
+    totals = {}
+    for strategy in strategies:
+        for profile_index in ([None] if strategy == 'uniform' else range(len(profiles))):
+            totals[(strategy, profile_index)] = _new_totals(level_amounts.shape[1])
+
+    for i in range(start, len(red)):
+        amounts = level_amounts[i - start]
+        if 'uniform' in strategies:
+            tickets = [(sorted(rng.sample(range(1, red_range + 1), red_count)),
+                        sorted(rng.sample(range(1, blue_range + 1), blue_count)))
+                       for _ in range(tickets_per_draw)]
+            _score_tickets(totals[('uniform', None)], tickets, red[i], blue[i], amounts, level_table)
+
+        previous_2_mask = red_masks[i - 1 - mask_offset] | red_masks[i - 2 - mask_offset] if i >= 2 else 0
+        for profile_index, profile in enumerate(model_profiles):
+            settings = profile['settings']
+            recent_draws = settings.get(f'{lottery_type}_blue_recent_occurrence_draws', 0)
+            recent_occurrences = blue_cumsum[i] - blue_cumsum[max(0, i - recent_draws)] if recent_draws > 0 else None
+            model = PredictionModel(lottery_type, None,
+                                    red_probabilities_from_features(lottery_type, red_omissions, red_streaks, settings),
+                                    blue_probabilities_from_features(lottery_type, i, blue_omissions, blue_streaks,
+                                                                     recent_occurrences, settings),
+                                    red_constraints_from_mask(lottery_type, previous_2_mask, settings))
+            if 'weighted_rules' in strategies:
+                profile_totals = totals[('weighted_rules', profile_index)]
+                tickets = model.sample_valid_many(tickets_per_draw, rng, profile_totals['sampler_stats'])
+                _score_tickets(profile_totals, tickets, red[i], blue[i], amounts, level_table)
+            if 'weighted' in strategies:
+                tickets = model.sample_many(tickets_per_draw, rng)
+                _score_tickets(totals[('weighted', profile_index)], tickets, red[i], blue[i], amounts, level_table)
+
+        # 增量计入本期开奖
+        drawn_red, drawn_blue = red[i].astype(bool), blue[i].astype(bool)
+        red_omissions = np.where(drawn_red, 0, red_omissions + 1)
+        red_streaks = np.where(drawn_red, red_streaks + 1, 0)
+        blue_omissions = np.where(drawn_blue, 0, blue_omissions + 1)
+        blue_streaks = np.where(drawn_blue, blue_streaks + 1, 0)
+
+    return totals
+
+
+def _merge_totals(target, source):
+    for key in ('draws', 'tickets', 'payout', 'winning_tickets', 'winning_draws', 'level_counts'):
+        target[key] += source[key]
+    target_stats, source_stats = target['sampler_stats'], source['sampler_stats']
+    for key in ('tickets', 'failed_tickets', 'draws', 'rejections', 'fallbacks', 'backtracks'):
+        setattr(target_stats, key, getattr(target_stats, key) + getattr(source_stats, key))
+
+
+def _validate_profiles(profiles):
+    """
+    设置方案: [{'name': 名称, 'overrides': {设置项: 值}}, ...]，在当前设置的基础上覆盖。
+    返回: (带完整设置的方案列表, None) 或 (None, 错误信息)
+    """
+    resolved = []
+    for index, profile in enumerate(profiles or [{'name': '当前设置', 'overrides': {}}]):
+        if not isinstance(profile, dict) or not isinstance(profile.get('overrides', {}), dict):
+            return None, f'第 {index + 1} 个设置方案格式错误。'
+        overrides = profile.get('overrides', {})
+        for key, value in overrides.items():
+            if key not in DEFAULT_SETTINGS or not isinstance(DEFAULT_SETTINGS[key], (int, float)) \
+                    or isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None, f'设置方案 "{profile.get("name", index + 1)}" 中的设置项 {key} 无效。'
+        resolved.append({'name': str(profile.get('name') or f'方案{index + 1}'), 'overrides': overrides,
+                         'settings': dict(CURRENT_SETTINGS, **overrides)})
+    return resolved, None
+
+
+def run_strategy_backtest(lottery_type, draws=0, tickets_per_draw=100, strategies=None, profiles=None,
+                          seed=None, workers=None):
+    """
+    选号策略历史回测：对最近 draws 期 (0 为全部) 的每一期，只用该期之前的开奖构建预测模型，
+    按各策略生成 tickets_per_draw 注单式号码，按当期实际奖金对奖，汇总各策略、各设置方案的中奖率和回报率。
+    回放按 SHARD_DRAWS 期切成分片交给进程池并行，每个分片使用由种子派生的独立随机数流，
+    因此同一 seed 无论使用多少个进程，结果都完全相同。
+    strategies: STRATEGIES 中的键列表，默认全部
+    profiles: 设置方案列表，见 _validate_profiles，默认只回测当前设置
+    workers: 进程数，默认使用设置 strategy_backtest_workers (0 为全部 CPU 核心)
+    """
+    if lottery_type not in PICK_COUNTS:
+        return {'error': '无效的彩票类型'}
+    strategies = [strategy for strategy in STRATEGIES if strategy in (strategies or STRATEGIES)]
+    if not strategies:
+        return {'error': '请至少选择一种策略。'}
+    max_tickets = CURRENT_SETTINGS.get('strategy_backtest_max_tickets', 1000)
+    if not 0 < tickets_per_draw <= max_tickets:
+        return {'error': f'每期号码注数需在 1 到 {max_tickets} 之间。'}
+    profiles, error = _validate_profiles(profiles)
+    if error:
+        return {'error': error}
+
+    draw_arrays = get_draw_arrays(lottery_type)
+    if len(draw_arrays) < 2:
+        return {'error': '历史开奖数据不足，无法回测。'}
+    # 至少保留一期作为第一期预测的历史
+    start = len(draw_arrays) - draws if 0 < draws < len(draw_arrays) else 1
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    workers = workers or CURRENT_SETTINGS.get('strategy_backtest_workers', 0) or os.cpu_count() or 1
+
+    start_time = time.perf_counter()
+    pool = get_process_pool(workers)
+    futures = []
+    for shard_start in range(start, len(draw_arrays), SHARD_DRAWS):
+        shard_end = min(shard_start + SHARD_DRAWS, len(draw_arrays))
+        futures.append(pool.submit(_run_backtest_shard, lottery_type,
+                                   draw_arrays.red[:shard_end], draw_arrays.blue[:shard_end],
+                                   draw_arrays.level_amounts[shard_start:shard_end],
+                                   shard_start, profiles, strategies, tickets_per_draw, seed))
+    levels = get_prize_levels(lottery_type)
+    totals = {}
+    try:
+        for future in futures:
+            for key, shard_totals in future.result().items():
+                if key in totals:
+                    _merge_totals(totals[key], shard_totals)
+                else:
+                    totals[key] = shard_totals
+    finally:
+        for future in futures:
+            future.cancel()
+
+    results = []
+    for (strategy, profile_index), item in totals.items():
+        cost = item['tickets'] * PER_BET_PRICE
+        results.append({
+            'strategy': strategy,
+            'strategy_label': STRATEGIES[strategy],
+            'profile': profiles[profile_index]['name'] if profile_index is not None else None,
+            'draws_count': item['draws'],
+            'tickets': item['tickets'],
+            'total_cost': cost,
+            'total_payout': round(item['payout'], 2),
+            'winning_tickets': item['winning_tickets'],
+            'winning_draws': item['winning_draws'],
+            'hit_rate': round(item['winning_tickets'] / item['tickets'] * 100, 4) if item['tickets'] else 0.0,
+            'return_rate': round(item['payout'] / cost * 100, 2) if cost else 0.0,
+            'roi': round((item['payout'] - cost) / cost * 100, 2) if cost else 0.0,
+            'level_counts': {level: int(count) for level, count in zip(levels, item['level_counts']) if count > 0},
+            'sampler_stats': item['sampler_stats'].to_dict() if strategy == 'weighted_rules' else None
+        })
+
+    return {
+        'lottery_type': lottery_type,
+        'seed': seed,
+        'draws_count': len(draw_arrays) - start,
+        'start_issue': draw_arrays.issues[start],
+        'end_issue': draw_arrays.issues[-1],
+        'tickets_per_draw': tickets_per_draw,
+        'profiles': [{'name': profile['name'], 'overrides': profile['overrides']} for profile in profiles],
+        'levels': levels,
+        'results': results,
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
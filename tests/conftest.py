@@ -0,0 +1,63 @@
+# tests/conftest.py
+import copy
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 导入 app 之前把数据库和设置文件换成临时文件，测试不会改动 instance/ 下的真实数据
+import config
+
+_test_dir = tempfile.mkdtemp(prefix='ishoot_tests_')
+config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(_test_dir, 'test.db')}"
+config.SETTINGS_FILE = os.path.join(_test_dir, 'settings.json')
+config.CURRENT_SETTINGS.clear()
+config.CURRENT_SETTINGS.update(copy.deepcopy(config.DEFAULT_SETTINGS))
+
+from app import app as flask_app, scheduler
+from data_manager import save_draw_data
+from models import SSQDraw, DLTDraw
+
+SYNTHETIC_DRAW_COUNT = 120
+
+
+def _synthetic_draws(model_class, year, red_range, red_count, blue_range, blue_count, seed):
+    """固定种子生成的虚拟开奖，每周两期，销售额、奖池和一、二等奖金额固定"""
+    rng = random.Random(seed)
+    start_date = date(year, 1, 1)
+    draws = []
+    for i in range(SYNTHETIC_DRAW_COUNT):
+        red_balls = sorted(rng.sample(range(1, red_range + 1), red_count))
+        blue_balls = sorted(rng.sample(range(1, blue_range + 1), blue_count))
+        draws.append(model_class(issue=f'{year}{i + 1:03d}', draw_date=start_date + timedelta(days=3 * i + i // 2),
+                                 red_balls=','.join(f'{ball:02d}' for ball in red_balls),
+                                 blue_balls=','.join(f'{ball:02d}' for ball in blue_balls),
+                                 sales_amount=300000000, prize_pool=1000000000, first_prize_count=5,
+                                 first_prize_amount=5000000, second_prize_count=100, second_prize_amount=100000))
+    return draws
+
+
+@pytest.fixture(scope='session')
+def app():
+    with flask_app.app_context():
+        save_draw_data(_synthetic_draws(SSQDraw, 2023, 33, 6, 16, 1, seed=1), 'ssq')
+        save_draw_data(_synthetic_draws(DLTDraw, 2023, 35, 5, 12, 2, seed=2), 'dlt')
+    yield flask_app
+    scheduler.shutdown(wait=False)
+    shutil.rmtree(_test_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
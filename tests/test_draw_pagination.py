@@ -0,0 +1,61 @@
+# tests/test_draw_pagination.py
+import pytest
+from conftest import SYNTHETIC_DRAW_COUNT
+from draw_pagination import paginate_draws
+from models import SSQDraw
+
+
+def _issues(page):
+    return [draw.issue for draw in page.items]
+
+
+@pytest.mark.parametrize('per_page', [10, 7])
+def test_cursor_pages_match_numbered_pages(app_context, per_page):
+    pages = -(-SYNTHETIC_DRAW_COUNT // per_page)
+    numbered = [paginate_draws('ssq', SSQDraw, page=page, per_page=per_page) for page in range(1, pages + 1)]
+    assert sum(len(page.items) for page in numbered) == SYNTHETIC_DRAW_COUNT
+    assert numbered[0].prev_cursor is None
+    assert numbered[-1].next_cursor is None and not numbered[-1].has_next
+
+    # 逐页向后翻，再逐页向前翻，每一页都与按页码取的结果相同
+    current = numbered[0]
+    for expected in numbered[1:]:
+        current = paginate_draws('ssq', SSQDraw, per_page=per_page, after=current.next_cursor)
+        assert _issues(current) == _issues(expected)
+        assert current.page == expected.page
+    for expected in reversed(numbered[:-1]):
+        current = paginate_draws('ssq', SSQDraw, per_page=per_page, before=current.prev_cursor)
+        assert _issues(current) == _issues(expected)
+        assert current.page == expected.page
+
+
+def test_cursor_at_page_boundary(app_context):
+    first, second = (paginate_draws('ssq', SSQDraw, page=page, per_page=10) for page in (1, 2))
+    # 游标是上一页最后一期 / 下一页第一期，本身不在返回的页中
+    assert first.next_cursor == first.items[-1].issue
+    assert _issues(paginate_draws('ssq', SSQDraw, per_page=10, after=first.items[-1].issue)) == _issues(second)
+    assert _issues(paginate_draws('ssq', SSQDraw, per_page=10, before=second.items[0].issue)) == _issues(first)
+
+
+def test_cursor_past_the_ends_returns_empty_page(app_context):
+    last = paginate_draws('ssq', SSQDraw, page=12, per_page=10)
+    assert paginate_draws('ssq', SSQDraw, per_page=10, after=last.items[-1].issue).items == []
+    first = paginate_draws('ssq', SSQDraw, page=1, per_page=10)
+    assert paginate_draws('ssq', SSQDraw, per_page=10, before=first.items[0].issue).items == []
+    assert paginate_draws('ssq', SSQDraw, page=13, per_page=10).items == []
+
+
+def test_cursor_respects_date_filter(app_context):
+    all_draws = paginate_draws('ssq', SSQDraw, page=1, per_page=SYNTHETIC_DRAW_COUNT).items
+    start_date, end_date = all_draws[-1].draw_date, all_draws[-30].draw_date # 最早的 30 期
+    first = paginate_draws('ssq', SSQDraw, start_date, end_date, page=1, per_page=20)
+    assert first.total == 30 and first.pages == 2
+    second = paginate_draws('ssq', SSQDraw, start_date, end_date, per_page=20, after=first.next_cursor)
+    assert len(second.items) == 10 and second.page == 2 and second.next_cursor is None
+
+
+def test_history_page_accepts_cursors(client, app_context):
+    first = paginate_draws('ssq', SSQDraw, page=1, per_page=10)
+    response = client.get(f'/history?lottery_type=ssq&per_page=10&after={first.next_cursor}')
+    assert response.status_code == 200
+    assert first.items[-1].issue not in response.get_data(as_text=True)
@@ -0,0 +1,17 @@
+# tests/test_drawn_index.py
+import data_manager
+import drawn_index
+from drawn_index import add_drawn_draws, get_drawn_index
+from models import SSQDraw
+
+
+def test_index_rebuilt_before_incremental_add_has_no_duplicates(app_context, monkeypatch):
+    draw = SSQDraw.query.order_by(SSQDraw.issue.desc()).first()
+    red_balls, blue_balls = draw.get_red_balls_list(), draw.get_blue_balls_list()
+    get_drawn_index('ssq')
+    # 模拟 save_draw_data 递增版本后、调用 add_drawn_draws 前，另一个线程已按新版本重建了索引
+    monkeypatch.setitem(data_manager._draw_data_versions, 'ssq', data_manager._draw_data_versions['ssq'] + 1)
+    monkeypatch.setitem(drawn_index._indexes, 'ssq', drawn_index._indexes['ssq'])
+    get_drawn_index('ssq')
+    add_drawn_draws('ssq', [draw])
+    assert get_drawn_index('ssq').lookup(red_balls, blue_balls)['drawn_issues'] == [draw.issue]
@@ -0,0 +1,66 @@
+# tests/test_fun_game.py
+import pytest
+import fun_game_engine
+import fun_game_jobs
+from config import CURRENT_SETTINGS
+from utils import simulate_fun_game_multi
+
+SSQ_COMBINATION = {'red_balls': '1,2,3,4,5,6', 'blue_balls': '1'}
+
+
+@pytest.mark.parametrize('tickets, max_simulations', [
+    ([([1, 2, 3, 4, 5, 6], [1]), ([7, 8, 9, 10, 11, 12], [2])], 9500), # 都不中一等奖，模拟全部分片
+    ([(list(range(1, 17)), list(range(1, 9)))], 200000), # 复式号码很快中一等奖，提前结束
+])
+def test_sharded_simulation_same_seed_same_result_for_any_worker_count(monkeypatch, tickets, max_simulations):
+    monkeypatch.setattr(fun_game_engine, 'SHARD_SIZE', 1000)
+    results = [fun_game_engine.run_sharded_simulation_multi(tickets, 'ssq', max_simulations, seed=7, workers=workers)
+               for workers in (1, 2, 3)]
+    assert results[0] == results[1] == results[2]
+
+
+def test_sharded_simulation_stops_once_every_ticket_wins(monkeypatch):
+    monkeypatch.setattr(fun_game_engine, 'SHARD_SIZE', 100)
+    (found, draw_count, prizes), = fun_game_engine.run_sharded_simulation_multi(
+        [(list(range(1, 17)), list(range(1, 9)))], 'ssq', 10000000, seed=7, workers=2)
+    assert found
+    assert prizes['一等奖'] == 1
+    assert draw_count < 10000000
+
+
+def test_unknown_mode_is_an_error():
+    result = simulate_fun_game_multi([([1, 2, 3, 4, 5, 6], [1])], 'ssq', 100, 'bogus')
+    assert 'error' in result
+
+
+@pytest.mark.parametrize('mode', ['bogus', 'brute_force', 'sharded'])
+def test_api_rejects_modes_clients_may_not_choose(client, mode):
+    response = client.post('/api/fun_game', json={'lottery_type': 'ssq', 'combinations': [SSQ_COMBINATION],
+                                                  'max_simulations': 1000, 'mode': mode})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_api_clamps_max_simulations(client, monkeypatch):
+    monkeypatch.setitem(CURRENT_SETTINGS, 'fun_game_max_simulations', 5000)
+    response = client.post('/api/fun_game', json={'lottery_type': 'ssq', 'combinations': [SSQ_COMBINATION],
+                                                  'max_simulations': 10 ** 12, 'mode': 'sampling', 'seed': 1})
+    assert response.status_code == 200
+    assert all(result['draw_count'] <= 5000 for result in response.get_json()['results'])
+
+
+def test_api_returns_drawn_lookups_like_jobs(client):
+    response = client.post('/api/fun_game', json={'lottery_type': 'ssq', 'combinations': [SSQ_COMBINATION],
+                                                  'max_simulations': 1000, 'seed': 1})
+    assert response.status_code == 200
+    assert 'drawn_issues' in response.get_json()['results'][0]
+
+
+def test_api_cancels_job_on_timeout(client, monkeypatch):
+    monkeypatch.setitem(CURRENT_SETTINGS, 'fun_game_sync_timeout_seconds', 0.01)
+    response = client.post('/api/fun_game', json={'lottery_type': 'ssq', 'combinations': [SSQ_COMBINATION],
+                                                  'max_simulations': 20000000, 'mode': 'vectorized'})
+    assert response.status_code == 504
+    job = max(fun_game_jobs._jobs.values(), key=lambda job: job.created_at)
+    assert job.done_event.wait(30)
+    assert job.status == fun_game_jobs.JOB_CANCELLED
@@ -0,0 +1,23 @@
+# tests/test_generation.py
+import pytest
+from config import CURRENT_SETTINGS
+
+
+@pytest.mark.parametrize('endpoint', ['/api/prediction/generate_random', '/api/prediction/generate_predicted'])
+def test_json_generate_endpoints_are_capped(client, endpoint):
+    max_tickets = CURRENT_SETTINGS['prediction_generate_max_tickets']
+    response = client.post(endpoint, json={'lottery_type': 'ssq', 'count': 5, 'seed': 1})
+    assert response.status_code == 200
+    assert len(response.get_json()['numbers']) == 5
+
+    response = client.post(endpoint, json={'lottery_type': 'ssq', 'count': max_tickets + 1})
+    assert response.status_code == 400
+    assert '/api/prediction/generate_batch' in response.get_json()['error']
+
+
+def test_batch_endpoint_streams_more_than_the_json_cap(client):
+    count = CURRENT_SETTINGS['prediction_generate_max_tickets'] * 3
+    response = client.get(f'/api/prediction/generate_batch?lottery_type=dlt&mode=random&count={count}&seed=5')
+    assert response.status_code == 200
+    assert response.headers['X-Seed'] == '5'
+    assert len(response.get_data(as_text=True).splitlines()) == count
@@ -0,0 +1,56 @@
+# tests/test_page_cache.py
+import pytest
+from config import CURRENT_SETTINGS, save_settings
+from page_cache import PRIVATE_CACHE_CONTROL, PUBLIC_CACHE_CONTROL
+
+PAGES = ['/', '/history?lottery_type=ssq', '/history?lottery_type=dlt&page=2']
+
+
+@pytest.mark.parametrize('url', PAGES)
+def test_matching_etag_returns_304(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == PUBLIC_CACHE_CONTROL
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    not_modified = client.get(url, headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+    assert not_modified.headers['ETag'] == etag
+
+
+def test_if_modified_since_returns_304(client):
+    last_modified = client.get('/').headers['Last-Modified']
+    assert client.get('/', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get('/', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+
+
+def test_etag_takes_precedence_over_if_modified_since(client):
+    last_modified = client.get('/').headers['Last-Modified']
+    response = client.get('/', headers={'If-None-Match': 'W/"stale"', 'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+
+
+def test_etag_changes_when_settings_change(client):
+    etag = client.get('/').headers['ETag']
+    original = CURRENT_SETTINGS['history_page_size']
+    CURRENT_SETTINGS['history_page_size'] = original + 1
+    save_settings(CURRENT_SETTINGS)
+    try:
+        response = client.get('/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+    finally:
+        CURRENT_SETTINGS['history_page_size'] = original
+        save_settings(CURRENT_SETTINGS)
+
+
+def test_admin_session_gets_no_validators(client):
+    etag = client.get('/').headers['ETag']
+    with client.session_transaction() as session:
+        session['logged_in_admin'] = True
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert response.headers['Cache-Control'] == PRIVATE_CACHE_CONTROL
@@ -0,0 +1,42 @@
+# tests/test_prize_check.py
+import pytest
+
+
+def _backtest(client, lottery_type, **combination):
+    return client.post('/api/check_prizes', json={'lottery_type': lottery_type, 'mode': 'backtest', 'check_range': 0,
+                                                  'combinations': [combination]})
+
+
+@pytest.mark.parametrize('lottery_type, combination', [
+    ('ssq', {'red_balls': '1,2,3,4,5,40', 'blue_balls': '1'}), # 红球超出范围
+    ('ssq', {'red_balls': '0,1,2,3,4,5', 'blue_balls': '1'}),
+    ('ssq', {'red_balls': '1,2,3,4,5,6', 'blue_balls': '17'}), # 蓝球超出范围
+    ('ssq', {'red_balls': '1,1,2,3,4,5', 'blue_balls': '1'}), # 重复号码
+    ('ssq', {'red_balls': '1,2,3,4,5', 'blue_balls': '1'}), # 红球不足
+    ('ssq', {'red_balls': '1,2,3,4,5,6', 'blue_balls': '1', 'banker_red_balls': '1,7'}), # 胆码与拖码重复
+    ('dlt', {'red_balls': '1,2,3,4,5', 'blue_balls': '1'}), # 后区不足
+    ('dlt', {'red_balls': '1,2,3,4,36', 'blue_balls': '1,2'}),
+])
+def test_backtest_rejects_invalid_tickets(client, lottery_type, combination):
+    response = _backtest(client, lottery_type, **combination)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('lottery_type, combination', [
+    ('ssq', {'red_balls': '1,2,3,4,5,6', 'blue_balls': '1'}),
+    ('ssq', {'red_balls': '1,2,3,4,5,6,7', 'blue_balls': '1,2'}),
+    ('ssq', {'red_balls': '3,4,5,6,7', 'blue_balls': '1', 'banker_red_balls': '1,2'}),
+    ('dlt', {'red_balls': '1,2,3,4,5', 'blue_balls': '1,2'}),
+])
+def test_backtest_accepts_valid_tickets(client, lottery_type, combination):
+    response = _backtest(client, lottery_type, **combination)
+    assert response.status_code == 200
+    assert 'error' not in response.get_json()
+
+
+def test_prize_odds_rejects_duplicate_balls(client):
+    response = client.post('/api/prize_odds', json={'lottery_type': 'ssq',
+                                                    'combinations': [{'red_balls': '1,1,2,3,4,5,6', 'blue_balls': '1'}]})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == '号码不能重复。'
@@ -0,0 +1,25 @@
+# tests/test_rule_engine.py
+import random
+import pytest
+from prediction_engine import check_dlt_rules_for_balls, check_ssq_rules_for_balls
+from rule_engine import check_tickets_rules
+
+CHECKS = {'ssq': (check_ssq_rules_for_balls, 33, 6, 16, 1), 'dlt': (check_dlt_rules_for_balls, 35, 5, 12, 2)}
+
+
+@pytest.mark.parametrize('lottery_type', ['ssq', 'dlt'])
+def test_batch_check_matches_per_ticket_check(app_context, lottery_type):
+    check_single, red_range, red_count, blue_range, blue_count = CHECKS[lottery_type]
+    rng = random.Random(3)
+    tickets = [(sorted(rng.sample(range(1, red_range + 1), red_count)),
+                sorted(rng.sample(range(1, blue_range + 1), blue_count)))
+               for _ in range(50)]
+    tickets.append((list(range(1, red_count + 1)), list(range(1, blue_count + 1)))) # 连号
+
+    results = check_tickets_rules(lottery_type, tickets)
+    assert len(results) == len(tickets)
+    assert results == [check_single(red_balls, blue_balls) for red_balls, blue_balls in tickets]
+
+
+def test_invalid_lottery_type(app_context):
+    assert 'error' in check_tickets_rules('abc', [([1, 2, 3, 4, 5, 6], [1])])
@@ -0,0 +1,28 @@
+# tests/test_strategy_backtest.py
+import strategy_backtest
+from strategy_backtest import run_strategy_backtest
+
+
+def _without_timing(result):
+    return {key: value for key, value in result.items() if key != 'elapsed_ms'}
+
+
+def test_same_seed_same_result_for_any_worker_count(app_context, monkeypatch):
+    monkeypatch.setattr(strategy_backtest, 'SHARD_DRAWS', 20)
+    results = [run_strategy_backtest('ssq', draws=60, tickets_per_draw=5, seed=11, workers=workers)
+               for workers in (1, 2, 3)]
+    assert 'error' not in results[0]
+    assert results[0]['draws_count'] == 60
+    assert _without_timing(results[0]) == _without_timing(results[1]) == _without_timing(results[2])
+
+
+def test_different_seeds_differ(app_context, monkeypatch):
+    monkeypatch.setattr(strategy_backtest, 'SHARD_DRAWS', 20)
+    first = run_strategy_backtest('dlt', draws=40, tickets_per_draw=5, strategies=['uniform'], seed=1, workers=2)
+    second = run_strategy_backtest('dlt', draws=40, tickets_per_draw=5, strategies=['uniform'], seed=2, workers=2)
+    assert first['results'][0]['level_counts'] != second['results'][0]['level_counts'] \
+        or first['results'][0]['total_payout'] != second['results'][0]['total_payout']
+
+
+def test_invalid_lottery_type(app_context):
+    assert 'error' in run_strategy_backtest('abc')
@@ -0,0 +1,106 @@
+# ticket_batch.py
+import json
+import random
+import numpy as np
+from config import PRIZE_RULES
+from combination_index import sample_valid_red
+from drawn_index import get_drawn_index
+from prediction_model import PICK_COUNTS, get_prediction_model
+from rule_engine import balls_mask
+
+# 版本号，每次生成文件时更新
+__version__ = "1.0.0"
+
+GENERATION_MODES = ('predicted', 'random', 'valid_random')
+OUTPUT_FORMATS = ('ndjson', 'text')
+
+# 每批生成的号码组数，流式输出时每批输出一次
+BATCH_CHUNK_SIZE = 10000
+
+# 连续多少批没有产生新号码时停止 (规则过严或可选组合已用尽)
+MAX_STALE_CHUNKS = 3
+
+def ticket_key(red_balls, blue_balls):
+    """一注号码的键 (红球掩码, 蓝球掩码)，与号码顺序无关，与 DrawnIndex.tickets 的键相同"""
+    return balls_mask(red_balls), balls_mask(blue_balls)
+
+
+def resolve_seed(seed):
+    """未指定种子时随机取一个，返回给调用方以便复现同一批号码"""
+    return random.SystemRandom().randrange(2 ** 32) if seed is None else int(seed)
+
+
+def _uniform_balls(size, ball_range, pick_count, rng):
+    """向量化均匀抽取 size 组号码：每行对随机数取最小的 k 个下标即为均匀的 k 元组合，返回 (size, k) 升序数组"""
+    return np.sort(np.argpartition(rng.random((size, ball_range)), pick_count - 1, axis=1)[:, :pick_count], axis=1) + 1
+
+
+def _chunk_with_keys(red, blue):
+    """向量化计算每注号码的键，与 ticket_key 一致"""
+    red_masks = np.left_shift(np.int64(1), red).sum(axis=1).tolist()
+    blue_masks = np.left_shift(np.int64(1), blue).sum(axis=1).tolist()
+    return list(zip(red.tolist(), blue.tolist(), zip(red_masks, blue_masks)))
+
+
+def _random_chunk(lottery_type, size, rng):
+    """完全随机号码 (numpy 向量化)"""
+    red_count, blue_count = PICK_COUNTS[lottery_type]
+    rules = PRIZE_RULES[lottery_type]
+    return _chunk_with_keys(_uniform_balls(size, rules['red_range'], red_count, rng),
+                            _uniform_balls(size, rules['blue_range'], blue_count, rng))
+
+
+def _valid_random_chunk(lottery_type, size, rng):
+    """红球在满足硬性规则的组合中均匀抽取 (组合索引，无拒绝采样)，蓝球完全随机"""
+    red = np.array(sample_valid_red(lottery_type, size, rng), dtype=np.int64).reshape(-1, PICK_COUNTS[lottery_type][0])
+    blue = _uniform_balls(len(red), PRIZE_RULES[lottery_type]['blue_range'], PICK_COUNTS[lottery_type][1], rng)
+    return _chunk_with_keys(red, blue)
+
+
+def _predicted_chunk(model, size, rng, stats):
+    return [(red_balls, blue_balls, ticket_key(red_balls, blue_balls))
+            for red_balls, blue_balls in model.sample_valid_many(size, rng, stats)]
+
+
+def iter_ticket_batches(lottery_type, mode, count, seed, exclude_drawn=False, stats=None):
+    """
+    分批生成 count 注互不相同的号码，每批产出一个 [(红球列表, 蓝球列表), ...] 列表。
+    mode: 'predicted' 按预测模型和硬性规则抽样，'random' 完全随机 (numpy 向量化)，
+          'valid_random' 在满足硬性规则的红球组合中均匀抽样
+    exclude_drawn: 排除历史上开出过的号码组合 (红球和蓝球全部相同)
+    同一种子、参数和开奖数据下产出的号码序列完全相同。
+    可选组合不足或规则无法满足时提前结束，产出的号码可能少于 count 注。
+    """
+    seen = set(get_drawn_index(lottery_type).tickets) if exclude_drawn else set()
+    if mode in ('random', 'valid_random'):
+        numpy_rng = np.random.default_rng(seed)
+        chunk_function = _random_chunk if mode == 'random' else _valid_random_chunk
+        make_chunk = lambda size: chunk_function(lottery_type, size, numpy_rng)
+    else:
+        model = get_prediction_model(lottery_type)
+        python_rng = random.Random(seed)
+        make_chunk = lambda size: _predicted_chunk(model, size, python_rng, stats)
+
+    produced = stale_chunks = 0
+    while produced < count and stale_chunks < MAX_STALE_CHUNKS:
+        batch = []
+        for red_balls, blue_balls, key in make_chunk(min(BATCH_CHUNK_SIZE, count - produced)):
+            if key not in seen:
+                seen.add(key)
+                batch.append((red_balls, blue_balls))
+        stale_chunks = 0 if batch else stale_chunks + 1
+        if batch:
+            produced += len(batch)
+            yield batch
+
+
+def ticket_to_dict(red_balls, blue_balls):
+    """与生成接口相同的格式: {"red_balls": "1,2,...", "blue_balls": "7"}"""
+    return {'red_balls': ','.join(map(str, red_balls)), 'blue_balls': ','.join(map(str, blue_balls))}
+
+
+def format_ticket(red_balls, blue_balls, output_format):
+    """ndjson: 一行 JSON 对象 (见 ticket_to_dict)；text: "01 02 03 04 05 06 + 07" """
+    if output_format == 'text':
+        return ' '.join(f'{ball:02d}' for ball in red_balls) + ' + ' + ' '.join(f'{ball:02d}' for ball in blue_balls)
+    return json.dumps(ticket_to_dict(red_balls, blue_balls))
@@ -1,9 +1,10 @@
 # utils.py
-from datetime import datetime, timedelta, date
 import math
 from collections import Counter, OrderedDict # <-- 导入 OrderedDict
+from functools import lru_cache
 import random
 from config import PRIZE_RULES, CURRENT_SETTINGS, PER_BET_PRICE # 导入中奖规则和当前设置
+from draw_calendar import format_nth_draw_date
 
 # 版本号，每次生成文件时更新
 __version__ = "1.0.0"
@@ -407,22 +408,23 @@ def combinations(n, k):
     return res
 
 # --- 计算复式投注花费 ---
-def calculate_combination_cost(user_red_balls_count, user_blue_balls_count, lottery_type):
+def calculate_combination_cost(user_red_balls_count, user_blue_balls_count, lottery_type, banker_red_count=0, banker_blue_count=0):
     """
-    根据用户选择的红蓝球数量，计算复式投注的总注数和花费。
-    user_red_balls_count: 用户选择的红球数量
-    user_blue_balls_count: 用户选择的蓝球数量
+    根据用户选择的红蓝球数量，计算复式/胆拖投注的总注数和花费。
+    user_red_balls_count: 用户选择的红球数量 (胆拖时为红球拖码数量)
+    user_blue_balls_count: 用户选择的蓝球数量 (胆拖时为蓝球拖码数量)
     lottery_type: 'ssq' 或 'dlt'
+    banker_red_count / banker_blue_count: 红球/蓝球胆码数量，复式投注为 0
     返回: {'total_bets': int, 'total_cost': float}
     """
     if lottery_type == 'ssq':
         # 双色球标准：6红1蓝
-        red_bets = combinations(user_red_balls_count, 6)
-        blue_bets = combinations(user_blue_balls_count, 1)
+        red_bets = combinations(user_red_balls_count, 6 - banker_red_count)
+        blue_bets = combinations(user_blue_balls_count, 1 - banker_blue_count)
     elif lottery_type == 'dlt':
         # 大乐透标准：5红2蓝
-        red_bets = combinations(user_red_balls_count, 5)
-        blue_bets = combinations(user_blue_balls_count, 2)
+        red_bets = combinations(user_red_balls_count, 5 - banker_red_count)
+        blue_bets = combinations(user_blue_balls_count, 2 - banker_blue_count)
     else:
         return {'total_bets': 0, 'total_cost': 0}
     
@@ -431,6 +433,174 @@ def calculate_combination_cost(user_red_balls_count, user_blue_balls_count, lott
     return {'total_bets': total_bets, 'total_cost': total_cost}
 
 
+# --- 复式/胆拖 精确中奖概率 (超几何分布) ---
+def get_prize_levels(lottery_type):
+    """按 PRIZE_RULES 中的顺序返回去重后的奖级名称列表 (从高到低)"""
+    levels = []
+    for prize_rule in PRIZE_RULES[lottery_type]['prizes']:
+        if prize_rule['level'] not in levels:
+            levels.append(prize_rule['level'])
+    return levels
+
+@lru_cache(maxsize=256)
+def _zone_match_outcomes(pool_size, draw_size, bet_size, banker_count, drag_count):
+    """
+    计算单个号码区 (红球区或蓝球区) 的命中分布。
+    每注号码由全部胆码加上 (bet_size - banker_count) 个拖码组成。
+    返回: ((概率, {命中个数: 注数}), ...)，概率按开奖命中胆码数 dm、拖码数 tm 的多元超几何分布计算。
+    """
+    total_draws = combinations(pool_size, draw_size)
+    other_count = pool_size - banker_count - drag_count
+    drag_pick = bet_size - banker_count
+    outcomes = []
+    for dm in range(0, min(banker_count, draw_size) + 1):
+        for tm in range(0, min(drag_count, draw_size - dm) + 1):
+            ways = combinations(banker_count, dm) * combinations(drag_count, tm) * combinations(other_count, draw_size - dm - tm)
+            if ways == 0:
+                continue
+            bets_by_match = {}
+            for j in range(0, min(tm, drag_pick) + 1):
+                bets = combinations(tm, j) * combinations(drag_count - tm, drag_pick - j)
+                if bets > 0:
+                    bets_by_match[dm + j] = bets
+            outcomes.append((ways / total_draws, bets_by_match))
+    return tuple(outcomes)
+
+@lru_cache(maxsize=256)
+def ticket_outcome_distribution(lottery_type, banker_red_count, drag_red_count, banker_blue_count, drag_blue_count):
+    """
+    计算一张复式/胆拖彩票在一次开奖中所有可能结果的精确分布。
+    结果只与胆码/拖码的数量有关，与具体号码无关，因此可以缓存。
+    返回: ((概率, (各奖级中奖注数, ...)), ...)，奖级顺序与 get_prize_levels 一致。
+    """
+    rules = PRIZE_RULES[lottery_type]
+    standard_red_count = 6 if lottery_type == 'ssq' else 5
+    standard_blue_count = 1 if lottery_type == 'ssq' else 2
+    levels = get_prize_levels(lottery_type)
+
+    red_outcomes = _zone_match_outcomes(rules['red_range'], standard_red_count, standard_red_count, banker_red_count, drag_red_count)
+    blue_outcomes = _zone_match_outcomes(rules['blue_range'], standard_blue_count, standard_blue_count, banker_blue_count, drag_blue_count)
+
+    distribution = []
+    for red_prob, red_bets in red_outcomes:
+        for blue_prob, blue_bets in blue_outcomes:
+            level_counts = [0] * len(levels)
+            for prize_rule in rules['prizes']:
+                count = red_bets.get(prize_rule['match_red'], 0) * blue_bets.get(prize_rule['match_blue'], 0)
+                if count:
+                    level_counts[levels.index(prize_rule['level'])] += count
+            distribution.append((red_prob * blue_prob, tuple(level_counts)))
+    return tuple(distribution)
+
+@lru_cache(maxsize=256)
+def _ticket_level_odds(lottery_type, banker_red_count, drag_red_count, banker_blue_count, drag_blue_count):
+    """
+    汇总 ticket_outcome_distribution，得到每个奖级的 (中奖概率, 期望中奖注数) 以及每期至少中一注的概率。
+    """
+    distribution = ticket_outcome_distribution(lottery_type, banker_red_count, drag_red_count, banker_blue_count, drag_blue_count)
+    level_odds = []
+    for index in range(len(get_prize_levels(lottery_type))):
+        probability = sum(prob for prob, level_counts in distribution if level_counts[index] > 0)
+        expected_bets = sum(prob * level_counts[index] for prob, level_counts in distribution)
+        level_odds.append((probability, expected_bets))
+    win_probability = sum(prob for prob, level_counts in distribution if any(level_counts))
+    return tuple(level_odds), win_probability
+
+def validate_ticket_balls(user_red_balls, user_blue_balls, lottery_type, banker_red_balls=None, banker_blue_balls=None):
+    """
+    检查一组复式/胆拖投注的号码：范围、重复、胆码与拖码不重叠、胆码不超过单注个数、总个数不少于单注个数。
+    返回: 错误信息 (中文)，号码有效时返回 None
+    """
+    rules = PRIZE_RULES.get(lottery_type)
+    if not rules:
+        return 'Invalid lottery type'
+    banker_red_balls = banker_red_balls or []
+    banker_blue_balls = banker_blue_balls or []
+    standard_red_count = 6 if lottery_type == 'ssq' else 5
+    standard_blue_count = 1 if lottery_type == 'ssq' else 2
+
+    for ball in list(user_red_balls) + list(banker_red_balls):
+        if not (1 <= ball <= rules['red_range']):
+            return f"红球 {ball} 超出了有效范围 (1-{rules['red_range']})。"
+    for ball in list(user_blue_balls) + list(banker_blue_balls):
+        if not (1 <= ball <= rules['blue_range']):
+            return f"蓝球 {ball} 超出了有效范围 (1-{rules['blue_range']})。"
+    for balls in (user_red_balls, user_blue_balls, banker_red_balls, banker_blue_balls):
+        if len(set(balls)) != len(balls):
+            return '号码不能重复。'
+    if set(user_red_balls) & set(banker_red_balls) or set(user_blue_balls) & set(banker_blue_balls):
+        return '胆码与拖码不能重复。'
+    if len(banker_red_balls) > standard_red_count or len(banker_blue_balls) > standard_blue_count:
+        return '胆码数量超过了单注号码数量。'
+    if len(banker_red_balls) + len(user_red_balls) < standard_red_count or len(banker_blue_balls) + len(user_blue_balls) < standard_blue_count:
+        return f"至少需要选择 {standard_red_count} 个红球和 {standard_blue_count} 个蓝球。"
+    return None
+
+
+def calculate_ticket_odds(user_red_balls, user_blue_balls, lottery_type, banker_red_balls=None, banker_blue_balls=None, floating_prize_amounts=None):
+    """
+    精确计算复式/胆拖投注每期的各奖级中奖概率与期望回报，无需蒙特卡洛模拟。
+    user_red_balls / user_blue_balls: 红球/蓝球 (胆拖时为拖码)
+    banker_red_balls / banker_blue_balls: 红球/蓝球胆码，复式投注留空
+    floating_prize_amounts: 浮动奖金估算值，例如 {'一等奖': 5000000, '二等奖': 150000}
+    返回: 包含各奖级概率、期望中奖注数、期望回报和投注花费的字典
+    """
+    rules = PRIZE_RULES.get(lottery_type)
+    if not rules:
+        return {'error': 'Invalid lottery type'}
+
+    banker_red_balls = banker_red_balls or []
+    banker_blue_balls = banker_blue_balls or []
+    floating_prize_amounts = floating_prize_amounts or {}
+    error = validate_ticket_balls(user_red_balls, user_blue_balls, lottery_type, banker_red_balls, banker_blue_balls)
+    if error:
+        return {'error': error}
+
+    cost_details = calculate_combination_cost(len(user_red_balls), len(user_blue_balls), lottery_type,
+                                              len(banker_red_balls), len(banker_blue_balls))
+    level_odds, win_probability = _ticket_level_odds(lottery_type, len(banker_red_balls), len(user_red_balls),
+                                                     len(banker_blue_balls), len(user_blue_balls))
+
+    # 固定奖金取 PRIZE_RULES，浮动奖金取调用方提供的历史估算值
+    level_amounts = {}
+    for prize_rule in rules['prizes']:
+        if prize_rule['amount'] == '浮动':
+            level_amounts[prize_rule['level']] = floating_prize_amounts.get(prize_rule['level']) or 0
+        else:
+            level_amounts[prize_rule['level']] = prize_rule['amount']
+
+    prize_odds = []
+    expected_return = 0.0
+    for level, (probability, expected_bets) in zip(get_prize_levels(lottery_type), level_odds):
+        level_expected_return = expected_bets * level_amounts[level]
+        expected_return += level_expected_return
+        prize_odds.append({
+            'level': level,
+            'probability': probability,
+            'odds': round(1 / probability) if probability > 0 else None, # 约 1/N 的机会
+            'expected_bets': expected_bets,
+            'amount': level_amounts[level],
+            'expected_return': level_expected_return
+        })
+
+    return_rate = 0.0
+    if cost_details['total_cost'] > 0:
+        return_rate = expected_return / cost_details['total_cost'] * 100
+
+    return {
+        'input_red_balls': list(user_red_balls),
+        'input_blue_balls': list(user_blue_balls),
+        'banker_red_balls': list(banker_red_balls),
+        'banker_blue_balls': list(banker_blue_balls),
+        'total_bets_per_draw': cost_details['total_bets'],
+        'cost_per_draw': cost_details['total_cost'],
+        'prize_odds': prize_odds,
+        'win_probability': win_probability, # 每期至少中一注的概率
+        'expected_return': expected_return, # 每期期望回报 (元)
+        'return_rate': round(return_rate, 2) # 期望回报率 (%)
+    }
+
+
 # --- 对奖逻辑辅助函数 ---
 def calculate_prize_details(user_red_balls, user_blue_balls, draw_red_balls, draw_blue_balls, lottery_type):
     """
@@ -500,112 +670,74 @@ def calculate_prize_details(user_red_balls, user_blue_balls, draw_red_balls, dra
     return prize_details
 
 # --- 趣味游戏模拟函数 ---
-def simulate_fun_game(user_red_balls, user_blue_balls, lottery_type, max_simulations=1000000):
+FUN_GAME_PROGRESS_INTERVAL = 100000 # 逐期模拟时每隔多少期汇报一次进度
+
+def _simulate_fun_game_brute_force(tickets, lottery_type, max_simulations, progress_callback=None, seed=None):
     """
-    模拟虚拟开奖，直到用户号码中得一等奖，或达到最大模拟次数。
-    返回模拟结果，包括中奖次数、预计时间等。
+    逐期模拟开奖并对奖 (原始实现)，速度较慢，保留用于校验向量化引擎。多组号码共用同一串开奖。
+    progress_callback(已模拟期数, [{奖级: 中奖注数}, ...]): 每 FUN_GAME_PROGRESS_INTERVAL 期调用一次，返回 True 时提前结束
+    seed: 随机种子，相同种子得到相同结果
+    返回: [(是否中得一等奖, 模拟期数, {奖级: 中奖注数}), ...]
     """
-    rules = PRIZE_RULES.get(lottery_type)
-    if not rules:
-        return {'error': 'Invalid lottery type'}
-
-    red_range = rules['red_range'] # 从 PRIZE_RULES 获取范围
-    blue_range = rules['blue_range'] # 从 PRIZE_RULES 获取范围
-    
-    # 确保用户至少选择了一个红球或一个蓝球
-    if not user_red_balls and not user_blue_balls:
-        return {'error': '请至少选择一个红球或一个蓝球进行模拟。'}
-
-    # 模拟开奖需要知道开奖号码的数量，这里假设是标准玩法
+    rng = random.Random(seed)
+    rules = PRIZE_RULES[lottery_type]
+    red_range = rules['red_range']
+    blue_range = rules['blue_range']
     num_red_balls_to_draw = 6 if lottery_type == 'ssq' else 5
     num_blue_balls_to_draw = 1 if lottery_type == 'ssq' else 2
 
-    # 修正：这里只检查用户选择的号码是否在有效范围内，不限制数量
-    for ball in user_red_balls:
-        if not (1 <= ball <= red_range):
-            return {'error': f"用户选择的红球 {ball} 超出了有效范围 (1-{red_range})。"}
-    for ball in user_blue_balls:
-        if not (1 <= ball <= blue_range):
-            return {'error': f"用户选择的蓝球 {ball} 超出了有效范围 (1-{blue_range})。"}
-
-    first_prize_found = False
+    ticket_draw_counts = [None] * len(tickets) # 中得一等奖的期数，未中为 None
+    total_prizes_counters = [Counter() for _ in tickets] # 统计各奖项中奖次数
     draw_count = 0
-    total_prizes_counter = Counter() # 统计各奖项中奖次数
 
-    while not first_prize_found and draw_count < max_simulations:
+    while None in ticket_draw_counts and draw_count < max_simulations:
         draw_count += 1
-        
+
         # 模拟开奖号码：从所有可能的球中随机抽取固定数量的球
-        if num_red_balls_to_draw > red_range:
-            return {'error': f"模拟红球数量 ({num_red_balls_to_draw}) 超过了红球范围 ({red_range})。"}
-        if num_blue_balls_to_draw > blue_range:
-            return {'error': f"模拟蓝球数量 ({num_blue_balls_to_draw}) 超过了蓝球范围 ({blue_range})。"}
-
-        simulated_red_balls = sorted(random.sample(range(1, red_range + 1), num_red_balls_to_draw))
-        simulated_blue_balls = sorted(random.sample(range(1, blue_range + 1), num_blue_balls_to_draw))
-
-        # 检查中奖情况，现在使用 calculate_prize_details 获取所有奖项的注数
-        prize_details_for_draw = calculate_prize_details(
-            user_red_balls, user_blue_balls,
-            simulated_red_balls, simulated_blue_balls,
-            lottery_type
-        )
-
-        for level, count in prize_details_for_draw.items():
-            total_prizes_counter[level] += count
-            if level == '一等奖' and count > 0:
-                first_prize_found = True
-                # break # 循环条件已经包含 first_prize_found，所以这里可以省略
-    
+        simulated_red_balls = sorted(rng.sample(range(1, red_range + 1), num_red_balls_to_draw))
+        simulated_blue_balls = sorted(rng.sample(range(1, blue_range + 1), num_blue_balls_to_draw))
+
+        for i, (user_red_balls, user_blue_balls) in enumerate(tickets):
+            if ticket_draw_counts[i] is not None:
+                continue
+            # 检查中奖情况，现在使用 calculate_prize_details 获取所有奖项的注数
+            prize_details_for_draw = calculate_prize_details(
+                user_red_balls, user_blue_balls,
+                simulated_red_balls, simulated_blue_balls,
+                lottery_type
+            )
+
+            for level, count in prize_details_for_draw.items():
+                total_prizes_counters[i][level] += count
+                if level == '一等奖' and count > 0:
+                    ticket_draw_counts[i] = draw_count
+
+        if progress_callback and draw_count % FUN_GAME_PROGRESS_INTERVAL == 0:
+            if progress_callback(draw_count, [dict(counter) for counter in total_prizes_counters]):
+                break
+
+    return [(ticket_draw_counts[i] is not None,
+             ticket_draw_counts[i] if ticket_draw_counts[i] is not None else draw_count,
+             total_prizes_counters[i])
+            for i in range(len(tickets))]
+
+def _build_fun_game_result(user_red_balls, user_blue_balls, lottery_type, seed, mode,
+                           first_prize_found, draw_count, total_prizes_counter):
+    """整理单组号码的模拟结果：预计中奖日期、花费，以及按奖级顺序排列的中奖次数"""
+    rules = PRIZE_RULES[lottery_type]
     result = {
         'input_red_balls': user_red_balls,
         'input_blue_balls': user_blue_balls,
+        'seed': seed,
+        'mode': mode,
+        'draw_count': draw_count,
         'total_prizes': dict(total_prizes_counter), # Use Counter's result initially
         'first_prize_info': None
     }
 
     if first_prize_found:
-        # 估算中奖时间
-        # 计算每周开奖次数
-        draw_days_count = 0
-        if lottery_type == 'ssq':
-            draw_days_count = len(CURRENT_SETTINGS.get('ssq_draw_days', []))
-        elif lottery_type == 'dlt':
-            draw_days_count = len(CURRENT_SETTINGS.get('dlt_draw_days', []))
-        
-        # 考虑年度节假日
-        annual_holidays = CURRENT_SETTINGS.get('annual_holidays', [])
-        
-        actual_draw_count = 0
-        current_sim_date = datetime.now().date()
-        
-        # 模拟每一天，直到达到中一等奖所需的开奖次数
-        while actual_draw_count < draw_count:
-            current_sim_date += timedelta(days=1)
-            
-            is_draw_day = False
-            if lottery_type == 'ssq' and current_sim_date.isoweekday() in CURRENT_SETTINGS.get('ssq_draw_days', []):
-                is_draw_day = True
-            elif lottery_type == 'dlt' and current_sim_date.isoweekday() in CURRENT_SETTINGS.get('dlt_draw_days', []):
-                is_draw_day = True
-            
-            is_holiday = False
-            for holiday in annual_holidays:
-                holiday_start_str = holiday['start']
-                holiday_start_month = int(holiday_start_str.split('-')[0])
-                holiday_start_day = int(holiday_start_str.split('-')[1])
-                
-                holiday_start_date_this_year = date(current_sim_date.year, holiday_start_month, holiday_start_day)
-                holiday_end_date_this_year = holiday_start_date_this_year + timedelta(weeks=holiday['duration_weeks']) - timedelta(days=1) # 结束日期包含在内
-                
-                if holiday_start_date_this_year <= current_sim_date <= holiday_end_date_this_year:
-                    is_holiday = True
-                    break
-            
-            if is_draw_day and not is_holiday:
-                actual_draw_count += 1
-        
-        estimated_date = current_sim_date.strftime('%Y年%m月%d日') # 格式化为中文日期
+        # 估算中奖时间：按开奖日历 (开奖日、年度节假日) 直接换算第 draw_count 期的日期
+        estimated_date = format_nth_draw_date(lottery_type, draw_count) or '无法估算 (未设置开奖日)'
         
         # 计算单次投注花费
         cost_details = calculate_combination_cost(len(user_red_balls), len(user_blue_balls), lottery_type)
@@ -632,3 +764,92 @@ def simulate_fun_game(user_red_balls, user_blue_balls, lottery_type, max_simulat
 
     return result
 
+# 趣味游戏模拟方式。多进程分片和逐期模拟开销大，只能由管理员通过设置 fun_game_mode 选择，接口请求只能指定前两种
+FUN_GAME_MODES = ('vectorized', 'sampling', 'sharded', 'brute_force')
+FUN_GAME_CLIENT_MODES = ('vectorized', 'sampling')
+
+def simulate_fun_game_multi(tickets, lottery_type, max_simulations=1000000, mode='vectorized',
+                            progress_callback=None, seed=None):
+    """
+    多组号码共用同一串虚拟开奖进行模拟，每组号码各自统计到第一次中一等奖为止，全部中奖或达到最大模拟次数时结束。
+    tickets: [(红球列表, 蓝球列表), ...]
+    mode: 'vectorized' 批量向量化模拟 (默认)，'sampling' 按精确分布直接抽样 (耗时与模拟次数无关，各组号码分别抽样)，
+          'sharded' 多进程分片模拟，'brute_force' 逐期模拟
+    progress_callback(已模拟期数, [{奖级: 中奖注数}, ...]): 模拟过程中定期调用，返回 True 时提前结束 (用于后台任务汇报进度和取消)
+    seed: 随机种子 (非负整数)。不传时自动生成，并在结果中返回，便于复现同一次模拟
+    返回: {'results': [每组号码的模拟结果], 'seed': 随机种子, 'mode': 模拟方式}，出错时返回 {'error': ...}
+    """
+    rules = PRIZE_RULES.get(lottery_type)
+    if not rules:
+        return {'error': 'Invalid lottery type'}
+    if mode not in FUN_GAME_MODES:
+        return {'error': f'无效的模拟方式: {mode}'}
+    if not tickets:
+        return {'error': '请至少选择一个红球或一个蓝球进行模拟。'}
+
+    red_range = rules['red_range'] # 从 PRIZE_RULES 获取范围
+    blue_range = rules['blue_range'] # 从 PRIZE_RULES 获取范围
+
+    # 模拟开奖需要知道开奖号码的数量，这里假设是标准玩法
+    num_red_balls_to_draw = 6 if lottery_type == 'ssq' else 5
+    num_blue_balls_to_draw = 1 if lottery_type == 'ssq' else 2
+
+    for index, (user_red_balls, user_blue_balls) in enumerate(tickets):
+        prefix = f"第 {index + 1} 组号码: " if len(tickets) > 1 else ''
+        # 确保用户至少选择了一个红球或一个蓝球
+        if not user_red_balls and not user_blue_balls:
+            return {'error': f'{prefix}请至少选择一个红球或一个蓝球进行模拟。'}
+
+        # 修正：这里只检查用户选择的号码是否在有效范围内，不限制数量
+        for ball in user_red_balls:
+            if not (1 <= ball <= red_range):
+                return {'error': f"{prefix}用户选择的红球 {ball} 超出了有效范围 (1-{red_range})。"}
+        for ball in user_blue_balls:
+            if not (1 <= ball <= blue_range):
+                return {'error': f"{prefix}用户选择的蓝球 {ball} 超出了有效范围 (1-{blue_range})。"}
+
+    if num_red_balls_to_draw > red_range:
+        return {'error': f"模拟红球数量 ({num_red_balls_to_draw}) 超过了红球范围 ({red_range})。"}
+    if num_blue_balls_to_draw > blue_range:
+        return {'error': f"模拟蓝球数量 ({num_blue_balls_to_draw}) 超过了蓝球范围 ({blue_range})。"}
+
+    import numpy as np # 延迟导入，只有模拟时才需要
+    from fun_game_engine import run_vectorized_simulation_multi, run_sampled_simulation, run_sharded_simulation_multi # 延迟导入，避免循环依赖
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1, np.uint32)[0])
+
+    if mode == 'brute_force':
+        ticket_results = _simulate_fun_game_brute_force(tickets, lottery_type, max_simulations, progress_callback, seed)
+    elif mode == 'sampling':
+        rng = np.random.default_rng(seed)
+        ticket_results = [run_sampled_simulation(user_red_balls, user_blue_balls, lottery_type, max_simulations, rng=rng)
+                          for user_red_balls, user_blue_balls in tickets]
+    elif mode == 'sharded':
+        ticket_results = run_sharded_simulation_multi(
+            tickets, lottery_type, max_simulations, seed=seed,
+            workers=CURRENT_SETTINGS.get('fun_game_shard_workers', 0), progress_callback=progress_callback)
+    else: # vectorized
+        ticket_results = run_vectorized_simulation_multi(
+            tickets, lottery_type, max_simulations,
+            rng=np.random.default_rng(seed), progress_callback=progress_callback)
+
+    results = [_build_fun_game_result(user_red_balls, user_blue_balls, lottery_type, seed, mode, *ticket_result)
+               for (user_red_balls, user_blue_balls), ticket_result in zip(tickets, ticket_results)]
+    return {'results': results, 'seed': seed, 'mode': mode}
+
+def simulate_fun_game(user_red_balls, user_blue_balls, lottery_type, max_simulations=1000000, mode='vectorized',
+                      progress_callback=None, seed=None):
+    """
+    模拟虚拟开奖，直到用户号码中得一等奖，或达到最大模拟次数。参数见 simulate_fun_game_multi。
+    progress_callback(已模拟期数, {奖级: 中奖注数}): 模拟过程中定期调用，返回 True 时提前结束
+    返回模拟结果，包括中奖次数、预计时间等。
+    """
+    multi_callback = None
+    if progress_callback:
+        multi_callback = lambda draw_count, ticket_totals: progress_callback(draw_count, ticket_totals[0])
+    sim = simulate_fun_game_multi([(user_red_balls, user_blue_balls)], lottery_type, max_simulations, mode,
+                                  multi_callback, seed)
+    if 'error' in sim:
+        return sim
+    return sim['results'][0]
+